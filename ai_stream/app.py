@@ -3,28 +3,35 @@
 import atexit
 import os
 from pathlib import Path
+from typing import TYPE_CHECKING
 import streamlit as st
-from moto.server import ThreadedMotoServer
-from openai import OpenAI
 from ai_stream import TESTING
+from ai_stream.components.catalog import catalog_view
+from ai_stream.components.catalog import invalidate_item
+from ai_stream.components.catalog import load_assistants
 from ai_stream.config import get_logger
+from ai_stream.config import load_config
 from ai_stream.db.aws import PYNAMODB_TABLES
 from ai_stream.db.aws import create_tables
 from ai_stream.db.aws import dump_data_to_disk
 from ai_stream.db.aws import load_data_from_disk
+from ai_stream.db.aws import start_moto_server
 from ai_stream.utils.app_state import AppState
 from ai_stream.utils.app_state import ensure_app_state
 from ai_stream.utils.registries import page_defaults_registry
 
 
+if TYPE_CHECKING:
+    from openai import OpenAI
+
 logger = get_logger(__name__)
+config = load_config()
 
 
 @st.cache_data
 def start_moto() -> None:
     """Start moto server."""
-    server = ThreadedMotoServer("127.0.0.1", 5001)
-    server.start()
+    start_moto_server()
 
 
 @st.cache_resource
@@ -35,23 +42,28 @@ def on_startup() -> None:
     atexit.register(dump_data_to_disk)
 
 
+@st.cache_resource
+def start_reconcile_schedule(api_key: str, project_id: str, _client: "OpenAI") -> None:
+    """Reconcile the tables and the assistants of a project in the background."""
+    from ai_stream.db.reconcile import ReconcileSchedule
+
+    interval = config.reconcile.interval_seconds
+    # Sessions must not keep reading the fixed items from the prefetcher
+    ReconcileSchedule(
+        _client, interval, fix=config.reconcile.apply, on_update=invalidate_item
+    ).start()
+
+
 def load_tables(app_state: AppState):
     """Load IDs and names from DB."""
     if not app_state.tables_loaded:
-        for table_cls in PYNAMODB_TABLES.values():
-            items = table_cls.scan(attributes_to_get=["id", "name"])
-            items_dict = {item.id: item.name for item in items}
-            table_name = table_cls.Meta.table_name
-            setattr(app_state, table_name, items_dict)
+        # Sessions share the catalogs, which are only loaded once per process
+        for name, table_cls in PYNAMODB_TABLES.items():
+            setattr(app_state, table_cls.Meta.table_name, catalog_view(name))
         app_state.tables_loaded = True
 
-    if not app_state.openai_client:
-        return
-
-    # Load assistants
-    # TODO: Add pagination in case number of assistants > 100
-    for asst in app_state.openai_client.beta.assistants.list(limit=100):
-        app_state.assistants[asst.id] = asst.name
+    if app_state.openai_client:
+        load_assistants(app_state, app_state.openai_client)
 
 
 @ensure_app_state
@@ -71,8 +83,12 @@ def main(app_state: AppState) -> None:
     assert isinstance(pg._page, Path)
 
     if api_key:
+        from openai import OpenAI
+
         client = OpenAI(api_key=api_key, **kwargs)  # type: ignore[arg-type]
         app_state.openai_client = client
+        if config.reconcile.interval_seconds:
+            start_reconcile_schedule(api_key, project_id, client)
     # Skip the api_key checking for random_stream
     elif page_defaults_registry[pg._page].skip_api_key:
         pass
@@ -0,0 +1 @@
+"""Benchmarks of AI Stream."""
@@ -0,0 +1,558 @@
+"""Local stand-in for the OpenAI Assistants API.
+
+Run `python -m ai_stream.benchmarks.fake_assistants_api` and point the app to it
+with `OPENAI_BASE_URL=http://127.0.0.1:8010/v1` and any API key. It keeps
+assistants, threads, messages, runs and files in memory, and streams runs as
+server-sent events with a configurable token rate, latency, jitter and error
+rate, so streaming can be benchmarked deterministically without a network.
+
+Runs reply with a text echoing the last user message. If the message mentions
+one of the assistant's functions by name, the run calls that function first,
+with example arguments built from its JSON schema, and replies once the tool
+outputs are submitted.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+
+DEFAULT_PORT = 8010
+LOREM = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua"
+).split()
+
+
+@dataclass
+class FakeBehaviour:
+    """Performance characteristics of the fake API."""
+
+    token_rate: float = 50.0
+    """Streamed tokens per second, unlimited if 0."""
+    latency: float = 0.2
+    """Seconds before the first event of a stream or a response."""
+    jitter: float = 0.0
+    """Maximum random seconds added to the latency and to each token interval."""
+    error_rate: float = 0.0
+    """Probability that a request fails with a server error."""
+    reply_tokens: int = 30
+    """Number of tokens of each reply."""
+    seed: int | None = None
+    """Seed for jitter and error injection."""
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}_{uuid.uuid4().hex[:24]}"
+
+
+def example_arguments(parameters: dict[str, Any]) -> dict[str, Any]:
+    """Build example arguments for the required properties of a JSON schema."""
+    examples: dict[str, Any] = {
+        "string": "example",
+        "number": 1.0,
+        "integer": 1,
+        "boolean": True,
+        "array": [],
+        "object": {},
+    }
+    arguments = {}
+    properties = parameters.get("properties", {})
+    for name in parameters.get("required", []):
+        prop = properties.get(name, {})
+        if prop.get("enum"):
+            arguments[name] = prop["enum"][0]
+        elif prop.get("type") == "string":
+            arguments[name] = f"Example {name}"
+        else:
+            arguments[name] = examples.get(prop.get("type", "string"))
+    return arguments
+
+
+class FakeAssistantsAPI:
+    """In-memory state and behaviour of the fake API."""
+
+    def __init__(self, behaviour: FakeBehaviour):
+        """Initialise."""
+        self.behaviour = behaviour
+        self.rng = random.Random(behaviour.seed)
+        self.lock = threading.Lock()
+        self.assistants: dict[str, dict] = {}
+        self.threads: dict[str, dict] = {}
+        self.messages: dict[str, list[dict]] = {}
+        self.runs: dict[str, dict] = {}
+        self.files: dict[str, dict] = {}
+
+    # Timing
+    def _jitter(self) -> float:
+        with self.lock:
+            return self.rng.uniform(0, self.behaviour.jitter) if self.behaviour.jitter else 0.0
+
+    def wait_latency(self) -> None:
+        """Sleep for the configured latency."""
+        time.sleep(self.behaviour.latency + self._jitter())
+
+    def wait_token(self) -> None:
+        """Sleep between two streamed tokens."""
+        if self.behaviour.token_rate:
+            time.sleep(1 / self.behaviour.token_rate + self._jitter())
+
+    def should_fail(self) -> bool:
+        """Decide whether to inject an error into the current request."""
+        with self.lock:
+            return self.rng.random() < self.behaviour.error_rate
+
+    # Objects
+    def create_assistant(self, body: dict) -> dict:
+        """Create an assistant."""
+        assistant = {
+            "id": _new_id("asst"),
+            "object": "assistant",
+            "created_at": int(time.time()),
+            "name": None,
+            "description": None,
+            "model": "gpt-4o-mini",
+            "instructions": None,
+            "tools": [],
+            "metadata": {},
+            "temperature": 1.0,
+            "top_p": 1.0,
+            "response_format": "auto",
+            "tool_resources": {},
+        }
+        return self.update_assistant(assistant, body)
+
+    def update_assistant(self, assistant: dict, body: dict) -> dict:
+        """Update the given fields of an assistant."""
+        assistant.update({key: val for key, val in body.items() if key in assistant})
+        self.assistants[assistant["id"]] = assistant
+        return assistant
+
+    def create_thread(self, body: dict) -> dict:
+        """Create a thread, with initial messages if given."""
+        thread: dict[str, Any] = {
+            "id": _new_id("thread"),
+            "object": "thread",
+            "created_at": int(time.time()),
+            "metadata": body.get("metadata") or {},
+            "tool_resources": None,
+        }
+        self.threads[thread["id"]] = thread
+        self.messages[thread["id"]] = []
+        for message in body.get("messages", []):
+            self.create_message(thread["id"], message)
+        return thread
+
+    def create_message(
+        self,
+        thread_id: str,
+        body: dict,
+        assistant_id: str | None = None,
+        run_id: str | None = None,
+    ) -> dict:
+        """Add a message to a thread."""
+        content = body.get("content", "")
+        if isinstance(content, list):  # Content parts
+            content = "".join(part.get("text", "") for part in content)
+        message = {
+            "id": _new_id("msg"),
+            "object": "thread.message",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "role": body.get("role", "user"),
+            "content": [{"type": "text", "text": {"value": content, "annotations": []}}],
+            "assistant_id": assistant_id,
+            "run_id": run_id,
+            "attachments": body.get("attachments") or [],
+            "metadata": body.get("metadata") or {},
+            "status": "completed",
+        }
+        self.messages[thread_id].append(message)
+        return message
+
+    def create_run(self, thread_id: str, body: dict) -> dict:
+        """Create a run of an assistant on a thread."""
+        assistant = self.assistants[body["assistant_id"]]
+        for message in body.get("additional_messages") or []:
+            self.create_message(thread_id, message)
+        run = {
+            "id": _new_id("run"),
+            "object": "thread.run",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "assistant_id": assistant["id"],
+            "status": "queued",
+            "required_action": None,
+            "last_error": None,
+            "model": body.get("model") or assistant["model"],
+            "instructions": body.get("instructions") or assistant["instructions"] or "",
+            "tools": body.get("tools") or assistant["tools"],
+            "metadata": body.get("metadata") or {},
+            "temperature": body.get("temperature", assistant["temperature"]),
+            "top_p": body.get("top_p", assistant["top_p"]),
+            "max_prompt_tokens": body.get("max_prompt_tokens"),
+            "max_completion_tokens": body.get("max_completion_tokens"),
+            "truncation_strategy": body.get("truncation_strategy")
+            or {"type": "auto", "last_messages": None},
+            "response_format": "auto",
+            "tool_choice": "auto",
+            "parallel_tool_calls": True,
+            "usage": None,
+        }
+        self.runs[run["id"]] = run
+        return run
+
+    def _called_function(self, run: dict) -> dict | None:
+        """Return the function mentioned in the last user message, if any."""
+        user_messages = [m for m in self.messages[run["thread_id"]] if m["role"] == "user"]
+        if not user_messages:
+            return None
+        text = user_messages[-1]["content"][0]["text"]["value"].lower()
+        for tool in run["tools"]:
+            if tool["type"] == "function" and tool["function"]["name"].lower() in text:
+                return tool["function"]
+        return None
+
+    def _reply_text(self, run: dict) -> str:
+        user_messages = [m for m in self.messages[run["thread_id"]] if m["role"] == "user"]
+        last = user_messages[-1]["content"][0]["text"]["value"] if user_messages else ""
+        words = f"You said: {last}".split()
+        n_lorem = max(self.behaviour.reply_tokens - len(words), 0)
+        words += [LOREM[i % len(LOREM)] for i in range(n_lorem)]
+        return " ".join(words)
+
+    # Streams
+    def run_events(self, run: dict, submitted: bool = False):
+        """Yield the (event, data) pairs of a run, until it completes or requires action."""
+        now = int(time.time())
+        if not submitted:
+            yield "thread.run.created", run
+            run["status"] = "queued"
+            yield "thread.run.queued", run
+        run.update(status="in_progress", started_at=now, required_action=None)
+        yield "thread.run.in_progress", run
+
+        function = None if submitted else self._called_function(run)
+        if function:
+            yield from self._tool_call_events(run, function)
+            return
+        yield from self._message_events(run, self._reply_text(run))
+        run.update(status="completed", completed_at=int(time.time()))
+        yield "thread.run.completed", run
+
+    def _step(self, run: dict, step_details: dict) -> dict:
+        return {
+            "id": _new_id("step"),
+            "object": "thread.run.step",
+            "created_at": int(time.time()),
+            "assistant_id": run["assistant_id"],
+            "thread_id": run["thread_id"],
+            "run_id": run["id"],
+            "type": step_details["type"],
+            "status": "in_progress",
+            "step_details": step_details,
+        }
+
+    def _message_events(self, run: dict, text: str):
+        message = self.create_message(
+            run["thread_id"], {"role": "assistant", "content": ""}, run["assistant_id"], run["id"]
+        )
+        step = self._step(
+            run,
+            {"type": "message_creation", "message_creation": {"message_id": message["id"]}},
+        )
+        yield "thread.run.step.created", step
+        message["status"] = "in_progress"
+        yield "thread.message.created", {**message, "content": []}
+        yield "thread.message.in_progress", {**message, "content": []}
+        tokens = re.findall(r"\S+\s*", text)
+        for token in tokens:
+            self.wait_token()
+            delta = {"content": [{"index": 0, "type": "text", "text": {"value": token}}]}
+            yield (
+                "thread.message.delta",
+                {
+                    "id": message["id"],
+                    "object": "thread.message.delta",
+                    "delta": delta,
+                },
+            )
+        message["content"][0]["text"]["value"] = text
+        message.update(status="completed", completed_at=int(time.time()))
+        yield "thread.message.completed", message
+        step.update(status="completed", completed_at=int(time.time()))
+        yield "thread.run.step.completed", step
+
+    def _tool_call_events(self, run: dict, function: dict):
+        arguments = json.dumps(example_arguments(function.get("parameters", {})))
+        call = {
+            "id": _new_id("call"),
+            "type": "function",
+            "function": {"name": function["name"], "arguments": arguments, "output": None},
+        }
+        step = self._step(run, {"type": "tool_calls", "tool_calls": []})
+        yield "thread.run.step.created", step
+        chunks = re.findall(r".{1,8}", arguments, flags=re.DOTALL)
+        for i, chunk in enumerate(chunks):
+            self.wait_token()
+            tool_call: dict[str, Any] = {"index": 0, "type": "function"}
+            if i == 0:
+                tool_call["id"] = call["id"]
+                tool_call["function"] = {"name": function["name"], "arguments": chunk}
+            else:
+                tool_call["function"] = {"arguments": chunk}
+            delta = {"step_details": {"type": "tool_calls", "tool_calls": [tool_call]}}
+            yield (
+                "thread.run.step.delta",
+                {
+                    "id": step["id"],
+                    "object": "thread.run.step.delta",
+                    "delta": delta,
+                },
+            )
+        run.update(
+            status="requires_action",
+            required_action={
+                "type": "submit_tool_outputs",
+                "submit_tool_outputs": {
+                    "tool_calls": [{k: v for k, v in call.items() if k != "output"}]
+                },
+            },
+        )
+        run["_step"] = step
+        yield "thread.run.requires_action", {k: v for k, v in run.items() if k != "_step"}
+
+    def submit_events(self, run: dict, tool_outputs: list[dict]):
+        """Yield the events of a run after its tool outputs were submitted."""
+        step = run.pop("_step", None)
+        if step:
+            outputs = {output["tool_call_id"]: output["output"] for output in tool_outputs}
+            calls = run["required_action"]["submit_tool_outputs"]["tool_calls"]
+            step["step_details"]["tool_calls"] = [
+                {**call, "function": {**call["function"], "output": outputs.get(call["id"])}}
+                for call in calls
+            ]
+            step.update(status="completed", completed_at=int(time.time()))
+            yield "thread.run.step.completed", step
+        run["status"] = "queued"
+        yield "thread.run.queued", run
+        yield from self.run_events(run, submitted=True)
+
+
+class FakeAssistantsAPIHandler(BaseHTTPRequestHandler):
+    """HTTP handler of the fake API."""
+
+    api: FakeAssistantsAPI
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Silence per-request logging."""
+        pass
+
+    # Helpers
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Type", "").startswith("multipart/form-data"):
+            match = re.search(rb'filename="([^"]*)"', raw)
+            purpose = re.search(rb'name="purpose"\r\n\r\n([^\r]*)', raw)
+            return {
+                "filename": match.group(1).decode() if match else "upload",
+                "purpose": purpose.group(1).decode() if purpose else "assistants",
+                "bytes": len(raw),
+            }
+        return json.loads(raw) if raw else {}
+
+    def _send_json(self, data: Any, status: int = HTTPStatus.OK) -> None:
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_error(self, status: int, message: str) -> None:
+        error_type = (
+            "server_error"
+            if status >= HTTPStatus.INTERNAL_SERVER_ERROR
+            else "invalid_request_error"
+        )
+        self._send_json({"error": {"message": message, "type": error_type}}, status)
+
+    def _send_stream(self, events: Any) -> None:
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        self.api.wait_latency()
+        for event, data in events:
+            self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"event: done\ndata: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _list(self, items: list[dict], query: dict) -> dict:
+        order = query.get("order", ["desc"])[0]
+        limit = int(query.get("limit", ["20"])[0])
+        items = sorted(items, key=lambda item: item["created_at"], reverse=order == "desc")
+        if "after" in query:
+            ids = [item["id"] for item in items]
+            after = query["after"][0]
+            items = items[ids.index(after) + 1 :] if after in ids else []
+        page = items[:limit]
+        return {
+            "object": "list",
+            "data": page,
+            "first_id": page[0]["id"] if page else None,
+            "last_id": page[-1]["id"] if page else None,
+            "has_more": len(items) > limit,
+        }
+
+    # Routing
+    def _handle(self, method: str) -> None:
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        if parts[:1] == ["v1"]:
+            parts = parts[1:]
+        query = parse_qs(url.query)
+        body = self._body() if method == "POST" else {}
+        if self.api.should_fail():
+            self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, "Injected error.")
+            return
+        try:
+            self._route(method, parts, query, body)
+        except KeyError as e:
+            self._send_error(HTTPStatus.NOT_FOUND, f"No such object: {e}.")
+
+    def _route(self, method: str, parts: list[str], query: dict, body: dict) -> None:  # noqa: C901, PLR0912
+        api = self.api
+        match method, parts:
+            case "POST", ["assistants"]:
+                self._reply(api.create_assistant(body))
+            case "GET", ["assistants"]:
+                self._reply(self._list(list(api.assistants.values()), query))
+            case "GET", ["assistants", assistant_id]:
+                self._reply(api.assistants[assistant_id])
+            case "POST", ["assistants", assistant_id]:
+                self._reply(api.update_assistant(api.assistants[assistant_id], body))
+            case "DELETE", ["assistants", assistant_id]:
+                del api.assistants[assistant_id]
+                self._reply({"id": assistant_id, "object": "assistant.deleted", "deleted": True})
+            case "POST", ["threads"]:
+                self._reply(api.create_thread(body))
+            case "GET", ["threads", thread_id]:
+                self._reply(api.threads[thread_id])
+            case "POST", ["threads", thread_id, "messages"]:
+                self._reply(api.create_message(thread_id, body))
+            case "GET", ["threads", thread_id, "messages"]:
+                self._reply(self._list(api.messages[thread_id], query))
+            case "POST", ["threads", thread_id, "runs"]:
+                run = api.create_run(thread_id, body)
+                self._reply_run(run, api.run_events(run), body.get("stream", False))
+            case "GET", ["threads", _, "runs", run_id]:
+                self._reply({k: v for k, v in api.runs[run_id].items() if k != "_step"})
+            case "POST", ["threads", _, "runs", run_id, "submit_tool_outputs"]:
+                run = api.runs[run_id]
+                events = api.submit_events(run, body.get("tool_outputs", []))
+                self._reply_run(run, events, body.get("stream", False))
+            case "POST", ["files"]:
+                file = {
+                    "id": _new_id("file"),
+                    "object": "file",
+                    "created_at": int(time.time()),
+                    "status": "processed",
+                    **body,
+                }
+                api.files[file["id"]] = file
+                self._reply(file)
+            case "GET", ["files", file_id]:
+                self._reply(api.files[file_id])
+            case "DELETE", ["files", file_id]:
+                del api.files[file_id]
+                self._reply({"id": file_id, "object": "file", "deleted": True})
+            case _:
+                self._send_error(
+                    HTTPStatus.NOT_FOUND, f"Unknown endpoint {method} /{'/'.join(parts)}."
+                )
+
+    def _reply(self, data: dict) -> None:
+        self.api.wait_latency()
+        self._send_json(data)
+
+    def _reply_run(self, run: dict, events: Any, stream: bool) -> None:
+        if stream:
+            self._send_stream(events)
+        else:  # Complete the run before replying
+            for _ in events:
+                pass
+            self._reply({k: v for k, v in run.items() if k != "_step"})
+
+    def do_GET(self) -> None:  # noqa: N802
+        """Handle GET requests."""
+        self._handle("GET")
+
+    def do_POST(self) -> None:  # noqa: N802
+        """Handle POST requests."""
+        self._handle("POST")
+
+    def do_DELETE(self) -> None:  # noqa: N802
+        """Handle DELETE requests."""
+        self._handle("DELETE")
+
+
+def create_server(
+    behaviour: FakeBehaviour, host: str = "127.0.0.1", port: int = DEFAULT_PORT
+) -> ThreadingHTTPServer:
+    """Create the fake API server, use port 0 for a free port."""
+    handler = type("Handler", (FakeAssistantsAPIHandler,), {"api": FakeAssistantsAPI(behaviour)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Serve the fake API until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--token-rate", type=float, default=FakeBehaviour.token_rate)
+    parser.add_argument("--latency", type=float, default=FakeBehaviour.latency)
+    parser.add_argument("--jitter", type=float, default=FakeBehaviour.jitter)
+    parser.add_argument("--error-rate", type=float, default=FakeBehaviour.error_rate)
+    parser.add_argument("--reply-tokens", type=int, default=FakeBehaviour.reply_tokens)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    behaviour = FakeBehaviour(
+        token_rate=args.token_rate,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        reply_tokens=args.reply_tokens,
+        seed=args.seed,
+    )
+    server = create_server(behaviour, args.host, args.port)
+    print(f"Fake Assistants API at http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
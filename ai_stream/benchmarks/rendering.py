@@ -0,0 +1,153 @@
+"""Rendering benchmark on synthetic chat histories.
+
+Run `python -m ai_stream.benchmarks.rendering` to measure the rerun latency and
+memory of a chat page for histories of different lengths. Pages run headlessly
+through Streamlit's `AppTest`, so no browser or API key is needed. A local
+moto server is started for the DynamoDB tables.
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+import numpy as np
+from streamlit.testing.v1 import AppTest
+from ai_stream.utils.app_state import AppState
+
+
+if TYPE_CHECKING:
+    from ai_stream.benchmarks.workload import WorkloadConfig
+
+
+DEFAULT_SIZES = [10, 1_000, 10_000]
+MIB = 1024 * 1024
+RANDOM_STREAM_PAGE = Path(__file__).parents[1] / "random_stream.py"
+
+
+def history_page() -> None:
+    """Render the chat history only."""
+    from streamlit import session_state
+    from ai_stream.components.helpers import render_history
+
+    render_history(session_state.app_state.history)
+
+
+PAGES: dict[str, Callable[[float], AppTest]] = {
+    "history": lambda timeout: AppTest.from_function(history_page, default_timeout=timeout),
+    # Requires TESTING to be unset, otherwise the page is not run
+    "random_stream": lambda timeout: AppTest.from_file(
+        str(RANDOM_STREAM_PAGE), default_timeout=timeout
+    ),
+}
+
+
+@dataclass
+class BenchmarkResult:
+    """Rerun latency and memory of a page for one history length."""
+
+    history_length: int
+    reruns: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    history_mib: float
+    """Memory allocated by the history itself."""
+    peak_mib: float
+    """Peak memory allocated during the first run."""
+
+
+def benchmark_page(
+    page: str, config: "WorkloadConfig", reruns: int, timeout: float
+) -> BenchmarkResult:
+    """Render a page with a synthetic history and time its reruns."""
+    from ai_stream.benchmarks.workload import generate_history
+
+    tracemalloc.start()
+    history = generate_history(config)
+    history_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+
+    app_state = AppState()
+    app_state.history = history
+    at = PAGES[page](timeout)
+    at.session_state["app_state"] = app_state
+    at.run()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+
+    return BenchmarkResult(
+        history_length=config.history_length,
+        reruns=reruns,
+        p50_ms=float(p50),
+        p95_ms=float(p95),
+        p99_ms=float(p99),
+        max_ms=max(timings),
+        history_mib=history_bytes / MIB,
+        peak_mib=peak_bytes / MIB,
+    )
+
+
+def format_results(results: list[BenchmarkResult]) -> str:
+    """Format benchmark results as a table."""
+    lines = [
+        f"{'entries':>8}{'p50 [ms]':>11}{'p95 [ms]':>11}{'p99 [ms]':>11}{'max [ms]':>11}"
+        f"{'history [MiB]':>15}{'peak [MiB]':>12}"
+    ]
+    for r in results:
+        lines.append(
+            f"{r.history_length:>8}{r.p50_ms:>11.1f}{r.p95_ms:>11.1f}{r.p99_ms:>11.1f}"
+            f"{r.max_ms:>11.1f}{r.history_mib:>15.2f}{r.peak_mib:>12.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the benchmark for each history length and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chart-points", type=int, default=20)
+    parser.add_argument("--page", choices=list(PAGES), default="history")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds per run.")
+    args = parser.parse_args(argv)
+
+    from ai_stream.db.aws import create_tables
+    from ai_stream.db.aws import start_moto_server
+
+    server = start_moto_server(verbose=False)
+    try:
+        create_tables()
+        # Tools are registered in the tables on import
+        from ai_stream.benchmarks.workload import WorkloadConfig
+
+        results = []
+        for size in args.sizes:
+            config = WorkloadConfig(
+                seed=args.seed, history_length=size, chart_points=args.chart_points
+            )
+            results.append(benchmark_page(args.page, config, args.reruns, args.timeout))
+            print(format_results(results[-1:]).splitlines()[-1], flush=True)
+    finally:
+        server.stop()
+
+    print(format_results(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
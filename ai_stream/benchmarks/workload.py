@@ -0,0 +1,70 @@
+"""Deterministic synthetic chat workloads, built on Random Stream."""
+
+import random
+from dataclasses import dataclass
+from dataclasses import field
+from ai_stream.components.messages import Message
+from ai_stream.components.messages import UserMessage
+from ai_stream.components.random_assistant import CHART_POINTS
+from ai_stream.components.random_assistant import INPUT_WIDGET_TYPES
+from ai_stream.components.random_assistant import OUTPUT_WIDGET_TYPES
+from ai_stream.components.random_assistant import random_input_widget
+from ai_stream.components.random_assistant import random_output_widget
+from ai_stream.components.random_assistant import random_text
+
+
+@dataclass
+class WorkloadConfig:
+    """Configuration of a synthetic chat history."""
+
+    seed: int = 0
+    """Seed of the random generator, the same seed gives the same history."""
+    history_length: int = 100
+    """Number of history entries, user messages included."""
+    response_mix: dict[str, float] = field(
+        default_factory=lambda: {"output": 1.0, "input_widget": 1.0, "output_widget": 1.0}
+    )
+    """Relative weights of the assistant response types."""
+    output_widget_ratios: dict[str, float] = field(
+        default_factory=lambda: {
+            # Images are fetched from the internet, so they are left out by default
+            **dict.fromkeys(OUTPUT_WIDGET_TYPES, 1.0),
+            "Image": 0.0,
+        }
+    )
+    """Relative weights of the output widget types."""
+    input_widget_ratios: dict[str, float] = field(
+        default_factory=lambda: dict.fromkeys(INPUT_WIDGET_TYPES, 1.0)
+    )
+    """Relative weights of the input widget types."""
+    chart_points: int = CHART_POINTS
+    """Number of rows of each chart."""
+
+
+def _weighted_choice(rng: random.Random, weights: dict[str, float]) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def generate_history(config: WorkloadConfig) -> list[Message]:
+    """Generate a chat history of alternating user messages and random responses."""
+    rng = random.Random(config.seed)
+    history: list[Message] = []
+    while len(history) < config.history_length:
+        user_message = f"Message number {len(history)}"
+        history.append(UserMessage(content=user_message))
+        if len(history) == config.history_length:
+            break
+
+        response_type = _weighted_choice(rng, config.response_mix)
+        response: Message
+        if response_type == "output":
+            response = random_text(user_message, rng)
+        elif response_type == "output_widget":
+            widget_type = _weighted_choice(rng, config.output_widget_ratios)
+            response = random_output_widget(widget_type, rng, config.chart_points)
+        else:
+            widget_type = _weighted_choice(rng, config.input_widget_ratios)
+            response = random_input_widget(widget_type, len(history))
+        history.append(response)
+
+    return history
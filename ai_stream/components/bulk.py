@@ -0,0 +1,51 @@
+"""Import and export of whole tables as JSON Lines in the sidebar."""
+
+import io
+import tempfile
+import streamlit as st
+from ai_stream.components.catalog import catalog
+from ai_stream.db.aws import AIStreamTable
+from ai_stream.db.bulk import ImportReport
+from ai_stream.db.bulk import export_items
+from ai_stream.db.bulk import import_items
+from ai_stream.utils.app_state import AppState
+
+
+def bulk_import_export(app_state: AppState, table_cls: type[AIStreamTable]) -> None:
+    """Display the import and export of a whole table as JSON Lines in the sidebar."""
+    table_name = table_cls.Meta.table_name
+    with st.sidebar.expander("Import / Export"):
+        uploaded = st.file_uploader("JSON Lines", type=["jsonl"], key=f"import_{table_name}")
+        if uploaded and st.button("Import", key=f"import_button_{table_name}"):
+            progress_bar = st.progress(0.0)
+
+            def show_progress(report: ImportReport) -> None:
+                progress_bar.progress(
+                    min(uploaded.tell() / (uploaded.size or 1), 1.0),
+                    text=f"Imported {report.imported} items",
+                )
+
+            lines = io.TextIOWrapper(uploaded, encoding="utf-8")
+            report = import_items(lines, table_cls.__name__, progress=show_progress)
+            lines.detach()  # Keep the upload open
+            st.success(
+                f"{report.created} created, {report.updated} updated, "
+                f"{report.unchanged} unchanged."
+            )
+            if report.errors:
+                st.warning(
+                    "\n".join(f"* Line {number}: {message}" for number, message in report.errors)
+                )
+            catalog(table_cls.__name__).reload()  # Load the names of the imported items
+
+        if st.button("Export", key=f"export_{table_name}"):
+            with tempfile.TemporaryFile("w+", encoding="utf-8") as f:
+                count = export_items([table_cls], f)
+                f.seek(0)
+                st.download_button(
+                    f"Download {count} items",
+                    f,
+                    file_name=f"{table_name}.jsonl",
+                    mime="application/jsonl",
+                    key=f"download_{table_name}",
+                )
@@ -0,0 +1,263 @@
+"""Catalogs, search and prefetch of the items of the tables, shared by all sessions.
+
+Pages select items with `search_select`, which only sends the best matches
+to the browser, and read them with `get_item`, which waits for their
+prefetch instead of starting another lookup. Assistants are not in a
+table, so each session lists them with `load_assistants`.
+"""
+
+import time
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+from typing import TypeVar
+import streamlit as st
+from pynamodb.attributes import MapAttribute
+from pynamodb.exceptions import DoesNotExist
+from ai_stream.config import load_config
+from ai_stream.db.aws import PYNAMODB_TABLES
+from ai_stream.db.aws import AIStreamTable
+from ai_stream.db.aws import PromptsTable
+from ai_stream.db.aws import attributes_without_history
+from ai_stream.utils.app_state import AppState
+from ai_stream.utils.assistant_mirror import mirror_assistant
+from ai_stream.utils.catalog import Catalog
+from ai_stream.utils.catalog import CatalogView
+from ai_stream.utils.catalog import index_listener
+from ai_stream.utils.file_uploads import account_key
+from ai_stream.utils.prefetch import Prefetcher
+from ai_stream.utils.search import SearchIndex
+from ai_stream.utils.templates import IncludeIndex
+
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+config = load_config()
+Item = TypeVar("Item", bound=AIStreamTable)
+
+
+def search_text(item: AIStreamTable) -> str:
+    """Return the text of an item searched besides its name, e.g. a prompt body."""
+    value = getattr(item, "value", None)
+    if isinstance(value, MapAttribute):
+        return value.as_dict().get("description", "")
+    return value or ""
+
+
+@st.cache_resource
+def search_index(table_name: str) -> SearchIndex:
+    """Return the search index of a table, kept in sync with its catalog."""
+    return SearchIndex()
+
+
+@st.cache_resource
+def catalog(table_name: str) -> Catalog:
+    """Return the catalog of a table, shared by all sessions and loaded on first access.
+
+    Args:
+        table_name: Name of the table class, e.g. `PromptsTable`.
+    """
+    table_cls = PYNAMODB_TABLES[table_name]
+    # The include index needs the bodies of the prompts
+    is_prompts = table_cls is PromptsTable
+    with_text = config.search.index_text or is_prompts
+    attributes = ["id", "name", "value"] if with_text else ["id", "name"]
+
+    def load() -> Iterator[tuple[str, str, str]]:
+        items = table_cls.scan(attributes_to_get=attributes, page_size=config.bulk.chunk_size)
+        for item in items:
+            yield item.id, item.name, search_text(item)
+
+    table_catalog = Catalog(load)
+    table_catalog.subscribe(index_listener(search_index(table_name), config.search.index_text))
+    if is_prompts:
+        table_catalog.subscribe(index_listener(include_index()))
+    return table_catalog
+
+
+@st.cache_resource
+def include_index() -> IncludeIndex:
+    """Return the index of the includes of the prompts, kept in sync with their catalog.
+
+    Load the catalog of the prompts before reading it.
+    """
+    return IncludeIndex()
+
+
+@st.cache_resource
+def prefetcher() -> Prefetcher:
+    """Return the prefetcher of the items of the tables, shared by all sessions.
+
+    Items written through the catalogs are forgotten, and the others expire.
+    """
+    shared = Prefetcher(
+        config.prefetch.max_workers, config.prefetch.ttl_seconds, config.prefetch.max_entries
+    )
+    for table_name in PYNAMODB_TABLES:
+
+        def invalidate(item_id: str, name: str | None, text: str, table_name=table_name) -> None:
+            shared.invalidate((table_name, item_id))
+
+        catalog(table_name).subscribe(invalidate)
+    return shared
+
+
+def prefetch_items(table_cls: type[AIStreamTable], item_ids: Iterable[str]) -> None:
+    """Load items of a table in the background with a batch get."""
+    table_name = table_cls.__name__
+
+    def load(keys: list[tuple[str, str]]) -> dict:
+        items = table_cls.batch_get(
+            [item_id for _, item_id in keys],
+            attributes_to_get=attributes_without_history(table_cls),
+        )
+        return {(table_name, item.id): item for item in items}
+
+    prefetcher().prefetch_many([(table_name, item_id) for item_id in item_ids], load)
+
+
+def get_item(table_cls: type[Item], item_id: str) -> Item:
+    """Return an item of a table, prefetched if it was, raising `DoesNotExist` if there is none.
+
+    Items are shared by all sessions, so they must not be changed. Get them from
+    the table to update them. The version history of prompts is left out.
+    """
+
+    def load() -> Item:
+        return table_cls.get(item_id, attributes_to_get=attributes_without_history(table_cls))
+
+    return prefetcher().get((table_cls.__name__, item_id), load)
+
+
+def get_items(table_cls: type[Item], item_ids: list[str]) -> list[Item]:
+    """Return the existing items of a table, like `batch_get`, see `get_item`."""
+    prefetch_items(table_cls, item_ids)
+    items = []
+    for item_id in item_ids:
+        try:
+            items.append(get_item(table_cls, item_id))
+        except DoesNotExist:
+            continue
+    return items
+
+
+def invalidate_item(table_cls: type[AIStreamTable], item_id: str) -> None:
+    """Forget the prefetched item of a table, after updating it outside its catalog."""
+    prefetcher().invalidate((table_cls.__name__, item_id))
+
+
+def catalog_view(table_name: str) -> CatalogView:
+    """Return a new session view of the catalog of a table."""
+    return CatalogView(catalog(table_name), search_index(table_name))
+
+
+def search_select(
+    label: str,
+    items: CatalogView,
+    key: str,
+    prefetch: Callable[[str], None] | None = None,
+) -> str:
+    """Select an item in the sidebar among the best matches of a search.
+
+    Only the top matches are sent to the browser. Unsaved drafts are listed
+    first, and the selection is kept while searching.
+
+    Args:
+        label: Label of the selector.
+        items: Session view of the catalog of the items.
+        key: Widget key of the selector.
+        prefetch: Called with the selected item, then with its neighbours in
+            the options, to load them in the background.
+    """
+    query = st.sidebar.text_input(f"Search {label.removeprefix('Select ')}", key=f"{key}_query")
+    options = items.search(query, config.search.max_results)
+    selected = st.session_state.get(key)
+    if isinstance(selected, str) and selected in items and selected not in options:
+        options.insert(0, selected)
+    if not options:
+        st.sidebar.warning("No matches.")
+        st.stop()
+    selected = st.sidebar.selectbox(label, options, format_func=lambda x: items[x], key=key)
+    if prefetch:
+        index = options.index(selected)
+        count = config.prefetch.neighbours
+        neighbours = (
+            options[index + 1 : index + 1 + count] + options[max(index - count, 0) : index]
+        )
+        for item_id in [selected, *neighbours]:
+            prefetch(item_id)
+    return selected
+
+
+def search_multiselect(label: str, items: CatalogView, key: str, default: list[str]) -> list[str]:
+    """Select items in the sidebar among the best matches of a search.
+
+    Only the selected items and the top matches are sent to the browser, and
+    the selection is kept while searching.
+
+    Args:
+        label: Label of the selector.
+        items: Session view of the catalog of the items.
+        key: Key of the selection in the session state, e.g. per assistant.
+        default: IDs selected at first, those not in the catalog are dropped.
+    """
+    query = st.sidebar.text_input(f"Search {label.removeprefix('Select ')}", key=f"{key}_query")
+    selected_key = f"{key}_selected"
+    if selected_key not in st.session_state:
+        st.session_state[selected_key] = [item_id for item_id in default if item_id in items]
+    selected = st.session_state[selected_key]
+    options = list(dict.fromkeys([*selected, *items.search(query, config.search.max_results)]))
+    selected = st.sidebar.multiselect(
+        label, options, default=selected, format_func=lambda x: items[x]
+    )
+    st.session_state[selected_key] = selected
+    return selected
+
+
+def select_assistant(
+    assistants: CatalogView, prefetch: Callable[[str], None] | None = None
+) -> tuple:
+    """Select assistant and return its ID and name."""
+    if not assistants:
+        st.warning("No assistants yet. Click 'New Assistant' to create one.")
+        st.stop()
+
+    assistant_id = search_select(
+        "Select Assistant", assistants, key="select_asst", prefetch=prefetch
+    )
+    st.sidebar.caption(f"ID: {assistant_id}")
+
+    return assistant_id, assistants[assistant_id]
+
+
+def load_assistants(app_state: AppState, client: "OpenAI") -> None:
+    """List the assistants once per session, and again every `assistants.list_ttl_seconds`.
+
+    Assistants saved in the session are added to it when they are saved, so
+    only changes made elsewhere wait for the next listing. Changing the API
+    key or the project lists the assistants of the new account right away.
+    """
+    account = account_key(client)
+    age = time.monotonic() - app_state.assistants_listed
+    if account == app_state.assistants_account:
+        if age < config.assistants.list_ttl_seconds:
+            return
+    elif app_state.assistants_account:  # Another API key or project
+        app_state.assistants = CatalogView.standalone()
+        app_state.assistant_metadata.clear()
+        app_state.assistant_mirrors.clear()
+
+    # Iterating over the pages of the list
+    listed = set()
+    for asst in client.beta.assistants.list(limit=100):
+        text = (asst.instructions or "") if config.search.index_text else ""
+        app_state.assistants.publish(asst.id, asst.name or "", text)
+        app_state.assistant_metadata[asst.id] = dict(asst.metadata or {})  # type: ignore[call-overload]
+        mirror_assistant(app_state.assistant_mirrors, asst)
+        listed.add(asst.id)
+    for assistant_id in set(app_state.assistants.catalog.ids()) - listed:  # Deleted elsewhere
+        app_state.assistants.remove(assistant_id)
+    app_state.assistants_account = account
+    app_state.assistants_listed = time.monotonic()
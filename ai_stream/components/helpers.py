@@ -1,6 +1,8 @@
 """Miscellaneous components."""
 
-import json
+import time
+from collections.abc import Iterable
+from copy import deepcopy
 from typing import override
 import streamlit as st
 from openai import AssistantEventHandler
@@ -8,35 +10,83 @@ from openai.types.beta import AssistantStreamEvent
 from openai.types.beta.threads import Run
 from openai.types.beta.threads import Text
 from openai.types.beta.threads import TextDelta
+from openai.types.beta.threads.runs import CodeInterpreterToolCall
+from openai.types.beta.threads.runs import FunctionToolCall
 from openai.types.beta.threads.runs import ToolCall
 from openai.types.beta.threads.runs import ToolCallDelta
 from streamlit.delta_generator import DeltaGenerator
+from streamlit.errors import StreamlitAPIException
 from ai_stream.components.messages import AssistantMessage
+from ai_stream.components.messages import CodeInterpreterMessage
 from ai_stream.components.messages import InputWidget
+from ai_stream.components.messages import OutputWidget
 from ai_stream.components.messages import UserMessage
 from ai_stream.components.tools import TOOLS
+from ai_stream.components.tools import ToolArgumentsError
+from ai_stream.components.tools import known_tool_arguments
+from ai_stream.components.tools import validate_tool_arguments
 from ai_stream.config import get_logger
+from ai_stream.config import load_config
 from ai_stream.utils.app_state import AppState
+from ai_stream.utils.cassettes import CassettePlayer
+from ai_stream.utils.cassettes import CassetteRecorder
+from ai_stream.utils.partial_json import PartialJsonParser
 
 
 PROCESSING_REFRESH = "`Processing...`"
 logger = get_logger(__name__)
+config = load_config()
+
+
+def code_interpreter_message(tool_call: CodeInterpreterToolCall) -> CodeInterpreterMessage:
+    """Return the code and outputs of a code interpreter call as a message."""
+    logs = []
+    image_file_ids = []
+    for output in tool_call.code_interpreter.outputs:
+        if output.type == "logs":
+            logs.append(output.logs)
+        else:
+            image_file_ids.append(output.image.file_id)
+    return CodeInterpreterMessage(
+        content=tool_call.code_interpreter.input,
+        logs="\n".join(logs),
+        image_file_ids=image_file_ids,
+    )
 
 
 class StreamAssistantEventHandler(AssistantEventHandler):
-    """Event handler for Stream Assistant."""
+    """Event handler for Stream Assistant.
+
+    Widget tools are previewed while their arguments stream in, and replaced
+    by the final widgets once the run requires action.
+
+    Pass a `recorder` to persist every stream event of the run in a cassette,
+    or a `player` and call `replay` to render a recorded run without the API.
+    """
 
     def __init__(
         self,
         *args: list,
         app_state: AppState,
         st_placeholder: DeltaGenerator,
+        recorder: CassetteRecorder | None = None,
+        player: CassettePlayer | None = None,
         **kwargs: dict,
     ):
         """Initialise."""
         self.app_state = app_state
         self.client = app_state.openai_client
         self.st_placeholder = st_placeholder
+        self.recorder = recorder
+        self.player = player
+        self.previews: dict[str, tuple[DeltaGenerator, dict]] = {}
+        """Placeholders and previewed arguments of widget tool calls by ID."""
+        self.parsers: dict[str, PartialJsonParser] = {}
+        """Parsers of the streamed arguments of widget tool calls by ID."""
+        self.last_preview_render = float("-inf")
+        """Time of the last update of a previewed widget tool call."""
+        self.last_code_render = float("-inf")
+        """Time of the last update of the streamed code interpreter call."""
         with self.st_placeholder:
             st.write(PROCESSING_REFRESH)
         super().__init__(*args, **kwargs)
@@ -58,39 +108,99 @@ class StreamAssistantEventHandler(AssistantEventHandler):
     @override
     def on_tool_call_created(self, tool_call: ToolCall) -> None:
         self.st_placeholder = st.empty()
+        if isinstance(tool_call, FunctionToolCall):
+            self.previews[tool_call.id] = (self.st_placeholder, {})
 
     @override
     def on_tool_call_delta(self, delta: ToolCallDelta, snapshot: ToolCall) -> None:
-        # TODO: display code
-        if delta.type == "code_interpreter":
-            assert delta.code_interpreter
-            if delta.code_interpreter.input:
-                print(delta.code_interpreter.input, end="", flush=True)
-            if delta.code_interpreter.outputs:
-                print("\n\noutput >", flush=True)
-                for output in delta.code_interpreter.outputs:
-                    if output.type == "logs":
-                        print(f"\n{output.logs}", flush=True)
+        if isinstance(snapshot, FunctionToolCall):
+            self.preview_tool_call(
+                snapshot.id, snapshot.function.name, snapshot.function.arguments
+            )
+        elif isinstance(snapshot, CodeInterpreterToolCall):
+            # The snapshot accumulates the deltas, only render it at a limited rate
+            now = time.monotonic()
+            if now - self.last_code_render >= config.code_interpreter.render_interval:
+                self.last_code_render = now
+                with self.st_placeholder.container():
+                    code_interpreter_message(snapshot).render()
 
     @override
     def on_tool_call_done(self, tool_call: ToolCall) -> None:
-        # TODO: Store tool type and data for later displaying
-        pass
+        if isinstance(tool_call, CodeInterpreterToolCall):
+            message = code_interpreter_message(tool_call)
+            with self.st_placeholder.container():
+                message.render()
+            self.app_state.history.append(message)
+            logger.info(
+                f"Code interpreter call {tool_call.id}:\n{message.content}\n"
+                f"Logs:\n{message.logs}\nImages: {message.image_file_ids}"
+            )
 
     @override
     def on_event(self, event: AssistantStreamEvent) -> None:
+        if self.recorder:
+            self.recorder.record(event)
         if event.event == "thread.run.requires_action":
+            self.clear_previews()
             run_id = event.data.id  # Retrieve the run ID from the event data
             with self.st_placeholder.container():
                 self.handle_requires_action(event.data, run_id)
 
+    def preview_tool_call(self, tool_call_id: str, tool_name: str, arguments: str) -> None:
+        """Render a disabled widget tool with the arguments streamed so far."""
+        tool_cls = TOOLS.get(tool_name)
+        if tool_cls is None or not issubclass(tool_cls, InputWidget | OutputWidget):
+            return
+        parser = self.parsers.setdefault(tool_call_id, PartialJsonParser())
+        parser.feed(arguments[len(parser.text) :])  # Only scan the new delta
+        # The arguments accumulate, only preview them at a limited rate
+        now = time.monotonic()
+        if now - self.last_preview_render < config.widgets.preview_interval:
+            return
+        kwargs = known_tool_arguments(tool_name, parser.value())
+        placeholder, previous = self.previews.get(tool_call_id, (self.st_placeholder, {}))
+        if not kwargs or kwargs == previous:  # Only re-render on new arguments
+            return
+        self.last_preview_render = now
+        self.previews[tool_call_id] = (placeholder, kwargs)
+        preview = tool_cls()  # type: ignore[call-arg]
+        try:
+            preview._run(**deepcopy(kwargs))
+            if isinstance(preview, InputWidget):
+                preview.disable()
+            with placeholder.container():
+                preview.render()
+        except (TypeError, ValueError, StreamlitAPIException) as e:
+            # Arguments may be insufficient until more of them arrive
+            logger.debug(f"Cannot preview {tool_name} yet: {e}")
+
+    def clear_previews(self) -> None:
+        """Remove the previews of tool calls."""
+        for placeholder, _ in self.previews.values():
+            placeholder.empty()
+        self.previews.clear()
+        self.parsers.clear()
+
+    def replay(self) -> None:
+        """Feed the run stream of the cassette through the handler."""
+        assert self.player
+        for event in self.player.next_segment():
+            self._emit_sse_event(event)
+
     def handle_requires_action(self, data: Run, run_id: str) -> None:
         """Call tools."""
         tool_outputs = []
         assert data.required_action
         for tool in data.required_action.submit_tool_outputs.tool_calls:
-            kwargs = json.loads(tool.function.arguments)
             tool_name = tool.function.name
+            try:
+                kwargs = validate_tool_arguments(tool_name, tool.function.arguments)
+            except ToolArgumentsError as e:
+                # Let the model correct its call instead of failing to render
+                logger.warning(str(e))
+                tool_outputs.append({"tool_call_id": tool.id, "output": e.to_output()})
+                continue
             logger.info(f"Running tool {tool_name}.")
             # TODO: Displaying here is redundant
             tool_message = TOOLS[tool_name]()
@@ -107,19 +217,33 @@ class StreamAssistantEventHandler(AssistantEventHandler):
 
     def submit_tool_outputs(self, tool_outputs: list, run_id: str) -> str:
         """Use the submit_tool_outputs_stream helper."""
+        if self.player:
+            return self.write_text_deltas(self.player.next_segment())
         assert self.current_run
         assert self.client
+        if self.recorder:
+            self.recorder.next_segment()
         with self.client.beta.threads.runs.submit_tool_outputs_stream(
             thread_id=self.current_run.thread_id,
             run_id=self.current_run.id,
             tool_outputs=tool_outputs,
         ) as stream:
-            res = ""
-            with st.empty():
-                for text in stream.text_deltas:
-                    res += text
-                    st.write(res)
-            return res
+            return self.write_text_deltas(stream)
+
+    def write_text_deltas(self, events: Iterable[AssistantStreamEvent]) -> str:
+        """Display the text of the streamed message and return it."""
+        res = ""
+        with st.empty():
+            for event in events:
+                if self.recorder:
+                    self.recorder.record(event)
+                if event.event != "thread.message.delta":
+                    continue
+                for content in event.data.delta.content or []:
+                    if content.type == "text" and content.text and content.text.value:
+                        res += content.text.value
+                        st.write(res)
+        return res
 
 
 def display_used_by(used_by: list[str]) -> None:
@@ -131,23 +255,6 @@ def display_used_by(used_by: list[str]) -> None:
         st.markdown("`None`")
 
 
-def select_assistant(assistants: dict) -> tuple:
-    """Select assistant and return its ID and name."""
-    if not assistants:
-        st.warning("No assistants yet. Click 'New Assistant' to create one.")
-        st.stop()
-
-    assistant_id = st.sidebar.selectbox(
-        "Select Assistant",
-        options=assistants,
-        format_func=lambda x: assistants[x],
-        key="select_asst",
-    )
-    st.sidebar.caption(f"ID: {assistant_id}")
-
-    return assistant_id, assistants[assistant_id]
-
-
 def render_history(history: list):
     """Display chat history."""
     last_user_msg_index = None
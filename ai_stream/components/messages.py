@@ -7,10 +7,25 @@ import pandas as pd
 import streamlit as st
 from pydantic import BaseModel
 from pydantic import Field
+from pydantic import PrivateAttr
 from ai_stream import ASSISTANT_LABEL
 from ai_stream import USER_LABEL
 from ai_stream.components.tools import Tool
 from ai_stream.components.tools import register_tool
+from ai_stream.config import get_logger
+from ai_stream.config import load_config
+from ai_stream.utils import create_id
+from ai_stream.utils.downsampling import aggregate_bars
+from ai_stream.utils.downsampling import downsample_lines
+from ai_stream.utils.image_cache import ImageCache
+from ai_stream.utils.widget_data import count_pages
+from ai_stream.utils.widget_data import page_frame
+from ai_stream.utils.widget_data import query_frame
+from ai_stream.utils.widget_data import to_frame
+
+
+config = load_config()
+logger = get_logger(__name__)
 
 
 # Message registry to keep track of all message types
@@ -57,6 +72,28 @@ class AssistantMessage(Message):
             st.write(self.content)
 
 
+@register_message
+class CodeInterpreterMessage(Message):
+    """Code run by the code interpreter, with its outputs.
+
+    The code is the content of the message.
+    """
+
+    logs: str = ""
+    """Logs output by the code."""
+    image_file_ids: list[str] = Field(default_factory=list)
+    """OpenAI file IDs of images output by the code."""
+
+    def render(self) -> None:
+        """Render the code and its outputs."""
+        with st.chat_message(ASSISTANT_LABEL):
+            st.code(self.content or "", language="python")
+            if self.logs:
+                st.code(self.logs, language="text")
+            for file_id in self.image_file_ids:
+                st.caption(f"Image output `{file_id}`")
+
+
 class InputWidget(Message):
     """Base class for assistant messages with input widgets."""
 
@@ -229,28 +266,108 @@ class OutputWidget(Message):
         pass
 
 
+class DataFrameWidget(OutputWidget):
+    """Base class for output widgets displaying tabular data.
+
+    The data is converted into a DataFrame once, when set, and reused by every
+    render instead of being rebuilt on each rerun. Subclasses can reduce the
+    displayed data with `downsample`, while the full data stays on the server
+    and can be downloaded.
+    """
+
+    widget_id: str = Field(default_factory=create_id)
+    _frame: pd.DataFrame | None = PrivateAttr(None)
+    _display_frame: pd.DataFrame | None = PrivateAttr(None)
+    _csv: bytes | None = PrivateAttr(None)
+
+    def model_post_init(self, __context: Any) -> None:
+        """Convert the initial widget data."""
+        if getattr(self, "widget_data", None) is not None:
+            self._set_frame(to_frame(self.widget_data))
+
+    def _set_frame(self, frame: pd.DataFrame) -> None:
+        self._frame = frame
+        self._display_frame = self.downsample(frame)
+        self._csv = None
+
+    def downsample(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Return the data to display, the full data by default."""
+        return frame
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """The widget data as a DataFrame."""
+        if self._frame is None:
+            self._set_frame(to_frame(self.widget_data))
+        assert self._frame is not None
+        return self._frame
+
+    @property
+    def display_frame(self) -> pd.DataFrame:
+        """The data to display."""
+        if self._display_frame is None:
+            self._set_frame(self.frame)
+        assert self._display_frame is not None
+        return self._display_frame
+
+    def render_download(self) -> None:
+        """Offer the full data for download if only part of it is displayed."""
+        if len(self.display_frame) == len(self.frame):
+            return
+        st.caption(f"Showing {len(self.display_frame)} of {len(self.frame)} rows.")
+        if self._csv is None:
+            self._csv = self.frame.to_csv().encode()
+        st.download_button(
+            "Download full data",
+            data=self._csv,
+            file_name="data.csv",
+            mime="text/csv",
+            key=f"download_{self.widget_id}",
+        )
+
+
 @register_message
-class LineChart(OutputWidget):
+class LineChart(DataFrameWidget):
     """Assistant message that displays a line chart."""
 
+    def downsample(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Keep the shape of each line within the point budget."""
+        return downsample_lines(frame, config.widgets.max_line_points)
+
     def render(self) -> None:
         """Render the line chart."""
         with st.chat_message(ASSISTANT_LABEL):
             st.write("Here's a line chart based on data:")
-            chart_data = pd.DataFrame(self.widget_data)
-            st.line_chart(chart_data)
+            st.line_chart(self.display_frame)
+            self.render_download()
 
 
 @register_message
-class BarChart(OutputWidget):
+class BarChart(DataFrameWidget):
     """Assistant message that displays a bar chart."""
 
+    def downsample(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Keep the largest bars and aggregate the rest."""
+        return aggregate_bars(frame, config.widgets.max_bars)
+
     def render(self) -> None:
         """Render the bar chart."""
         with st.chat_message(ASSISTANT_LABEL):
             st.write("Here's a bar chart based on data:")
-            chart_data = pd.DataFrame(self.widget_data)
-            st.bar_chart(chart_data)
+            st.bar_chart(self.display_frame)
+            self.render_download()
+
+
+@st.cache_resource
+def get_image_cache() -> ImageCache:
+    """Return the image cache shared by all sessions."""
+    return ImageCache(
+        directory=config.image_cache.directory,
+        max_bytes=config.image_cache.max_bytes,
+        thumbnail_width=config.image_cache.thumbnail_width,
+        failure_ttl=config.image_cache.failure_ttl_seconds,
+        max_image_bytes=config.image_cache.max_image_bytes,
+    )
 
 
 @register_message
@@ -258,18 +375,21 @@ class Image(OutputWidget):
     """Assistant message that displays an image."""
 
     def render(self) -> None:
-        """Render the image."""
+        """Render the image from the local cache, or from its URL until it is cached."""
+        url = self.widget_data["url"]
+        try:
+            image: bytes | str = get_image_cache().cached_thumbnail(url) or url
+        except Exception as e:  # Let the browser try to load the image itself
+            logger.warning(f"Failed to cache image {url}: {e}")
+            image = url
         with st.chat_message(ASSISTANT_LABEL):
             st.write("Here's an image:")
-            st.image(
-                self.widget_data["url"],
-                caption=self.widget_data.get("caption", ""),
-            )
+            st.image(image, caption=self.widget_data.get("caption", ""))
 
 
 @register_message
 @register_tool
-class Table(OutputWidget):
+class Table(DataFrameWidget):
     """Assistant message that displays a table."""
 
     class TableSchema(BaseModel):
@@ -282,17 +402,56 @@ class Table(OutputWidget):
     args_schema: type[BaseModel] = TableSchema
     name: str = "Table"
     description: str = "Tool for displaying a table."
-    widget_data: dict[str, Any] = {}
+    widget_data: dict[str, Any] = Field(default_factory=dict)
+    _query: tuple = PrivateAttr(("", None, True))
+    _query_result: pd.DataFrame | None = PrivateAttr(None)
 
     def _run(self, **kwargs: dict) -> None:
-        self.widget_data.update(kwargs)
+        self.widget_data = dict(kwargs)
+        self._set_frame(to_frame(self.widget_data))
+        self._query_result = None
+
+    def query(self, search: str, sort_by: str | None, ascending: bool) -> pd.DataFrame:
+        """Filter and sort the table, reusing the result while the query is unchanged."""
+        query = (search, sort_by, ascending)
+        if self._query_result is None or query != self._query:
+            self._query = query
+            self._query_result = query_frame(self.frame, search, sort_by, ascending)
+        return self._query_result
 
     def render(self) -> None:
-        """Render the table."""
+        """Render the table.
+
+        Large tables are searched, sorted and paged on the server, so only the
+        visible page is sent to the browser.
+        """
+        page_size = config.widgets.table_page_size
         with st.chat_message(ASSISTANT_LABEL):
             st.write("Here's a table of data:")
-            table_data = pd.DataFrame(self.widget_data)
-            st.table(table_data)
+            if len(self.frame) <= page_size:
+                st.dataframe(self.frame)
+                return
+
+            search_col, sort_col, order_col = st.columns([2, 2, 1])
+            search = search_col.text_input("Search", key=f"search_{self.widget_id}")
+            sort_by = sort_col.selectbox(
+                "Sort by",
+                options=[None, *self.frame.columns],
+                format_func=lambda x: "-" if x is None else str(x),
+                key=f"sort_{self.widget_id}",
+            )
+            ascending = order_col.toggle("Ascending", value=True, key=f"asc_{self.widget_id}")
+            result = self.query(search, sort_by, ascending)
+
+            n_pages = count_pages(len(result), page_size)
+            page = st.number_input(
+                f"Page (of {n_pages})",
+                min_value=1,
+                max_value=n_pages,
+                key=f"page_{self.widget_id}",
+            )
+            st.dataframe(page_frame(result, page, page_size))
+            st.caption(f"{len(result)} of {len(self.frame)} rows.")
 
 
 @register_message
@@ -0,0 +1,40 @@
+"""Compilation of prompts and of the prompts they include."""
+
+from collections.abc import Mapping
+from ai_stream.components.catalog import catalog
+from ai_stream.components.catalog import get_item
+from ai_stream.components.catalog import get_items
+from ai_stream.components.catalog import include_index
+from ai_stream.db.aws import PromptsTable
+from ai_stream.utils.templates import Template
+from ai_stream.utils.templates import TemplateError
+from ai_stream.utils.templates import compile_template
+from ai_stream.utils.templates import resolve_includes
+
+
+def compile_prompt(prompts: Mapping[str, str], text: str) -> tuple[Template, dict[str, Template]]:
+    """Compile a prompt and the prompts it includes, raising a `TemplateError` if invalid.
+
+    Args:
+        prompts: Prompt IDs and names, e.g. `app_state.prompts`.
+        text: Text of the prompt.
+    """
+    ids = {name: prompt_id for prompt_id, name in prompts.items()}
+
+    def load(name: str) -> str:
+        if name not in ids:
+            raise TemplateError(f"No prompt named {name!r}.")
+        return get_item(PromptsTable, ids[name]).value
+
+    template = compile_template(text)
+    return template, resolve_includes(template, load)
+
+
+def dependent_prompts(prompt_name: str) -> list[PromptsTable]:
+    """Return the prompts including the given prompt, directly or not.
+
+    Prompts are found with the include index instead of compiling all of them,
+    see `include_index`.
+    """
+    catalog(PromptsTable.__name__).load()
+    return get_items(PromptsTable, include_index().dependents(prompt_name))
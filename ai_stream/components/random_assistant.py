@@ -4,154 +4,155 @@ import random
 from typing import Any
 import numpy as np
 from ai_stream.components.messages import AssistantMessage
+from ai_stream.components.messages import Message
 from ai_stream.components.messages import message_registry
 
 
-def generate_random_response(user_message: str, message_counter: int) -> Any:
+RESPONSE_TYPES = ["input_widget", "output", "output_widget"]
+OUTPUT_WIDGET_TYPES = ["LineChart", "BarChart", "Image", "Table", "Markdown"]
+INPUT_WIDGET_TYPES = [
+    "TextInput",
+    "Selectbox",
+    "Slider",
+    "Checkbox",
+    "DateInput",
+    "TimeInput",
+    "NumberInput",
+    "TextArea",
+]
+CHART_POINTS = 20
+
+
+def random_text(user_message: str, rng: random.Random) -> AssistantMessage:
+    """Return a random text reply to the user message."""
+    possible_messages = [
+        f"Thanks for sharing: {user_message}",
+        "Could you elaborate on that?",
+        "Interesting point!",
+        "I appreciate your input.",
+        "Let's discuss further.",
+        "That's a great question.",
+        "I see. Tell me more.",
+        f"You said: {user_message}. Let's explore that.",
+        "What makes you say that?",
+        "How does that make you feel?",
+    ]
+    message_choice = rng.choice(possible_messages)
+    return AssistantMessage(content=message_choice)
+
+
+def random_output_widget(
+    widget_type: str, rng: random.Random, chart_points: int = CHART_POINTS
+) -> Message:
+    """Return an output widget of the given type with random data.
+
+    Args:
+        widget_type: One of `OUTPUT_WIDGET_TYPES`.
+        rng: Source of randomness.
+        chart_points: Number of rows of chart data.
+
+    Returns:
+        The assistant's message.
+    """
+    if widget_type in ["LineChart", "BarChart"]:
+        np_rng = np.random.default_rng(rng.getrandbits(32))
+        widget_data: Any = np_rng.standard_normal((chart_points, 3))
+    elif widget_type == "Image":
+        widget_data = {
+            "url": "https://via.placeholder.com/150",
+            "caption": "A placeholder image",
+        }
+    elif widget_type == "Table":
+        widget_data = {
+            "Column 1": ["A", "B", "C"],
+            "Column 2": [1, 2, 3],
+            "Column 3": [4.5, 5.5, 6.5],
+        }
+    else:
+        widget_data = {
+            "content": (
+                "### This is a Markdown header\n\nHere is some **bold** text and *italic* text."
+            )
+        }
+
+    # Convert widget_type to class name and retrieve from the registry
+    message_class = message_registry.get(widget_type)
+
+    if message_class:
+        return message_class(widget_data=widget_data)
+    # Handle unknown widget type
+    return AssistantMessage(content="Sorry, I encountered an unknown widget type.")
+
+
+def random_input_widget(widget_type: str, message_counter: int) -> Message:
+    """Return an input widget of the given type.
+
+    Args:
+        widget_type: One of `INPUT_WIDGET_TYPES`.
+        message_counter: Used for distinguishing widget keys.
+
+    Returns:
+        The assistant's message.
+    """
+    possible_widgets: dict[str, dict[str, Any]] = {
+        "TextInput": {
+            "label": "Assistant asks: Please provide your name:",
+        },
+        "Selectbox": {
+            "label": "Assistant asks: Choose your favorite color:",
+            "options": ["Red", "Green", "Blue", "Yellow", "Purple", "Orange"],
+        },
+        "Slider": {
+            "label": "Assistant asks: Rate your experience from 1 to 10:",
+            "min_value": 1,
+            "max_value": 10,
+            "value": 5,
+        },
+        "Checkbox": {"label": "Assistant asks: Do you agree with the terms?"},
+        "DateInput": {"label": "Assistant asks: Select your birth date:"},
+        "TimeInput": {
+            "label": "Assistant asks: What time works best for you?",
+            "value": "now",
+        },
+        "NumberInput": {
+            "label": "Assistant asks: Enter a number:",
+            "min_value": 0,
+            "max_value": 100,
+            "value": 50,
+        },
+        "TextArea": {"label": "Assistant asks: Please describe your issue in detail:"},
+    }
+    widget_config = possible_widgets.get(widget_type, {})
+    widget_config["key"] = f"widget_{message_counter}"
+
+    # Convert widget_type to class name and retrieve from the registry
+    message_class = message_registry.get(widget_type)
+
+    if message_class:
+        return message_class(widget_config=widget_config)
+    # Handle unknown widget type
+    return AssistantMessage(content="Sorry, I encountered an unknown widget type.")
+
+
+def generate_random_response(
+    user_message: str, message_counter: int, rng: random.Random | None = None
+) -> Any:
     """Generate a random assistant response based on the user message.
 
     Args:
         user_message: The message provided by the user.
         message_counter: Used for distinguishing widget keys.
+        rng: Source of randomness, pass a seeded one for reproducible responses.
 
     Returns:
         The assistant's message.
     """
-    response_type = random.choice(["input_widget", "output", "output_widget"])
+    rng = rng or random.Random()
+    response_type = rng.choice(RESPONSE_TYPES)
 
     if response_type == "output":
-        possible_messages = [
-            f"Thanks for sharing: {user_message}",
-            "Could you elaborate on that?",
-            "Interesting point!",
-            "I appreciate your input.",
-            "Let's discuss further.",
-            "That's a great question.",
-            "I see. Tell me more.",
-            f"You said: {user_message}. Let's explore that.",
-            "What makes you say that?",
-            "How does that make you feel?",
-        ]
-        message_choice = random.choice(possible_messages)
-        return AssistantMessage(content=message_choice)
-
+        return random_text(user_message, rng)
     elif response_type == "output_widget":
-        possible_output_widgets = [
-            {"widget_type": "LineChart", "widget_data": np.random.randn(20, 3).tolist()},
-            {"widget_type": "BarChart", "widget_data": np.random.randn(20, 3).tolist()},
-            {
-                "widget_type": "Image",
-                "widget_data": {
-                    "url": "https://via.placeholder.com/150",
-                    "caption": "A placeholder image",
-                },
-            },
-            {
-                "widget_type": "Table",
-                "widget_data": {
-                    "Column 1": ["A", "B", "C"],
-                    "Column 2": [1, 2, 3],
-                    "Column 3": [4.5, 5.5, 6.5],
-                },
-            },
-            {
-                "widget_type": "Markdown",
-                "widget_data": {
-                    "content": (
-                        "### This is a Markdown header\n\nHere is some **bold** "
-                        "text and *italic* text."
-                    )
-                },
-            },
-        ]
-        selected_widget = random.choice(possible_output_widgets)
-        widget_type = selected_widget["widget_type"]
-        widget_data = selected_widget["widget_data"]
-
-        # Convert widget_type to class name and retrieve from the registry
-        message_class = message_registry.get(widget_type)
-
-        if message_class:
-            assistant_output_widget_message = message_class(widget_data=widget_data)
-            return assistant_output_widget_message
-        else:
-            # Handle unknown widget type
-            assistant_message = AssistantMessage(
-                content="Sorry, I encountered an unknown widget type."
-            )
-            return assistant_message
-
+        return random_output_widget(rng.choice(OUTPUT_WIDGET_TYPES), rng)
     else:  # response_type == "input_widget"
-        key = {"key": f"widget_{message_counter}"}
-
-        possible_widgets = [
-            {
-                "widget_type": "TextInput",
-                "widget_config": {
-                    "label": "Assistant asks: Please provide your name:",
-                },
-            },
-            {
-                "widget_type": "Selectbox",
-                "widget_config": {
-                    "label": "Assistant asks: Choose your favorite color:",
-                    "options": ["Red", "Green", "Blue", "Yellow", "Purple", "Orange"],
-                },
-            },
-            {
-                "widget_type": "Slider",
-                "widget_config": {
-                    "label": "Assistant asks: Rate your experience from 1 to 10:",
-                    "min_value": 1,
-                    "max_value": 10,
-                    "value": 5,
-                },
-            },
-            {
-                "widget_type": "Checkbox",
-                "widget_config": {"label": "Assistant asks: Do you agree with the terms?"},
-            },
-            {
-                "widget_type": "DateInput",
-                "widget_config": {"label": "Assistant asks: Select your birth date:"},
-            },
-            {
-                "widget_type": "TimeInput",
-                "widget_config": {
-                    "label": "Assistant asks: What time works best for you?",
-                    "value": "now",
-                },
-            },
-            {
-                "widget_type": "NumberInput",
-                "widget_config": {
-                    "label": "Assistant asks: Enter a number:",
-                    "min_value": 0,
-                    "max_value": 100,
-                    "value": 50,
-                },
-            },
-            {
-                "widget_type": "TextArea",
-                "widget_config": {
-                    "label": "Assistant asks: Please describe your issue in detail:"
-                },
-            },
-        ]
-        selected_widget = random.choice(possible_widgets)
-        widget_type = selected_widget["widget_type"]
-        widget_config = selected_widget["widget_config"]
-        widget_config.update(key)
-
-        # Convert widget_type to class name and retrieve from the registry
-        message_class = message_registry.get(widget_type)
-
-        if message_class:
-            assistant_widget_message = message_class(widget_config=widget_config)
-            return assistant_widget_message
-        else:
-            # Handle unknown widget type
-            assistant_message = AssistantMessage(
-                content="Sorry, I encountered an unknown widget type."
-            )
-            return assistant_message
+        return random_input_widget(rng.choice(INPUT_WIDGET_TYPES), message_counter)
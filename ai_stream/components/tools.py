@@ -1,13 +1,17 @@
 """Tool related definitions."""
 
+import json
 from collections.abc import Callable
+from functools import cache
 from typing import Any
 from langchain_core.tools import BaseTool
-from langchain_core.utils.function_calling import convert_to_openai_function
 from pydantic import BaseModel
+from pydantic import ValidationError
 from pynamodb.exceptions import DoesNotExist
 from ai_stream.config import get_logger
 from ai_stream.db.aws import FunctionsTable
+from ai_stream.utils.function_tools import get_openai_function
+from ai_stream.utils.partial_json import parse_partial_json
 
 
 logger = get_logger(__name__)
@@ -24,12 +28,98 @@ class Tool(BaseTool):
 TOOLS: dict[str, type[Tool]] = {}
 
 
+class ToolArgumentsError(ValueError):
+    """Raised when a tool is called with invalid arguments."""
+
+    def __init__(self, tool_name: str, errors: list[dict[str, Any]]):
+        """Initialise."""
+        self.tool_name = tool_name
+        self.errors = errors
+        super().__init__(f"Invalid arguments for tool {tool_name}: {errors}")
+
+    def to_output(self) -> str:
+        """Return the error as a tool output for the model."""
+        return json.dumps(
+            {"error": "invalid_arguments", "tool": self.tool_name, "details": self.errors},
+            default=str,
+        )
+
+
+@cache
+def get_args_schema(tool_cls: type[Tool]) -> type[BaseModel]:
+    """Return the arguments schema of a tool class."""
+    return getattr(tool_cls, f"{tool_cls.__name__}Schema")
+
+
+def validate_tool_arguments(tool_name: str, arguments: str) -> dict[str, Any]:
+    """Validate the JSON arguments of a tool call against the schema of the tool.
+
+    Parsing and validation are done in a single pass by the compiled validator
+    of the schema, which Pydantic builds once per schema class.
+
+    Args:
+        tool_name: Name of the called tool.
+        arguments: The JSON encoded arguments sent by the model.
+
+    Returns:
+        The arguments explicitly set by the model.
+
+    Raises:
+        ToolArgumentsError: If the tool is unknown or the arguments are invalid.
+    """
+    tool_cls = TOOLS.get(tool_name)
+    if tool_cls is None:
+        raise ToolArgumentsError(
+            tool_name, [{"type": "unknown_tool", "msg": f"Tool {tool_name} does not exist."}]
+        )
+    try:
+        args = get_args_schema(tool_cls).model_validate_json(arguments or "{}")
+    except ValidationError as e:
+        errors = e.errors(include_url=False, include_context=False, include_input=False)
+        raise ToolArgumentsError(tool_name, errors) from e  # type: ignore[arg-type]
+
+    return {name: getattr(args, name) for name in args.model_fields_set}
+
+
+def preview_tool_arguments(tool_name: str, arguments: str) -> dict[str, Any]:
+    """Return the arguments of a tool call streamed so far, for previewing the tool.
+
+    Unlike `validate_tool_arguments`, the arguments may be incomplete and are
+    not validated, apart from dropping unknown fields.
+
+    Args:
+        tool_name: Name of the called tool.
+        arguments: The beginning of the JSON encoded arguments.
+
+    Returns:
+        The known arguments parsed so far, empty for unknown tools.
+    """
+    return known_tool_arguments(tool_name, parse_partial_json(arguments))
+
+
+def known_tool_arguments(tool_name: str, parsed: Any) -> dict[str, Any]:
+    """Return the fields of the tool among partially parsed arguments, for previewing it.
+
+    Args:
+        tool_name: Name of the called tool.
+        parsed: The arguments parsed so far, e.g. by a `PartialJsonParser`.
+
+    Returns:
+        The known arguments, empty for unknown tools.
+    """
+    tool_cls = TOOLS.get(tool_name)
+    if tool_cls is None or not isinstance(parsed, dict):
+        return {}
+    fields = get_args_schema(tool_cls).model_fields
+    return {name: value for name, value in parsed.items() if name in fields}
+
+
 def register_tool(cls: type[Tool]) -> Callable:
     """Register a tool."""
     tool_name = cls.__name__
     TOOLS[tool_name] = cls
-    schema_cls = getattr(cls, f"{tool_name}Schema")
-    schema = convert_to_openai_function(schema_cls)
+    schema_cls = get_args_schema(cls)
+    schema = get_openai_function(schema_cls)
     schema["name"] = schema["name"].replace("Schema", "")
     try:
         item = FunctionsTable.get(tool_name)  # A preserved tool uses its name as ID
@@ -66,8 +156,7 @@ def tools_to_openai_functions() -> list[dict]:
     """Convert to OpenAI functions."""
     tools = []
     for tool_cls in TOOLS.values():
-        schema_cls_name = f"{tool_cls.__name__}Schema"
-        schema_cls = getattr(tool_cls, schema_cls_name)
-        tools.append({"type": "function", "function": convert_to_openai_function(schema_cls)})  # type: ignore
+        schema_cls = get_args_schema(tool_cls)
+        tools.append({"type": "function", "function": get_openai_function(schema_cls)})  # type: ignore
 
     return tools
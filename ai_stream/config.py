@@ -1,9 +1,12 @@
 """Configuration."""
 
 import logging
-from hydra import compose
-from hydra import initialize
-from omegaconf import DictConfig
+from functools import cache
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from omegaconf import DictConfig
 
 
 logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
@@ -19,8 +22,15 @@ def get_logger(module_name: str) -> logging.Logger:
 
 
 # Initialize Hydra
-def load_config(config_name: str = "default") -> DictConfig:
-    """Load the configuration for the application."""
+@cache
+def load_config(config_name: str = "default") -> "DictConfig":
+    """Load the configuration for the application.
+
+    The configuration is composed once per process and shared by all modules.
+    """
+    from hydra import compose
+    from hydra import initialize
+
     config_dir = "../config"
     with initialize(config_path=config_dir, job_name="my_app", version_base="1.3.2"):
         cfg = compose(config_name=config_name)
@@ -1,26 +1,58 @@
 """Configuration page for assistants."""
 
 import json
-from collections import OrderedDict
+from collections.abc import Callable
 from typing import Any
 import streamlit as st
 from openai.types import ResponseFormatJSONObject
 from openai.types import ResponseFormatJSONSchema
 from openai.types import ResponseFormatText
+from openai.types.beta import Assistant
 from openai.types.beta import CodeInterpreterTool
 from openai.types.beta import FileSearchTool
 from openai.types.beta import FunctionTool
 from ai_stream import TESTING
-from ai_stream.components.helpers import select_assistant
+from ai_stream.components.catalog import get_item
+from ai_stream.components.catalog import get_items
+from ai_stream.components.catalog import invalidate_item
+from ai_stream.components.catalog import prefetch_items
+from ai_stream.components.catalog import prefetcher
+from ai_stream.components.catalog import search_multiselect
+from ai_stream.components.catalog import search_select
+from ai_stream.components.catalog import select_assistant
+from ai_stream.components.prompts import compile_prompt
+from ai_stream.config import get_logger
 from ai_stream.config import load_config
 from ai_stream.db.aws import FunctionsTable
 from ai_stream.db.aws import PromptsTable
 from ai_stream.utils import create_id
 from ai_stream.utils.app_state import AppState
 from ai_stream.utils.app_state import ensure_app_state
+from ai_stream.utils.assistant_metadata import function_ids
+from ai_stream.utils.assistant_metadata import get_settings
+from ai_stream.utils.assistant_metadata import metadata_errors
+from ai_stream.utils.assistant_metadata import set_function_ids
+from ai_stream.utils.assistant_metadata import set_settings
+from ai_stream.utils.assistant_mirror import mirror_assistant
+from ai_stream.utils.assistant_mirror import versioned_configuration
+from ai_stream.utils.context_window import LIMIT_KEY
+from ai_stream.utils.context_window import SUMMARIZE_KEY
+from ai_stream.utils.context_window import TRUNCATION_KEY
+from ai_stream.utils.context_window import TRUNCATION_TYPES
+from ai_stream.utils.response_cache import ENABLED_KEY
+from ai_stream.utils.templates import INSTRUCTIONS_KEY
+from ai_stream.utils.templates import VARIABLES_KEY
+from ai_stream.utils.templates import TemplateError
+from ai_stream.utils.templates import render
+from ai_stream.utils.templates import template_variables
+from ai_stream.utils.versioning import content_hash
 
 
 config = load_config()
+logger = get_logger(__name__)
+DEFAULT_LAST_MESSAGES = 20
+DEFAULT_MAX_PROMPT_TOKENS = 8000
+MIN_PROMPT_TOKENS = 256  # Required by OpenAI
 
 
 def new_assistant() -> dict:
@@ -37,18 +69,44 @@ def new_assistant() -> dict:
         "function_ids": [],
         "response_format": "text",
         "json_schema": None,
+        "response_cache_enabled": False,
+        "truncation": "auto",
+        "truncation_limit": 0,
+        "summarize_enabled": False,
+        "prompt_variables": {},
     }
 
 
 def retrieve_assistant(app_state: AppState, assistant_id: str) -> dict:
-    """Retrieve assistant from OpenAI."""
-    assert app_state.openai_client
-    asst = app_state.openai_client.beta.assistants.retrieve(assistant_id)
-    function_ids = [
-        val
-        for key, val in asst.metadata.items()  # type: ignore[attr-defined]
-        if key.startswith("function_")
-    ]
+    """Retrieve assistant from OpenAI, unless its mirror is fresh."""
+    mirror = app_state.assistant_mirrors.get(assistant_id)
+    if not mirror or not mirror.is_fresh(config.assistants.mirror_ttl_seconds):
+        asst = prefetcher().take(("assistant", assistant_id), _retrieve(app_state, assistant_id))
+        mirror = mirror_assistant(app_state.assistant_mirrors, asst)
+    return assistant_form(mirror.assistant)
+
+
+def _retrieve(app_state: AppState, assistant_id: str) -> Callable[[], Assistant]:
+    client = app_state.openai_client
+    assert client
+    return lambda: client.beta.assistants.retrieve(assistant_id)
+
+
+def prefetch_assistant(app_state: AppState, assistant_id: str) -> None:
+    """Load an assistant, its prompt and its functions concurrently in the background."""
+    mirror = app_state.assistant_mirrors.get(assistant_id)
+    if not mirror or not mirror.is_fresh(config.assistants.mirror_ttl_seconds):
+        if assistant_id.startswith("asst_"):
+            prefetcher().prefetch(("assistant", assistant_id), _retrieve(app_state, assistant_id))
+    metadata = app_state.assistant_metadata.get(assistant_id, {})
+    if "prompt_id" in metadata:
+        prefetch_items(PromptsTable, [metadata["prompt_id"]])
+    prefetch_items(FunctionsTable, function_ids(metadata))
+
+
+def assistant_form(asst: Assistant) -> dict:
+    """Return the values of the configuration widgets of an assistant."""
+    settings = get_settings(asst.metadata)  # type: ignore[arg-type]
     response_format = "text"
     if isinstance(
         response_format,
@@ -66,12 +124,106 @@ def retrieve_assistant(app_state: AppState, assistant_id: str) -> dict:
             isinstance(tool, CodeInterpreterTool) for tool in asst.tools
         ),
         "custom_function_enabled": any(isinstance(tool, FunctionTool) for tool in asst.tools),
-        "function_ids": function_ids,
+        "function_ids": function_ids(asst.metadata),  # type: ignore[arg-type]
         "response_format": response_format,
         "json_schema": None,  # TODO
+        "response_cache_enabled": bool(settings.get(ENABLED_KEY)),
+        "truncation": settings.get(TRUNCATION_KEY, "auto"),
+        "truncation_limit": int(settings.get(LIMIT_KEY) or 0),
+        "summarize_enabled": bool(settings.get(SUMMARIZE_KEY)),
+        "prompt_variables": template_variables(asst.metadata),  # type: ignore[arg-type]
     }
 
 
+def setup_instructions_widgets(
+    app_state: AppState, assistant_id: str, prompt_variables: dict[str, str]
+) -> tuple[str, str, dict[str, Any]]:
+    """Select a prompt and its variables in the sidebar.
+
+    The variable widgets are keyed by assistant, since Streamlit ignores their
+    values once their keys hold a state.
+
+    Returns:
+        The rendered instructions, the ID of the prompt and the settings to add.
+    """
+    prompts = app_state.prompts
+    prompt_id = search_select(
+        "Select Prompt",
+        prompts,
+        key="assistant_prompt",
+        prefetch=lambda item_id: prefetch_items(PromptsTable, [item_id]),
+    )
+    try:
+        template, includes = compile_prompt(prompts, get_item(PromptsTable, prompt_id).value)
+    except TemplateError as e:
+        st.sidebar.error(f"Invalid prompt: {e}")
+        st.stop()
+    names = sorted(template.variables.union(*(t.variables for t in includes.values())))
+    if names:
+        st.sidebar.subheader("Prompt Variables")
+    variables = {
+        name: st.sidebar.text_input(
+            name,
+            value=prompt_variables.get(name, ""),
+            key=f"prompt_variable_{assistant_id}_{name}",
+        )
+        for name in names
+    }
+    instructions = render(template, variables, includes)
+    return (
+        instructions,
+        prompt_id,
+        {INSTRUCTIONS_KEY: content_hash(instructions), VARIABLES_KEY: variables},
+    )
+
+
+def setup_response_cache_widget(enabled: bool) -> dict[str, Any]:
+    """Opt-in to the response cache in the sidebar and return the settings to add."""
+    st.sidebar.subheader("Response Cache")
+    response_cache_enabled: bool = st.sidebar.checkbox(
+        "Cache Responses",
+        value=enabled,
+        help="Replay the cached response when a conversation repeats a previous one.",
+    )
+    return {ENABLED_KEY: response_cache_enabled}
+
+
+def setup_context_widgets(selected_assistant: dict) -> dict[str, Any]:
+    """Limit the context of runs in the sidebar and return the settings to add.
+
+    Defaults are left out, to keep the metadata of the assistant short.
+    """
+    st.sidebar.subheader("Context Window")
+    truncation: str = st.sidebar.selectbox(
+        "Truncation",
+        options=TRUNCATION_TYPES,
+        index=TRUNCATION_TYPES.index(selected_assistant["truncation"]),
+        format_func=lambda x: x.replace("_", " ").capitalize(),
+        help="Send only the last messages or a token budget of the thread to the model.",
+    )
+    settings: dict[str, Any] = {}
+    limit = selected_assistant["truncation_limit"]
+    if truncation == "last_messages":
+        limit = st.sidebar.number_input(
+            "Last Messages", min_value=1, value=limit or DEFAULT_LAST_MESSAGES
+        )
+        settings = {TRUNCATION_KEY: truncation, LIMIT_KEY: limit}
+    elif truncation == "max_prompt_tokens":
+        limit = st.sidebar.number_input(
+            "Max Prompt Tokens",
+            min_value=MIN_PROMPT_TOKENS,
+            value=limit if limit >= MIN_PROMPT_TOKENS else DEFAULT_MAX_PROMPT_TOKENS,
+        )
+        settings = {TRUNCATION_KEY: truncation, LIMIT_KEY: limit}
+    summarize: bool = st.sidebar.checkbox(
+        "Summarise Old Messages",
+        value=selected_assistant["summarize_enabled"],
+        help="Replace older messages of long threads by a summary.",
+    )
+    settings[SUMMARIZE_KEY] = summarize
+    return settings
+
+
 def setup_configuration_widgets(
     app_state: AppState, assistant_id: str, assistant_name: str
 ) -> dict[str, Any]:
@@ -88,11 +240,9 @@ def setup_configuration_widgets(
     new_name: str = st.sidebar.text_input("Assistant Name", value=selected_assistant["name"])
 
     # System instructions
-    prompts = app_state.prompts
-    prompt_id: str = st.sidebar.selectbox(
-        "Select Prompt", options=prompts, format_func=lambda x: prompts[x]
+    system_instructions, prompt_id, settings = setup_instructions_widgets(
+        app_state, assistant_id, selected_assistant["prompt_variables"]
     )
-    system_instructions = PromptsTable.get(prompt_id).value
     metadata["prompt_id"] = prompt_id
 
     # Model selection
@@ -135,18 +285,17 @@ def setup_configuration_widgets(
     )
 
     if custom_function_enabled:
-        functions = app_state.functions
-        function_ids = st.sidebar.multiselect(
+        selected_ids = search_multiselect(
             "Select Function",
-            options=functions,
-            format_func=lambda x: functions[x],
+            app_state.functions,
+            key=f"functions_{assistant_id}",
             default=selected_assistant["function_ids"],
         )
-        items = FunctionsTable.batch_get([(id) for id in function_ids])
+        items = get_items(FunctionsTable, selected_ids)
         tools.extend(
             [{"type": "function", "function": schema.value.as_dict()} for schema in items]
         )
-        metadata.update({f"function_{i}": id for i, id in enumerate(function_ids)})
+        metadata = set_function_ids(metadata, selected_ids)
 
     # Add options for response format
     st.sidebar.subheader("Response Format")
@@ -168,6 +317,10 @@ def setup_configuration_widgets(
     else:
         response_format = {"type": response_format_option}
 
+    settings.update(setup_response_cache_widget(selected_assistant["response_cache_enabled"]))
+    settings.update(setup_context_widgets(selected_assistant))
+    metadata = set_settings(metadata, settings)
+
     # Return the configuration as a dictionary
     configuration: dict[str, Any] = {
         "name": new_name,
@@ -185,32 +338,52 @@ def setup_configuration_widgets(
 def add_assistant(app_state: AppState) -> None:
     """Add a new assistant."""
     new_id = "tmp_" + create_id()
-    app_state.assistants = OrderedDict(
-        [(new_id, new_assistant()["name"])] + list(app_state.assistants.items())
-    )
+    app_state.assistants.add_draft(new_id, new_assistant()["name"])
 
 
-def save_assistant(app_state: AppState, assistant_id: str, configuration: dict) -> str:
-    """Save or update the given assistant."""
+def save_assistant(app_state: AppState, assistant_id: str, configuration: dict) -> str | None:
+    """Save or update the given assistant.
+
+    Only the fields changed since the last known state of an assistant are
+    sent to update it.
+
+    Returns:
+        The ID of the saved assistant, or `None` if there was nothing to save
+        or the API would reject the configuration.
+    """
     assert app_state.openai_client
+    # Cached responses of other versions are not used
+    configuration.update(versioned_configuration(configuration))
+    errors = metadata_errors(configuration["metadata"])
+    if errors:
+        for error in errors:
+            st.error(error)
+        return None
     if assistant_id.startswith("asst_"):  # Update
-        assistant = app_state.openai_client.beta.assistants.update(assistant_id, **configuration)
+        mirror = app_state.assistant_mirrors.get(assistant_id)
+        changes = mirror.changes(configuration) if mirror else configuration
+        if not changes:
+            st.info("No changes to save.")
+            return None
+        logger.info(f"Updating {', '.join(changes)} of assistant {assistant_id}.")
+        assistant = app_state.openai_client.beta.assistants.update(assistant_id, **changes)
     else:
         assistant = app_state.openai_client.beta.assistants.create(**configuration)
+    mirror_assistant(app_state.assistant_mirrors, assistant, configuration)
     # Register to used prompt and functions
     metadata = configuration["metadata"]
     prompt_id = metadata["prompt_id"]
     prompt = PromptsTable.get(prompt_id)
     if assistant.id not in prompt.used_by:
         prompt.update(actions=[PromptsTable.used_by.set(prompt.used_by + [assistant.id])])  # type: ignore[list-item]
-    for key, val in metadata.items():
-        if not key.startswith("function_"):
-            continue
+        invalidate_item(PromptsTable, prompt_id)
+    for val in function_ids(metadata):
         function = FunctionsTable.get(val)
         if assistant.id not in function.used_by:
             function.update(
                 actions=[FunctionsTable.used_by.set(function.used_by + [assistant.id])]  # type: ignore[list-item]
             )
+            invalidate_item(FunctionsTable, val)
     return assistant.id
 
 
@@ -222,7 +395,9 @@ def main(app_state: AppState) -> None:
     if st.button("New Assistant"):
         add_assistant(app_state)
 
-    assistant_id, assistant_name = select_assistant(app_state.assistants)
+    assistant_id, assistant_name = select_assistant(
+        app_state.assistants, prefetch=lambda item_id: prefetch_assistant(app_state, item_id)
+    )
     configuration = setup_configuration_widgets(app_state, assistant_id, assistant_name)
 
     # Display the current configuration for demonstration purposes
@@ -234,10 +409,16 @@ def main(app_state: AppState) -> None:
     if st.button("Save Assistant", disabled=not new_name):
         # Save to OpenAI
         configuration["name"] = new_name
-        assistant_id = save_assistant(app_state, assistant_id, configuration)
-        # Save to app_state.assistants
-        app_state.assistants[assistant_id] = configuration["name"]
-        st.success(f"Assistant {assistant_id} saved!")
+        saved_id = save_assistant(app_state, assistant_id, configuration)
+        if saved_id:
+            # Save to app_state.assistants
+            app_state.assistants.remove(assistant_id)
+            app_state.assistants.publish(
+                saved_id, configuration["name"], configuration["instructions"]
+            )
+            app_state.assistant_metadata[saved_id] = configuration["metadata"]
+            assistant_id = saved_id
+            st.success(f"Assistant {assistant_id} saved!")
 
     if st.button("Delete Assistant"):
         # Delete from OpenAI
@@ -250,17 +431,19 @@ def main(app_state: AppState) -> None:
         prompt = PromptsTable.get(prompt_id)
         prompt.used_by.remove(assistant_id)
         prompt.update(actions=[PromptsTable.used_by.set(prompt.used_by)])
+        invalidate_item(PromptsTable, prompt_id)
 
-        for key, val in metadata.items():
-            if not key.startswith("function_"):
-                continue
+        for val in function_ids(metadata):
             function = FunctionsTable.get(val)
             function.used_by.remove(assistant_id)
             function.update(actions=[FunctionsTable.used_by.set(function.used_by)])
+            invalidate_item(FunctionsTable, val)
 
         app_state.openai_client.beta.assistants.delete(assistant_id)
         # Delete from app_state.assistants
-        del app_state.assistants[assistant_id]
+        app_state.assistants.remove(assistant_id)
+        app_state.assistant_metadata.pop(assistant_id, None)
+        app_state.assistant_mirrors.pop(assistant_id, None)
         st.success(f"Assistant {assistant_id} deleted.")
 
 
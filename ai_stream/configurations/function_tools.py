@@ -1,73 +1,51 @@
 """Configuration page for function tools."""
 
-import json
-from collections import OrderedDict
-from typing import Any
 import streamlit as st
 from code_editor import code_editor  # type: ignore[import-untyped]
 from openai.types.beta import FunctionTool
 from pynamodb.exceptions import DoesNotExist
 from ai_stream import TESTING
+from ai_stream.components.bulk import bulk_import_export
+from ai_stream.components.catalog import get_item
+from ai_stream.components.catalog import prefetch_items
+from ai_stream.components.catalog import search_select
 from ai_stream.components.helpers import display_used_by
 from ai_stream.components.tools import TOOLS
+from ai_stream.config import load_config
 from ai_stream.db.aws import FunctionsTable
 from ai_stream.utils import create_id
 from ai_stream.utils.app_state import AppState
 from ai_stream.utils.app_state import ensure_app_state
+from ai_stream.utils.assistant_mirror import mirror_assistant
+from ai_stream.utils.assistant_mirror import update_assistant
+from ai_stream.utils.catalog import CatalogView
+from ai_stream.utils.function_tools import ANY_OF
+from ai_stream.utils.function_tools import ENUM_TYPES
 from ai_stream.utils.function_tools import NEW_SCHEMA_NAME
 from ai_stream.utils.function_tools import PARAM_TYPES
 from ai_stream.utils.function_tools import Function2Display
 from ai_stream.utils.function_tools import FunctionParameter
+from ai_stream.utils.function_tools import build_json_schema
+from ai_stream.utils.function_tools import diff_parameters
+
+
+config = load_config()
 
 
 def add_function(app_state: AppState) -> None:
     """Add a new function."""
     new_func = Function2Display.new()
     app_state.current_function = new_func
-    app_state.functions = OrderedDict(
-        [(new_func.schema_id, new_func.schema_name)] + list(app_state.functions.items())
-    )
+    app_state.functions.add_draft(new_func.schema_id, new_func.schema_name)
 
 
 def remove_function(app_state: AppState, schema_id: str) -> None:
     """Remove the given function."""
-    del app_state.functions[schema_id]
+    app_state.functions.remove(schema_id)
     item = FunctionsTable.get(schema_id)
     item.delete()
 
 
-def build_json_schema(
-    function_name: str, function_description: str, parameters: dict[str, FunctionParameter]
-) -> tuple[dict, str]:
-    """Build json schema given the function parameters."""
-    required_params = [
-        param.name for param in parameters.values() if param.required and param.name
-    ]
-    properties = {}
-    for param in parameters.values():
-        if not param.name:
-            continue  # Skip parameters without a name
-        prop: dict[str, Any] = {"type": param.type, "description": param.description}
-        if param.type in ["string", "number", "integer"]:
-            if param.enum:
-                prop["enum"] = param.enum
-        if param.type == "array":
-            prop["items"] = {"type": param.items_type}
-        properties[param.name] = prop
-
-    parameters_dict = {"type": "object", "properties": properties}
-    if required_params:
-        parameters_dict["required"] = required_params
-
-    schema = {
-        "name": function_name,
-        "description": function_description,
-        "parameters": parameters_dict,
-    }
-
-    return schema, json.dumps(schema, indent=2)
-
-
 def add_parameter(selected_function: Function2Display) -> None:
     """Add a parameter to the given function."""
     new_id = create_id()
@@ -89,9 +67,14 @@ def remove_parameter(selected_function: Function2Display, param_id: str) -> None
     del selected_function.parameters[param_id]
 
 
-def parameter_input(param: FunctionParameter, param_id: str) -> FunctionParameter:
-    """Display the input widgets for the given parameter."""
-    new_name = st.text_input("Name", value=param.name, key=f"name_{param_id}")
+def parameter_input(
+    param: FunctionParameter, param_id: str, variant: bool = False
+) -> FunctionParameter:
+    """Display the input widgets for the given parameter.
+
+    Variants of an `anyOf` have neither a name nor a required flag.
+    """
+    new_name = "" if variant else st.text_input("Name", value=param.name, key=f"name_{param_id}")
     new_description = st.text_input(
         "Description",
         value=param.description,
@@ -103,9 +86,11 @@ def parameter_input(param: FunctionParameter, param_id: str) -> FunctionParamete
         index=param.type_index,
         key=f"type_{param_id}",
     )
-    new_required = st.checkbox("Required", value=param.required, key=f"required_{param_id}")
+    new_required = variant or st.checkbox(
+        "Required", value=param.required, key=f"required_{param_id}"
+    )
     # For enum
-    if new_type in ["string", "number", "integer"]:
+    if new_type in ENUM_TYPES:
         enum_input = st.text_input(
             "Enum values (comma-separated)",
             value=", ".join(param.enum),
@@ -125,6 +110,7 @@ def parameter_input(param: FunctionParameter, param_id: str) -> FunctionParamete
         )
     else:
         new_items_type = "string"
+    nested_type = new_items_type if new_type == "array" else new_type
     return FunctionParameter(
         name=new_name,
         description=new_description,
@@ -132,20 +118,48 @@ def parameter_input(param: FunctionParameter, param_id: str) -> FunctionParamete
         required=new_required,
         enum=new_enum,
         items_type=new_items_type,
+        properties=nested_parameters_input(param.properties, param_id, "Property")
+        if nested_type == "object"
+        else {},
+        any_of=nested_parameters_input(param.any_of, param_id, "Variant")
+        if nested_type == ANY_OF
+        else {},
     )
 
 
-def choose_function(functions: dict) -> tuple:
+def nested_parameters_input(
+    parameters: dict[str, FunctionParameter], parent_id: str, label: str
+) -> dict[str, FunctionParameter]:
+    """Display the properties of an object or the variants of an `anyOf`.
+
+    Streamlit does not allow nested expanders, so bordered containers are used.
+    """
+    variant = label == "Variant"
+    updated_parameters = {}
+    for param_id, param in parameters.items():
+        with st.container(border=True):
+            st.caption(f"{label}: {param.name or param.type}")
+            updated_parameters[param_id] = parameter_input(param, param_id, variant=variant)
+            if st.button(f"Remove {label}", key=f"remove_{param_id}"):
+                del parameters[param_id]
+                st.rerun()
+    if st.button(f"Add {label}", key=f"add_{parent_id}"):
+        parameters[create_id()] = FunctionParameter()
+        st.rerun()
+    return updated_parameters
+
+
+def choose_function(functions: CatalogView) -> tuple:
     """Select a function to edit and return its id."""
     if not functions:
         st.warning("No functions yet. Click 'New Function' to create one.")
         st.stop()
 
-    schema_id = st.sidebar.selectbox(
+    schema_id = search_select(
         "Select Function",
-        options=functions,
-        format_func=lambda x: functions[x],
+        functions,
         key="function_selectbox",
+        prefetch=lambda item_id: prefetch_items(FunctionsTable, [item_id]),
     )
     st.sidebar.caption(f"ID: {schema_id}")
 
@@ -158,14 +172,14 @@ def get_function(app_state: AppState, schema_id: str) -> Function2Display:
         not app_state.current_function or app_state.current_function.schema_id != schema_id
     ):  # Needs reloading
         try:
-            item = FunctionsTable.get(schema_id)
+            item = get_item(FunctionsTable, schema_id)
         except DoesNotExist:  # schema_id is for a newly created function
             item = None
         if item:
             app_state.current_function = Function2Display.from_openai_function(
                 schema_id, item.name, item.value.as_dict()
             )
-            app_state.current_function.used_by = item.used_by
+            app_state.current_function.used_by = list(item.used_by)
 
         else:
             st.error(f"Error loading function with ID {schema_id}.")
@@ -190,6 +204,16 @@ def get_function(app_state: AppState, schema_id: str) -> Function2Display:
                 schema=code["text"] or current_schema,
                 is_new=False,
             )
+            # Keep the IDs, and so the widgets, of parameters that did not change
+            new_func.parameters, diff = diff_parameters(
+                stored_function.parameters, new_func.parameters
+            )
+            if not diff and (new_func.function_name, new_func.description) == (
+                stored_function.function_name,
+                stored_function.description,
+            ):
+                return stored_function
+            new_func.used_by = stored_function.used_by
             return new_func
     else:
         return stored_function
@@ -246,10 +270,34 @@ def display_function(selected_function: Function2Display) -> tuple:
     return new_name, new_description, updated_parameters
 
 
+def update_assistant_tools(
+    app_state: AppState, assistant_id: str, function_name: str, schema: dict
+) -> None:
+    """Replace the tool of a saved function in an assistant using it."""
+    assert app_state.openai_client
+    assistant = app_state.openai_client.beta.assistants.retrieve(assistant_id)
+    mirror_assistant(app_state.assistant_mirrors, assistant)
+    tools = [
+        tool.to_dict()
+        for tool in assistant.tools
+        if not (isinstance(tool, FunctionTool) and tool.function.name == function_name)
+    ]  # Remove old function
+    tools.append({"type": "function", "function": schema})
+    configuration = update_assistant(
+        app_state.openai_client,
+        app_state.assistant_mirrors,
+        assistant_id,
+        {"tools": tools},
+        config.assistants.mirror_ttl_seconds,
+    )
+    app_state.assistant_metadata[assistant_id] = configuration["metadata"]
+
+
 @ensure_app_state
 def main(app_state: AppState) -> None:
     """App layout."""
     st.title("OpenAI Function Schema Builder")
+    bulk_import_export(app_state, FunctionsTable)
 
     # Button to add a new function
     if st.button("New Function"):
@@ -292,22 +340,14 @@ def main(app_state: AppState) -> None:
                 actions=[FunctionsTable.value.set(schema), FunctionsTable.name.set(schema_name)]
             )
 
-            if existing_function.used_by:
-                for assistant_id in existing_function.used_by:
-                    assistant = app_state.openai_client.beta.assistants.retrieve(str(assistant_id))
-                    tools = [
-                        tool.to_dict()
-                        for tool in assistant.tools
-                        if isinstance(tool, FunctionTool) and tool.function.name != function_name
-                    ]  # Remove old function
-                    tools.append({"type": "function", "function": schema})
-                    app_state.openai_client.beta.assistants.update(str(assistant_id), tools=tools)  # type: ignore[arg-type]
+            for assistant_id in existing_function.used_by:
+                update_assistant_tools(app_state, str(assistant_id), function_name, schema)
             st.success(f"Function has been saved with name {new_name} and " f"ID {schema_id}.")
         else:
             item = FunctionsTable(id=schema_id, name=schema_name, used_by=[], value=schema)
             item.save()
             st.success(f"Function has been saved with name {new_name} and " f"ID {schema_id}.")
-        app_state.functions[schema_id] = schema_name
+        app_state.functions.publish(schema_id, schema_name, new_description)
 
     # Option to remove the function
     if st.button("Remove Function"):
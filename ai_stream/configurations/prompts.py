@@ -1,72 +1,217 @@
 """Configuration page for prompts."""
 
-from collections import OrderedDict
+import difflib
 import streamlit as st
 from code_editor import code_editor  # type: ignore[import-untyped]
 from pynamodb.exceptions import DoesNotExist
 from ai_stream import TESTING
+from ai_stream.components.bulk import bulk_import_export
+from ai_stream.components.catalog import get_item
+from ai_stream.components.catalog import prefetch_items
+from ai_stream.components.catalog import search_select
 from ai_stream.components.helpers import display_used_by
+from ai_stream.components.prompts import compile_prompt
+from ai_stream.components.prompts import dependent_prompts
+from ai_stream.config import load_config
 from ai_stream.db.aws import PromptsTable
+from ai_stream.db.aws import add_prompt_version
+from ai_stream.db.aws import prompt_history
 from ai_stream.utils import create_id
 from ai_stream.utils.app_state import AppState
 from ai_stream.utils.app_state import ensure_app_state
+from ai_stream.utils.assistant_metadata import get_settings
+from ai_stream.utils.assistant_metadata import update_settings
+from ai_stream.utils.assistant_mirror import update_assistant
+from ai_stream.utils.templates import INSTRUCTIONS_KEY
+from ai_stream.utils.templates import TemplateError
+from ai_stream.utils.templates import compile_template
+from ai_stream.utils.templates import render
+from ai_stream.utils.templates import template_variables
+from ai_stream.utils.versioning import content_hash
+from ai_stream.utils.versioning import get_text
+from ai_stream.utils.versioning import list_versions
+
+
+config = load_config()
+
+
+def update_instructions(app_state: AppState, assistant_id: str, prompt_value: str) -> bool:
+    """Render a prompt for an assistant and update its instructions if they changed.
+
+    Returns:
+        Whether the assistant was updated.
+    """
+    assert app_state.openai_client
+    metadata = app_state.assistant_metadata.get(assistant_id)
+    if metadata is None:
+        assistant = app_state.openai_client.beta.assistants.retrieve(assistant_id)
+        metadata = dict(assistant.metadata or {})  # type: ignore[call-overload]
+    try:
+        template, includes = compile_prompt(app_state.prompts, prompt_value)
+        instructions = render(template, template_variables(metadata), includes)
+    except TemplateError as e:
+        st.warning(f"Assistant {assistant_id} was not updated: {e}")
+        return False
+    version = content_hash(instructions)
+    if get_settings(metadata).get(INSTRUCTIONS_KEY) == version:
+        return False
+    changes = {
+        "instructions": instructions,
+        "metadata": update_settings(metadata, **{INSTRUCTIONS_KEY: version}),
+    }
+    configuration = update_assistant(
+        app_state.openai_client,
+        app_state.assistant_mirrors,
+        assistant_id,
+        changes,
+        config.assistants.mirror_ttl_seconds,
+    )
+    app_state.assistant_metadata[assistant_id] = configuration["metadata"]
+    return True
+
+
+def update_assistants(app_state: AppState, prompt: PromptsTable, prompt_value: str) -> int:
+    """Update the assistants using a prompt, directly or through includes.
+
+    Only assistants whose rendered instructions changed are updated.
+
+    Returns:
+        The number of updated assistants.
+    """
+    updated = sum(
+        update_instructions(app_state, str(assistant_id), prompt_value)
+        for assistant_id in prompt.used_by
+    )
+    for dependent in dependent_prompts(prompt.name):
+        updated += sum(
+            update_instructions(app_state, str(assistant_id), dependent.value)
+            for assistant_id in dependent.used_by
+        )
+    return updated
 
 
 def save_prompt(app_state: AppState, prompt_id: str, prompt_name: str, prompt_value: str) -> None:
-    """Save prompt and update assistants if needed."""
+    """Save prompt and update assistants if needed.
+
+    Saving an unchanged prompt is a no-op, so neither the DB nor the assistants
+    are updated. Restoring an older version only moves the version pointer.
+    """
     try:
         existing_prompt = PromptsTable.get(hash_key=prompt_id)
     except DoesNotExist:
         existing_prompt = None
     assert app_state.openai_client
+    try:
+        compile_template(prompt_value)
+    except TemplateError as e:
+        st.error(f"Invalid template: {e}")
+        return
     if existing_prompt:
+        history, current_version = prompt_history(existing_prompt)
+        if content_hash(prompt_value) == current_version:
+            st.info("No changes to save.")
+            return
+        version = add_prompt_version(history, prompt_value, parent=current_version)
         # Update existing prompt
-        existing_prompt.update(actions=[PromptsTable.value.set(prompt_value)])
-        if existing_prompt.used_by:
-            for assistant_id in existing_prompt.used_by:
-                app_state.openai_client.beta.assistants.update(
-                    str(assistant_id), instructions=prompt_value
-                )
-        st.success(f"Prompt has been updated with name {prompt_name} and ID {prompt_id}.")
+        existing_prompt.update(
+            actions=[
+                PromptsTable.value.set(prompt_value),
+                PromptsTable.version.set(version),
+                PromptsTable.history.set(history),
+            ]
+        )
+        app_state.prompts.publish(prompt_id, existing_prompt.name, prompt_value)
+        updated = update_assistants(app_state, existing_prompt, prompt_value)
+        st.success(
+            f"Prompt has been updated with name {prompt_name} and ID {prompt_id}, "
+            f"and {updated} assistants were updated."
+        )
     else:
         # Save new prompt to DB
-        item = PromptsTable(id=prompt_id, name=prompt_name, used_by=[], value=prompt_value)
+        history = {}
+        version = add_prompt_version(history, prompt_value, parent=None)
+        item = PromptsTable(
+            id=prompt_id,
+            name=prompt_name,
+            used_by=[],
+            value=prompt_value,
+            version=version,
+            history=history,
+        )
         item.save()
         st.success(f"Prompt has been saved with name {prompt_name} and ID {prompt_id}.")
         # Update app_state.prompts
-        app_state.prompts[prompt_id] = prompt_name
+        app_state.prompts.publish(prompt_id, prompt_name, prompt_value)
+
+
+def display_history(app_state: AppState, prompt: PromptsTable) -> None:
+    """Display the versions of a prompt, with their changes and a button to restore them.
+
+    The history is read here, as other reads of prompts leave it out.
+    """
+    attributes = ["id", "value", "version", "history"]
+    history, current_version = prompt_history(
+        PromptsTable.get(prompt.id, attributes_to_get=attributes)
+    )
+    with st.expander(f"History ({len(history)} versions)"):
+        versions = list_versions(history)
+        version = st.selectbox(
+            "Version",
+            versions,
+            index=versions.index(current_version),
+            format_func=lambda v: f"{history[v]['created'][:19]} `{v}`"
+            + (" (current)" if v == current_version else ""),
+            key=f"version_{prompt.id}",
+        )
+        text = get_text(history, version)
+        diff = difflib.unified_diff(
+            prompt.value.splitlines(),
+            text.splitlines(),
+            fromfile="current",
+            tofile=version,
+            lineterm="",
+        )
+        st.code("\n".join(diff) or "No changes.", language="diff")
+        if st.button("Restore Version", disabled=version == current_version):
+            save_prompt(app_state, prompt.id, prompt.name, text)
 
 
 @ensure_app_state
 def main(app_state: AppState) -> None:
     """App layout."""
     st.title("OpenAI Prompts")
+    bulk_import_export(app_state, PromptsTable)
 
     if st.button("New Prompt"):
         new_id = create_id()
-        app_state.prompts = OrderedDict([(new_id, "Tmp")] + list(app_state.prompts.items()))
+        app_state.prompts.add_draft(new_id, "Tmp")
 
     prompt_id2name = app_state.prompts
     if not prompt_id2name:
         st.warning("No prompts yet. Click 'New Prompt' to create one.")
         st.stop()
 
-    prompt_id = st.sidebar.selectbox(
+    prompt_id = search_select(
         "Select Prompt",
-        list(prompt_id2name.keys()),
-        format_func=lambda x: prompt_id2name[x],
+        prompt_id2name,
+        key="select_prompt",
+        prefetch=lambda item_id: prefetch_items(PromptsTable, [item_id]),
     )
     st.sidebar.caption(f"ID: {prompt_id}")
     prompt_name = prompt_id2name[prompt_id]
+    prompt: PromptsTable | None
     try:
-        prompt = PromptsTable.get(hash_key=prompt_id)
+        prompt = get_item(PromptsTable, prompt_id)
         prompt_value = prompt.value
         used_by = [str(item) for item in prompt.used_by]
     except DoesNotExist:
+        prompt = None
         prompt_value = ""
         used_by = []
 
     display_used_by(used_by)
+    if prompt:
+        display_history(app_state, prompt)
 
     # Display text input and text area for editing
     st.write(
@@ -92,8 +237,7 @@ def main(app_state: AppState) -> None:
             prompt.delete()
             st.success(f"Prompt '{prompt_name}' has been deleted.")
             # Remove from app_state.prompts
-            if prompt_id in app_state.prompts:
-                del app_state.prompts[prompt_id]
+            app_state.prompts.remove(prompt_id)
             # Reset prompt selection
         except DoesNotExist:
             st.error("Prompt not found.")
@@ -2,7 +2,9 @@
 
 import json
 import os
+from typing import TYPE_CHECKING
 from typing import Any
+from urllib.parse import urlparse
 from pynamodb.attributes import ListAttribute
 from pynamodb.attributes import MapAttribute
 from pynamodb.attributes import UnicodeAttribute
@@ -10,6 +12,12 @@ from pynamodb.models import Model
 from ai_stream import LOCAL_AWS
 from ai_stream.config import get_logger
 from ai_stream.config import load_config
+from ai_stream.utils.versioning import add_version
+from ai_stream.utils.versioning import prune_history
+
+
+if TYPE_CHECKING:
+    from moto.server import ThreadedMotoServer
 
 
 class AIStreamTable(Model):
@@ -47,6 +55,45 @@ class PromptsTable(AIStreamTable):
         table_name = config.dynamodb.prompts_table
 
     value = UnicodeAttribute()
+    version = UnicodeAttribute(null=True)
+    """Hash of the current version of the value."""
+    history: MapAttribute[str, Any] = MapAttribute(null=True)
+    """Versions of the value by hash, see `ai_stream.utils.versioning`."""
+
+
+def prompt_history(prompt: PromptsTable) -> tuple[dict[str, dict[str, str]], str]:
+    """Return the version history of a prompt and the hash of its current version.
+
+    Prompts saved before versioning get their value as first version.
+    """
+    history = prompt.history.as_dict() if prompt.history else {}
+    version = prompt.version or add_version(history, prompt.value, parent=None)
+    return history, version
+
+
+def add_prompt_version(history: dict[str, dict[str, str]], text: str, parent: str | None) -> str:
+    """Add a version to the history of a prompt, pruning its oldest versions if needed.
+
+    See `ai_stream.utils.versioning.add_version` and `prune_history`.
+    """
+    version = add_version(history, text, parent)
+    prune_history(
+        history, version, config.versioning.max_versions, config.versioning.max_history_bytes
+    )
+    return version
+
+
+def attributes_without_history(table_cls: type[AIStreamTable]) -> list[str]:
+    """Return the names of the attributes of a table, but the version history of prompts.
+
+    The history is only needed to list and restore the versions of a prompt,
+    and is by far its largest attribute, so other reads leave it out.
+    """
+    return [
+        attribute.attr_name
+        for name, attribute in table_cls.get_attributes().items()
+        if name != "history"
+    ]
 
 
 @register_pynamodb_table
@@ -69,6 +116,17 @@ def _prepare_dev_env() -> None:
     os.environ["AWS_DEFAULT_REGION"] = "eu-west-1"
 
 
+def start_moto_server(verbose: bool = True) -> "ThreadedMotoServer":
+    """Start a moto server at the configured URL to serve DynamoDB locally."""
+    from moto.server import ThreadedMotoServer
+
+    url = urlparse(config.moto_url)
+    assert url.hostname and url.port
+    server = ThreadedMotoServer(url.hostname, url.port, verbose=verbose)
+    server.start()
+    return server
+
+
 def create_tables() -> None:
     """Create all defined tables if they don't exist yet."""
     if LOCAL_AWS:
@@ -0,0 +1,310 @@
+"""Bulk import and export of tables as JSON Lines.
+
+Run `python -m ai_stream.db.bulk export prompts.jsonl` to export tables and
+`python -m ai_stream.db.bulk import prompts.jsonl` to import them, e.g. to
+migrate prompts and functions between environments.
+
+Every line is the simple dict of an item with the name of its table class
+under `table`. Files are streamed in both directions: exports page through
+scans and imports write in chunks, so whole tables are never held in memory.
+The version history of prompts is only exported with `--history`.
+"""
+
+import argparse
+import json
+import re
+import sys
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from contextlib import AbstractContextManager
+from contextlib import nullcontext
+from dataclasses import dataclass
+from dataclasses import field
+from itertools import islice
+from typing import Literal
+from typing import TextIO
+from pynamodb.attributes import Attribute
+from pynamodb.attributes import ListAttribute
+from pynamodb.attributes import MapAttribute
+from pynamodb.attributes import UnicodeAttribute
+from ai_stream.config import get_logger
+from ai_stream.config import load_config
+from ai_stream.db.aws import PYNAMODB_TABLES
+from ai_stream.db.aws import AIStreamTable
+from ai_stream.db.aws import FunctionsTable
+from ai_stream.db.aws import PromptsTable
+from ai_stream.db.aws import add_prompt_version
+from ai_stream.db.aws import attributes_without_history
+from ai_stream.db.aws import create_tables
+from ai_stream.db.aws import prompt_history
+from ai_stream.utils.templates import TemplateError
+from ai_stream.utils.templates import compile_template
+from ai_stream.utils.versioning import content_hash
+
+
+logger = get_logger(__name__)
+config = load_config()
+TABLE_KEY = "table"
+PYTHON_TYPES: dict[type[Attribute], type] = {
+    UnicodeAttribute: str,
+    MapAttribute: dict,
+    ListAttribute: list,
+}
+FUNCTION_NAME = re.compile(r"[a-zA-Z0-9_-]{1,64}")
+"""Names of functions allowed by OpenAI."""
+
+
+@dataclass
+class ImportReport:
+    """Outcome of an import."""
+
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    errors: list[tuple[int, str]] = field(default_factory=list)
+    """Line numbers and messages of the skipped lines."""
+
+    @property
+    def imported(self) -> int:
+        """Number of valid lines."""
+        return self.created + self.updated + self.unchanged
+
+
+def _check_type(attribute: Attribute, value: object) -> bool:
+    if not isinstance(value, PYTHON_TYPES[type(attribute)]):
+        return False
+    element_type = getattr(attribute, "element_type", None)
+    if isinstance(value, list) and element_type:
+        element = PYTHON_TYPES[element_type]
+        return all(isinstance(v, element) for v in value)
+    return True
+
+
+def _check_function(schema: dict) -> None:
+    """Raise a ValueError if a schema is not an OpenAI function definition."""
+    name = schema.get("name")
+    if not isinstance(name, str) or not FUNCTION_NAME.fullmatch(name):
+        raise ValueError(
+            f"Invalid function name {name!r}, expected up to 64 letters, digits, _ or -."
+        )
+    if not isinstance(schema.get("description", ""), str):
+        raise ValueError("Invalid type of function description.")
+    parameters = schema.get("parameters", {})
+    if not isinstance(parameters, dict) or parameters.get("type", "object") != "object":
+        raise ValueError("Function parameters must be a JSON schema of an object.")
+    if not isinstance(parameters.get("properties", {}), dict):
+        raise ValueError("Invalid type of function parameter properties.")
+
+
+def _parse_attributes(line: str, default_table: str | None) -> AIStreamTable:
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError("Expected a JSON object.")
+    table_name = record.pop(TABLE_KEY, default_table)
+    table_cls = PYNAMODB_TABLES.get(table_name or "")
+    if table_cls is None:
+        raise ValueError(f"Unknown table {table_name!r}.")
+    record.setdefault("used_by", [])
+    for name, attribute in table_cls.get_attributes().items():
+        if record.get(name) in (None, ""):
+            if attribute.null:
+                continue
+            raise ValueError(f"Missing attribute {name!r}.")
+        if not _check_type(attribute, record[name]):
+            raise ValueError(f"Invalid type of attribute {name!r}.")
+    return table_cls(**record)  # Raises a ValueError on unknown attributes
+
+
+def parse_record(line: str, default_table: str | None = None) -> AIStreamTable:
+    """Return the item of a line of JSON, raising a ValueError if it is invalid.
+
+    Besides the types of the attributes, the values of functions are checked
+    to be OpenAI function definitions, and the values of prompts to be valid
+    templates.
+
+    Args:
+        line: JSON object with the attributes of the item.
+        default_table: Table class name of records without one.
+    """
+    item = _parse_attributes(line, default_table)
+    if isinstance(item, FunctionsTable):
+        _check_function(item.value.as_dict())
+    elif isinstance(item, PromptsTable):
+        try:
+            compile_template(item.value)
+        except TemplateError as e:
+            raise ValueError(f"Invalid template: {e}") from e
+    return item
+
+
+def _chunks(lines: Iterable[str], size: int) -> Iterator[list[tuple[int, str]]]:
+    numbered = ((number, line) for number, line in enumerate(lines, 1) if line.strip())
+    while chunk := list(islice(numbered, size)):
+        yield chunk
+
+
+def _keep_versions(item: PromptsTable, old: PromptsTable) -> None:
+    """Keep the versions of an existing prompt, adding the imported value as a new one.
+
+    Records with their own history, e.g. from an export with history, replace
+    the versions.
+    """
+    if item.history is not None or item.version is not None:
+        return
+    if content_hash(item.value) == (old.version or content_hash(old.value)):
+        item.history, item.version = old.history, old.version
+        return
+    history, version = prompt_history(old)
+    item.version = add_prompt_version(history, item.value, parent=version)
+    item.history = history
+
+
+def _upsert(
+    table_cls: type[AIStreamTable], items: list[AIStreamTable], report: ImportReport
+) -> None:
+    """Write items, keeping the assistants already using the existing ones.
+
+    Existing prompts also keep their versions, see `_keep_versions`.
+    """
+    existing = {item.id: item for item in table_cls.batch_get([item.id for item in items])}
+    with table_cls.batch_write() as batch:
+        for item in items:
+            old = existing.get(item.id)
+            if old is None:
+                report.created += 1
+            else:
+                item.used_by = list(dict.fromkeys([*old.used_by, *item.used_by]))
+                if isinstance(item, PromptsTable):
+                    _keep_versions(item, old)  # type: ignore[arg-type]
+                if item.to_simple_dict() == old.to_simple_dict():
+                    report.unchanged += 1
+                    continue
+                report.updated += 1
+            batch.save(item)
+
+
+def import_items(
+    lines: Iterable[str],
+    default_table: str | None = None,
+    chunk_size: int = config.bulk.chunk_size,
+    progress: Callable[[ImportReport], None] | None = None,
+) -> ImportReport:
+    """Import items from JSON Lines, inserting new items and updating existing ones.
+
+    Invalid lines are skipped and reported. Existing items keep the assistants
+    using them, which are not updated with the imported values.
+
+    Args:
+        lines: Lines of JSON, e.g. an open file.
+        default_table: Table class name of records without one.
+        chunk_size: Number of lines validated and written at once.
+        progress: Called with the report so far after every chunk.
+    """
+    report = ImportReport()
+    for chunk in _chunks(lines, chunk_size):
+        tables: dict[type[AIStreamTable], dict[str, AIStreamTable]] = {}
+        for number, line in chunk:
+            try:
+                item = parse_record(line, default_table)
+            except ValueError as e:  # Includes JSONDecodeError
+                report.errors.append((number, str(e)))
+                continue
+            # The last line of an item in a chunk wins, as batch writes can't repeat keys
+            tables.setdefault(type(item), {})[item.id] = item
+        for table_cls, items in tables.items():
+            _upsert(table_cls, list(items.values()), report)
+        if progress:
+            progress(report)
+    logger.info(
+        f"Imported {report.imported} items: {report.created} created, {report.updated} "
+        f"updated, {len(report.errors)} invalid lines."
+    )
+    return report
+
+
+def export_items(
+    tables: Iterable[type[AIStreamTable]],
+    file: TextIO,
+    page_size: int = config.bulk.chunk_size,
+    progress: Callable[[int], None] | None = None,
+    with_history: bool = False,
+) -> int:
+    """Write the items of tables to a file as JSON Lines and return their number.
+
+    Args:
+        tables: Table classes to export.
+        file: Text file to write to.
+        page_size: Number of items read per scan request.
+        progress: Called with the number of items written after every page.
+        with_history: Also export the versions of prompts, otherwise only their value.
+    """
+    count = 0
+    for table_cls in tables:
+        attributes = None
+        if not with_history:  # The version is meaningless without its history
+            version = PromptsTable.version.attr_name
+            attributes = [a for a in attributes_without_history(table_cls) if a != version]
+        for item in table_cls.scan(page_size=page_size, attributes_to_get=attributes):
+            record = {TABLE_KEY: table_cls.__name__, **item.to_simple_dict()}
+            file.write(json.dumps(record) + "\n")
+            count += 1
+            if progress and count % page_size == 0:
+                progress(count)
+    if progress:
+        progress(count)
+    return count
+
+
+def _open(path: str, mode: Literal["r", "w"]) -> AbstractContextManager[TextIO]:
+    if path == "-":
+        return nullcontext(sys.stdout if mode == "w" else sys.stdin)
+    return open(path, mode)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Import or export tables from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path", help="JSON Lines file, or - for stdin/stdout.")
+    parser.add_argument(
+        "--table",
+        action="append",
+        choices=list(PYNAMODB_TABLES),
+        help="Tables to export, or the table of records without one when importing.",
+    )
+    parser.add_argument("--chunk-size", type=int, default=config.bulk.chunk_size)
+    parser.add_argument(
+        "--history", action="store_true", help="Export the version history of prompts."
+    )
+    args = parser.parse_args(argv)
+    create_tables()
+
+    if args.command == "export":
+        tables = [PYNAMODB_TABLES[name] for name in args.table or PYNAMODB_TABLES]
+        with _open(args.path, "w") as f:
+            count = export_items(tables, f, page_size=args.chunk_size, with_history=args.history)
+        print(f"Exported {count} items.", file=sys.stderr)
+        return 0
+
+    def print_progress(report: ImportReport) -> None:
+        print(f"\rImported {report.imported} items", end="", file=sys.stderr)
+
+    with _open(args.path, "r") as f:
+        report = import_items(
+            f,
+            default_table=args.table[0] if args.table else None,
+            chunk_size=args.chunk_size,
+            progress=print_progress,
+        )
+    print(
+        f"\n{report.created} created, {report.updated} updated, {report.unchanged} unchanged.",
+        file=sys.stderr,
+    )
+    for number, message in report.errors:
+        print(f"Line {number}: {message}", file=sys.stderr)
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
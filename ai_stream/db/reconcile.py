@@ -0,0 +1,403 @@
+"""Reconciliation of the prompts and functions tables with the OpenAI assistants.
+
+Run `python -m ai_stream.db.reconcile` to report the drift between the tables
+and the assistants, and `python -m ai_stream.db.reconcile --apply` to fix it.
+
+Assistants are the source of truth for the prompts and functions they use,
+as recorded in their metadata, and the tables for the instructions and
+function tools of the assistants:
+
+* The `used_by` lists of prompts and functions get the assistants using them.
+  IDs of assistants that are not in the project of the client are kept and
+  reported, as the API can't tell deleted assistants from those of other
+  projects.
+* Assistants get the instructions rendered from their prompt, and the
+  function tools of the schemas of their functions.
+
+The assistants and the tables are read concurrently, and the fixes are
+written with concurrent updates. Only the `used_by` lists of items are
+written, on the condition that they are unchanged since they were read, so
+items edited during a run are left to the next one.
+"""
+
+import argparse
+import os
+import sys
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+from functools import cached_property
+from typing import TYPE_CHECKING
+from typing import Any
+from openai import OpenAIError
+from openai.types.beta import Assistant
+from pynamodb.exceptions import UpdateError
+from ai_stream.config import get_logger
+from ai_stream.config import load_config
+from ai_stream.db.aws import AIStreamTable
+from ai_stream.db.aws import FunctionsTable
+from ai_stream.db.aws import PromptsTable
+from ai_stream.db.aws import attributes_without_history
+from ai_stream.db.aws import create_tables
+from ai_stream.utils.assistant_metadata import function_ids
+from ai_stream.utils.assistant_metadata import update_settings
+from ai_stream.utils.assistant_mirror import assistant_configuration
+from ai_stream.utils.assistant_mirror import versioned_configuration
+from ai_stream.utils.templates import INSTRUCTIONS_KEY
+from ai_stream.utils.templates import TemplateError
+from ai_stream.utils.templates import compile_template
+from ai_stream.utils.templates import render
+from ai_stream.utils.templates import resolve_includes
+from ai_stream.utils.templates import template_variables
+from ai_stream.utils.versioning import content_hash
+
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+logger = get_logger(__name__)
+config = load_config()
+PAGE_SIZE = 100
+"""Assistants listed per request, the maximum of the API."""
+OnUpdate = Callable[[type[AIStreamTable], str], None]
+"""Called with the table and ID of an updated item, e.g. to forget cached copies."""
+
+
+@dataclass
+class ItemFix:
+    """Corrected `used_by` list of a prompt or function."""
+
+    table: str
+    id: str
+    used_by: list[str]
+    old: list[str]
+
+
+@dataclass
+class AssistantFix:
+    """Fields of an assistant to update, and why."""
+
+    assistant_id: str
+    changes: dict[str, Any]
+    reasons: list[str]
+
+
+@dataclass
+class ReconcileReport:
+    """Drift found between the tables and the assistants."""
+
+    assistants: int = 0
+    """Number of assistants checked."""
+    item_fixes: list[ItemFix] = field(default_factory=list)
+    assistant_fixes: list[AssistantFix] = field(default_factory=list)
+    problems: list[str] = field(default_factory=list)
+    """Drift that can't be fixed, and fixes that failed."""
+    unknown: list[str] = field(default_factory=list)
+    """IDs in `used_by` lists of assistants not in the project, left as they are."""
+    applied: bool = False
+    """Whether the fixes were written."""
+
+    def lines(self) -> list[str]:
+        """Return a line per fix and problem, then a summary."""
+        lines = [
+            f"{fix.table} {fix.id}: used_by {fix.old} -> {fix.used_by}" for fix in self.item_fixes
+        ]
+        lines.extend(
+            f"Assistant {fix.assistant_id}: {', '.join(fix.reasons)}"
+            for fix in self.assistant_fixes
+        )
+        lines.extend(f"Problem: {problem}" for problem in self.problems)
+        if self.unknown:
+            lines.append(
+                f"Kept unknown assistants, deleted or of other projects: {', '.join(self.unknown)}"
+            )
+        verb = "Applied" if self.applied else "Found"
+        lines.append(
+            f"{verb} {len(self.item_fixes)} item and {len(self.assistant_fixes)} assistant "
+            f"fixes for {self.assistants} assistants, {len(self.problems)} problems."
+        )
+        return lines
+
+
+@dataclass
+class Snapshot:
+    """Assistants and the items of the tables, read at once."""
+
+    assistants: list[Assistant]
+    prompts: dict[str, PromptsTable]
+    functions: dict[str, FunctionsTable]
+
+    @cached_property
+    def prompt_values(self) -> dict[str, str]:
+        """Prompt texts by name, to resolve includes."""
+        return {prompt.name: prompt.value for prompt in self.prompts.values()}
+
+
+def _scan(table_cls: type[AIStreamTable]) -> dict[str, Any]:
+    items = table_cls.scan(
+        page_size=config.bulk.chunk_size, attributes_to_get=attributes_without_history(table_cls)
+    )
+    return {item.id: item for item in items}
+
+
+def load_snapshot(client: "OpenAI", max_workers: int = config.reconcile.max_workers) -> Snapshot:
+    """Read the assistants and the tables concurrently."""
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        assistants = pool.submit(lambda: list(client.beta.assistants.list(limit=PAGE_SIZE)))
+        prompts = pool.submit(_scan, PromptsTable)
+        functions = pool.submit(_scan, FunctionsTable)
+        return Snapshot(assistants.result(), prompts.result(), functions.result())
+
+
+def _render_instructions(
+    prompt: PromptsTable, values: dict[str, str], metadata: dict[str, str]
+) -> str:
+    def load(name: str) -> str:
+        if name not in values:
+            raise TemplateError(f"No prompt named {name!r}.")
+        return values[name]
+
+    template = compile_template(prompt.value)
+    return render(template, template_variables(metadata), resolve_includes(template, load))
+
+
+def _function_tools(
+    assistant: Assistant, functions: dict[str, FunctionsTable], problems: list[str]
+) -> list[dict[str, Any]]:
+    """Return the tools of an assistant with the schemas of its functions."""
+    expected = []
+    for function_id in function_ids(assistant.metadata or {}):  # type: ignore[arg-type]
+        if function_id in functions:
+            schema = functions[function_id].value.as_dict()
+            expected.append({"type": "function", "function": schema})
+        else:
+            problems.append(f"Assistant {assistant.id} uses missing function {function_id}.")
+    names = {tool["function"]["name"] for tool in expected}
+    tools = []
+    for tool in assistant.tools:
+        dumped = tool.model_dump(exclude_none=True)
+        if tool.type != "function":
+            tools.append(dumped)
+        elif dumped["function"]["name"] not in names:
+            name = dumped["function"]["name"]
+            problems.append(f"Assistant {assistant.id} has function {name} not in the table.")
+            tools.append(dumped)
+    return tools + expected
+
+
+def _same_tools(actual: list[dict[str, Any]], expected: list[dict[str, Any]]) -> bool:
+    """Compare tools by the fields of the expected ones, ignoring API defaults."""
+    if len(actual) != len(expected):
+        return False
+    return all(
+        {key: a.get(key) for key in e} == e
+        if a["type"] != "function"
+        else {key: a["function"].get(key) for key in e["function"]} == e["function"]
+        for a, e in zip(actual, expected, strict=True)
+    )
+
+
+def plan_assistant(
+    assistant: Assistant, snapshot: Snapshot, problems: list[str]
+) -> AssistantFix | None:
+    """Return the fix of the instructions and tools of an assistant, if they drifted.
+
+    Args:
+        assistant: Assistant to check.
+        snapshot: Assistants and items read at once.
+        problems: Drift that can't be fixed, appended to.
+    """
+    metadata: dict[str, str] = dict(assistant.metadata or {})  # type: ignore[call-overload]
+    changes: dict[str, Any] = {}
+    reasons = []
+    prompt_id = metadata.get("prompt_id")
+    if prompt_id and prompt_id not in snapshot.prompts:
+        problems.append(f"Assistant {assistant.id} uses missing prompt {prompt_id}.")
+    elif prompt_id:
+        prompt = snapshot.prompts[prompt_id]
+        try:
+            instructions = _render_instructions(prompt, snapshot.prompt_values, metadata)
+        except TemplateError as e:
+            problems.append(f"Assistant {assistant.id} can't render prompt {prompt_id}: {e}")
+        else:
+            if instructions != (assistant.instructions or ""):
+                changes["instructions"] = instructions
+                reasons.append(f"instructions differ from prompt {prompt.name!r}")
+            metadata = update_settings(metadata, **{INSTRUCTIONS_KEY: content_hash(instructions)})
+
+    tools = _function_tools(assistant, snapshot.functions, problems)
+    actual = [tool.model_dump(exclude_none=True) for tool in assistant.tools]
+    if not _same_tools(actual, tools):
+        changes["tools"] = tools
+        reasons.append("function tools differ from their schemas")
+
+    if not changes and metadata == (assistant.metadata or {}):
+        return None
+    # Cached responses of the previous configuration are not used
+    configuration = versioned_configuration(
+        assistant_configuration(assistant), **changes, metadata=metadata
+    )
+    changes["metadata"] = configuration["metadata"]
+    return AssistantFix(assistant.id, changes, reasons or ["metadata outdated"])
+
+
+def plan(snapshot: Snapshot) -> ReconcileReport:
+    """Return the fixes reconciling the tables and the assistants, without applying them."""
+    report = ReconcileReport(assistants=len(snapshot.assistants))
+    users: dict[str, list[str]] = {}
+    for assistant in snapshot.assistants:
+        metadata: dict[str, str] = assistant.metadata or {}  # type: ignore[assignment]
+        for item_id in [metadata.get("prompt_id"), *function_ids(metadata)]:
+            if item_id:
+                users.setdefault(item_id, []).append(assistant.id)
+        if fix := plan_assistant(assistant, snapshot, report.problems):
+            report.assistant_fixes.append(fix)
+
+    known = {assistant.id for assistant in snapshot.assistants}
+    tables: list[tuple[str, dict[str, Any]]] = [
+        (PromptsTable.__name__, snapshot.prompts),
+        (FunctionsTable.__name__, snapshot.functions),
+    ]
+    unknown = set()
+    for table_name, items in tables:
+        for item in items.values():
+            expected = users.get(item.id, [])
+            # A 404 doesn't tell deleted assistants from those of other projects, keep them
+            kept = [i for i in item.used_by if i not in known]
+            unknown.update(kept)
+            used_by = list(dict.fromkeys([*kept, *expected]))
+            if set(used_by) != set(item.used_by) or len(used_by) != len(item.used_by):
+                report.item_fixes.append(ItemFix(table_name, item.id, used_by, list(item.used_by)))
+    report.unknown = sorted(unknown)
+    return report
+
+
+def apply(
+    client: "OpenAI",
+    snapshot: Snapshot,
+    report: ReconcileReport,
+    max_workers: int = config.reconcile.max_workers,
+    on_update: OnUpdate | None = None,
+) -> None:
+    """Write the fixes of a report, adding the failed ones to its problems.
+
+    Args:
+        client: OpenAI client of the project of the assistants.
+        snapshot: Assistants and items the report was planned from.
+        report: Fixes to write.
+        max_workers: Number of concurrent requests.
+        on_update: Called for every updated item.
+    """
+    tables: dict[str, tuple[type[AIStreamTable], dict[str, Any]]] = {
+        PromptsTable.__name__: (PromptsTable, snapshot.prompts),
+        FunctionsTable.__name__: (FunctionsTable, snapshot.functions),
+    }
+
+    def update_item(fix: ItemFix) -> str | None:
+        table_cls, items = tables[fix.table]
+        try:
+            items[fix.id].update(
+                actions=[table_cls.used_by.set(fix.used_by)],  # type: ignore[arg-type]
+                condition=table_cls.used_by == fix.old,
+            )
+        except UpdateError as e:
+            if e.cause_response_code == "ConditionalCheckFailedException":
+                return f"{fix.table} {fix.id} changed since it was read, not updated."
+            return f"Update of {fix.table} {fix.id} failed: {e}"
+        if on_update:
+            on_update(table_cls, fix.id)
+        return None
+
+    def update(fix: AssistantFix) -> str | None:
+        try:
+            client.beta.assistants.update(fix.assistant_id, **fix.changes)
+        except OpenAIError as e:
+            return f"Update of assistant {fix.assistant_id} failed: {e}"
+        return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        report.problems.extend(filter(None, pool.map(update_item, report.item_fixes)))
+        report.problems.extend(filter(None, pool.map(update, report.assistant_fixes)))
+    report.applied = True
+
+
+def reconcile(
+    client: "OpenAI",
+    fix: bool = False,
+    max_workers: int = config.reconcile.max_workers,
+    on_update: OnUpdate | None = None,
+) -> ReconcileReport:
+    """Find the drift between the tables and the assistants, and fix it if asked.
+
+    Args:
+        client: OpenAI client of the project of the assistants.
+        fix: Apply the fixes, otherwise only report them.
+        max_workers: Number of concurrent requests.
+        on_update: Called for every updated item, see `apply`.
+    """
+    snapshot = load_snapshot(client, max_workers)
+    report = plan(snapshot)
+    if fix:
+        apply(client, snapshot, report, max_workers, on_update)
+    logger.info(report.lines()[-1])
+    return report
+
+
+class ReconcileSchedule(threading.Thread):
+    """Background thread reconciling the tables and the assistants periodically."""
+
+    def __init__(
+        self,
+        client: "OpenAI",
+        interval: float,
+        fix: bool = False,
+        on_update: OnUpdate | None = None,
+    ):
+        """Initialise the schedule.
+
+        Args:
+            client: OpenAI client of the project of the assistants.
+            interval: Seconds between runs, the first one included.
+            fix: Apply the fixes, otherwise only log them.
+            on_update: Called for every updated item, see `apply`.
+        """
+        super().__init__(name="reconcile", daemon=True)
+        self.client = client
+        self.interval = interval
+        self.fix = fix
+        self.on_update = on_update
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        """Reconcile until stopped, logging failures instead of stopping."""
+        while not self._stopped.wait(self.interval):
+            try:
+                reconcile(self.client, self.fix, on_update=self.on_update)
+            except Exception:
+                logger.exception("Reconciliation failed.")
+
+    def stop(self) -> None:
+        """Stop after the current run."""
+        self._stopped.set()
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Reconcile the tables and the assistants from the command line."""
+    from openai import OpenAI
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apply", action="store_true", help="Fix the drift, not only report it.")
+    parser.add_argument("--max-workers", type=int, default=config.reconcile.max_workers)
+    args = parser.parse_args(argv)
+    create_tables()
+    client = OpenAI(project=os.environ.get("PROJECT_ID") or None)
+    report = reconcile(client, fix=args.apply, max_workers=args.max_workers)
+    for line in report.lines():
+        print(line, file=sys.stderr)
+    return 1 if report.problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,55 +1,209 @@
 """Main app for AI Stream."""
 
+import tempfile
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
 import streamlit as st
+from streamlit.delta_generator import DeltaGenerator
 from ai_stream import ASSISTANT_LABEL
 from ai_stream import TESTING
+from ai_stream.components.catalog import select_assistant
 from ai_stream.components.helpers import StreamAssistantEventHandler
 from ai_stream.components.helpers import render_history
-from ai_stream.components.helpers import select_assistant
+from ai_stream.components.messages import AssistantMessage
 from ai_stream.components.messages import UserMessage
 from ai_stream.config import get_logger
+from ai_stream.config import load_config
 from ai_stream.utils.app_state import AppState
 from ai_stream.utils.app_state import ensure_app_state
+from ai_stream.utils.assistant_metadata import get_settings
+from ai_stream.utils.cassettes import CassettePlayer
+from ai_stream.utils.cassettes import CassetteRecorder
+from ai_stream.utils.context_window import SUMMARIZE_KEY
+from ai_stream.utils.context_window import compact_thread
+from ai_stream.utils.context_window import estimate_thread_tokens
+from ai_stream.utils.context_window import run_context_params
+from ai_stream.utils.file_uploads import FileIdCache
+from ai_stream.utils.file_uploads import upload_files
+from ai_stream.utils.response_cache import ENABLED_KEY
+from ai_stream.utils.response_cache import VERSION_KEY
+from ai_stream.utils.response_cache import ResponseCache
+from ai_stream.utils.response_cache import cache_key
 
 
 TITLE = "AI Stream"
 MODEL_NAME = "gpt-4o-mini"
 PROCESSING_START = "`Processing`"
+REPLAY_SPEEDS = {"1x": 1.0, "2x": 2.0, "10x": 10.0, "Max": 0.0}
 
 logger = get_logger(__name__)
+config = load_config()
+
+
+@st.cache_resource
+def get_file_id_cache() -> FileIdCache:
+    """Return the IDs of uploaded files shared by all sessions."""
+    return FileIdCache()
+
+
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    """Return the response cache shared by all sessions."""
+    return ResponseCache(
+        config.response_cache.directory,
+        ttl=config.response_cache.ttl_seconds,
+        max_bytes=config.response_cache.max_bytes,
+    )
+
+
+def response_cache_key(app_state: AppState, assistant_id: str) -> str | None:
+    """Return the response cache key of the conversation if the assistant opted in."""
+    metadata = app_state.assistant_metadata.get(assistant_id, {})
+    if not get_settings(metadata).get(ENABLED_KEY) or "files" in app_state.recent_tool_output:
+        return None
+    user_messages = [m.content or "" for m in app_state.history if isinstance(m, UserMessage)]
+    return cache_key(assistant_id, metadata.get(VERSION_KEY, ""), user_messages)
+
+
+def replay_cached_response(
+    app_state: AppState, st_placeholder: DeltaGenerator, cassette: Path
+) -> None:
+    """Render a cached response and add its text to the OpenAI thread."""
+    start = len(app_state.history)
+    StreamAssistantEventHandler(
+        app_state=app_state,
+        st_placeholder=st_placeholder,
+        player=CassettePlayer.from_file(cassette, speed=0),
+    ).replay()
+    assert app_state.openai_client
+    # Keep the thread complete for later runs that are not cached
+    for message in app_state.history[start:]:
+        if isinstance(message, AssistantMessage) and message.content:
+            app_state.openai_client.beta.threads.messages.create(
+                app_state.openai_thread_id, role="assistant", content=message.content
+            )
+
+
+def thread_messages(app_state: AppState) -> list[tuple[int, dict[str, str]]]:
+    """Return the text messages in the OpenAI thread with their index in the history."""
+    messages = []
+    start = app_state.thread_start
+    for i, entry in enumerate(app_state.history[start:], start=start):
+        if isinstance(entry, UserMessage | AssistantMessage) and entry.content:
+            role = "user" if isinstance(entry, UserMessage) else "assistant"
+            messages.append((i, {"role": role, "content": entry.content}))
+    return messages
+
+
+def compact_context(app_state: AppState, metadata: dict[str, str]) -> None:
+    """Summarise older messages into a new thread if the assistant opted in and it's due."""
+    if not get_settings(metadata).get(SUMMARIZE_KEY):
+        return
+    indexed = thread_messages(app_state)
+    messages = [message for _, message in indexed]
+    # The new thread starts at the last kept message, so at least one is
+    keep = max(config.context.summary_keep_messages, 1)
+    tokens = estimate_thread_tokens(app_state.thread_summary, messages)
+    if tokens <= config.context.summarize_after_tokens or len(messages) <= keep:
+        return
+    assert app_state.openai_client
+    app_state.openai_thread_id, app_state.thread_summary = compact_thread(
+        app_state.openai_client,
+        app_state.thread_summary,
+        messages,
+        keep=keep,
+        model=config.context.summary_model,
+    )
+    app_state.thread_start = indexed[-keep][0]
+
+
+def select_cassette() -> CassettePlayer | None:
+    """Select a recorded cassette to replay instead of calling the API."""
+    directory = Path(config.cassettes.directory)
+    cassettes = sorted(path.name for path in directory.glob("*.jsonl"))
+    if not cassettes:
+        return None
+    with st.sidebar.expander("Replay"):
+        name = st.selectbox(
+            "Cassette", [None, *cassettes], format_func=lambda x: x or "Off", key="cassette"
+        )
+        speed = st.select_slider("Speed", options=list(REPLAY_SPEEDS), key="replay_speed")
+    if name is None:
+        return None
+    return CassettePlayer.from_file(directory / name, speed=REPLAY_SPEEDS[speed])
 
 
 def get_response(
     app_state: AppState,
     assistant_id: str,
     model_name: str = MODEL_NAME,
+    player: CassettePlayer | None = None,
 ) -> None:
-    """Send messages to backend to get an LLM response with UI rendering."""
+    """Send messages to backend to get an LLM response with UI rendering.
+
+    With a `player`, the recorded run is rendered instead.
+    """
     st_placeholder = st.empty()
     with st_placeholder:
         st.write(PROCESSING_START)
+    if player:
+        StreamAssistantEventHandler(
+            app_state=app_state, st_placeholder=st_placeholder, player=player
+        ).replay()
+        st.rerun()
+
+    key = response_cache_key(app_state, assistant_id)
+    if key and (cached := get_response_cache().get(key)):
+        logger.info(f"Replaying cached response {key}.")
+        replay_cached_response(app_state, st_placeholder, cached)
+        st.rerun()
+
+    metadata = app_state.assistant_metadata.get(assistant_id, {})
+    compact_context(app_state, metadata)
     assert app_state.openai_client
     if "files" in app_state.recent_tool_output:
         # TODO: Needs update
         # Use code interpreter assistant
-        file_ids = []
-
-        # Upload files to OpenAI
-        for file in app_state.recent_tool_output["files"]:
-            uploaded = app_state.openai_client.files.create(
-                file=file.getvalue(), purpose="assistants"
-            )
-            file_ids.append(uploaded.id)
-
-    with app_state.openai_client.beta.threads.runs.stream(
-        thread_id=app_state.openai_thread_id,
-        assistant_id=assistant_id,
-        event_handler=StreamAssistantEventHandler(
-            app_state=app_state, st_placeholder=st_placeholder
-        ),
-    ) as stream:
-        stream.until_done()
+        file_ids = upload_files(
+            app_state.openai_client,
+            app_state.recent_tool_output["files"],
+            get_file_id_cache(),
+            max_workers=config.uploads.max_workers,
+        )
+        logger.info(f"Uploaded files {file_ids}.")
 
+    recorder = None
+    recording = None  # Temporary cassette of a response to cache
+    if config.cassettes.record:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = Path(config.cassettes.directory) / f"{timestamp}_{assistant_id}.jsonl"
+        recorder = CassetteRecorder(path)
+    elif key:
+        # Unique per run, as concurrent sessions may ask the same question
+        with tempfile.NamedTemporaryFile(
+            dir=get_response_cache().directory, suffix=".recording", delete=False
+        ) as f:
+            recording = Path(f.name)
+        recorder = CassetteRecorder(recording)
+    try:
+        with (
+            recorder or nullcontext(),
+            app_state.openai_client.beta.threads.runs.stream(
+                thread_id=app_state.openai_thread_id,
+                assistant_id=assistant_id,
+                **run_context_params(metadata),
+                event_handler=StreamAssistantEventHandler(
+                    app_state=app_state, st_placeholder=st_placeholder, recorder=recorder
+                ),
+            ) as stream,
+        ):
+            stream.until_done()
+        if recorder and key:
+            get_response_cache().put(key, recorder.path)
+    finally:
+        if recording:
+            recording.unlink(missing_ok=True)
     st.rerun()
 
 
@@ -58,10 +212,14 @@ def main(app_state: AppState) -> None:
     """App layout."""
     st.title(TITLE)
     assistant_id, _ = select_assistant(app_state.assistants)
+    player = select_cassette()
     assert app_state.openai_client
-    if not app_state.openai_thread_id:  # One thread per session
+    if not app_state.openai_thread_id and not player:  # One thread per session
         thread = app_state.openai_client.beta.threads.create()
         app_state.openai_thread_id = thread.id
+    messages = [message for _, message in thread_messages(app_state)]
+    tokens = estimate_thread_tokens(app_state.thread_summary, messages)
+    st.sidebar.caption(f"Thread size: ~{tokens} tokens in {len(messages)} messages")
     render_history(app_state.history)
 
     user_input = st.chat_input("Your message")
@@ -69,14 +227,15 @@ def main(app_state: AppState) -> None:
         user_msg = UserMessage(content=user_input)
         app_state.history.append(user_msg)
         user_msg.render()  # Make sure user message displays once sent
-        app_state.openai_client.beta.threads.messages.create(
-            app_state.openai_thread_id,
-            role="user",
-            content=user_input,
-        )
+        if not player:
+            app_state.openai_client.beta.threads.messages.create(
+                app_state.openai_thread_id,
+                role="user",
+                content=user_input,
+            )
 
         with st.chat_message(ASSISTANT_LABEL):
-            get_response(app_state, assistant_id)
+            get_response(app_state, assistant_id, player=player)
 
 
 if not TESTING:
@@ -1,6 +1,7 @@
 """Init script for utils."""
 
 import base64
+import hashlib
 import uuid
 
 
@@ -8,3 +9,9 @@ def create_id() -> str:
     """Create a random string ID."""
     uuid_bytes = uuid.uuid4().bytes
     return base64.urlsafe_b64encode(uuid_bytes).rstrip(b"=").decode("ascii")
+
+
+def stable_id(*parts: object) -> str:
+    """Create a string ID derived from the given parts, in the format of `create_id`."""
+    digest = hashlib.sha256("/".join(map(str, parts)).encode()).digest()[:16]
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
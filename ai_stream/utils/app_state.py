@@ -2,10 +2,16 @@
 
 from collections.abc import Callable
 from functools import wraps
+from typing import TYPE_CHECKING
 from typing import Any
-from openai import OpenAI
 from streamlit import session_state
-from ai_stream.utils.function_tools import Function2Display
+from ai_stream.utils.catalog import CatalogView
+
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+    from ai_stream.utils.assistant_mirror import AssistantMirror
+    from ai_stream.utils.function_tools import Function2Display
 
 
 class AppState:
@@ -25,14 +31,26 @@ class AppState:
         """Chat history when talking to chatbot."""
         self.openai_thread_id: str = ""
         """OpenAI Thread ID."""
-        self.prompts: dict = {}
+        self.thread_start: int = 0
+        """Index of the first history entry in the OpenAI thread."""
+        self.thread_summary: str = ""
+        """Summary of the history entries before the OpenAI thread."""
+        self.prompts = CatalogView.standalone()
         """Prompt IDs and names, for displaying in the selector."""
-        self.functions: dict = {}
+        self.functions = CatalogView.standalone()
         """Function IDs and names, for displaying in the selector."""
         self.tables_loaded: bool = False
-        """Tables already loaded."""
-        self.assistants: dict = {}
+        """Views of the shared catalogs of the tables already created."""
+        self.assistants = CatalogView.standalone()
         """Assistant IDs and names, for displaying in the selector."""
+        self.assistant_metadata: dict[str, dict] = {}
+        """Assistant IDs and their metadata, e.g. configuration version."""
+        self.assistant_mirrors: dict[str, AssistantMirror] = {}
+        """Assistant IDs and their last known state, to skip redundant API calls."""
+        self.assistants_account: str = ""
+        """Account the assistants were listed from, see `account_key`."""
+        self.assistants_listed: float = float("-inf")
+        """Monotonic time the assistants were last listed."""
         self.recent_tool_output: dict = {}
         """The latest tool output if any."""
         self.current_function: Function2Display | None = None
@@ -0,0 +1,98 @@
+"""Metadata of assistants, with the settings of the app packed into a single key.
+
+OpenAI allows at most 16 metadata keys of at most 64 characters, with values
+of at most 512 characters. The settings of the app, e.g. the truncation of
+runs or the variables of their prompt, are stored as JSON under
+`SETTINGS_KEY`, without their defaults. The IDs of the functions of an
+assistant are joined under `FUNCTIONS_KEY`, continued under numbered keys
+when they don't fit in a value.
+"""
+
+import json
+from collections.abc import Mapping
+from typing import Any
+
+
+SETTINGS_KEY = "settings"
+FUNCTIONS_KEY = "functions"
+MAX_KEYS = 16
+MAX_KEY_LENGTH = 64
+MAX_VALUE_LENGTH = 512
+
+
+def get_settings(metadata: Mapping[str, str]) -> dict[str, Any]:
+    """Return the settings packed in the metadata of an assistant."""
+    try:
+        settings = json.loads(metadata.get(SETTINGS_KEY) or "{}")
+    except json.JSONDecodeError:
+        return {}
+    return settings if isinstance(settings, dict) else {}
+
+
+def set_settings(metadata: Mapping[str, str], settings: Mapping[str, Any]) -> dict[str, str]:
+    """Return the metadata with the settings packed into `SETTINGS_KEY`.
+
+    Empty settings, e.g. disabled options, are left out.
+    """
+    packed = {key: value for key, value in settings.items() if value not in (None, "", False, {})}
+    updated = {key: value for key, value in metadata.items() if key != SETTINGS_KEY}
+    if packed:
+        updated[SETTINGS_KEY] = json.dumps(packed, separators=(",", ":"), sort_keys=True)
+    return updated
+
+
+def update_settings(metadata: Mapping[str, str], **settings: Any) -> dict[str, str]:
+    """Return the metadata with some of its settings changed."""
+    return set_settings(metadata, {**get_settings(metadata), **settings})
+
+
+def _function_keys(metadata: Mapping[str, str]) -> list[str]:
+    keys: list[str] = []
+    while (key := f"{FUNCTIONS_KEY}_{len(keys)}" if keys else FUNCTIONS_KEY) in metadata:
+        keys.append(key)
+    return keys
+
+
+def function_ids(metadata: Mapping[str, str]) -> list[str]:
+    """Return the IDs of the functions of an assistant."""
+    return [
+        function_id
+        for key in _function_keys(metadata)
+        for function_id in metadata[key].split(",")
+        if function_id
+    ]
+
+
+def set_function_ids(metadata: Mapping[str, str], ids: list[str]) -> dict[str, str]:
+    """Return the metadata with the IDs of the functions of an assistant."""
+    updated = dict(metadata)
+    for key in _function_keys(metadata):
+        del updated[key]
+    values: list[str] = []
+    for function_id in ids:
+        if values and len(values[-1]) + len(function_id) < MAX_VALUE_LENGTH:
+            values[-1] += "," + function_id
+        else:
+            values.append(function_id)
+    for i, value in enumerate(values):
+        updated[f"{FUNCTIONS_KEY}_{i}" if i else FUNCTIONS_KEY] = value
+    return updated
+
+
+def metadata_errors(metadata: Mapping[str, str]) -> list[str]:
+    """Return why the API would reject the metadata of an assistant, if it would."""
+    errors = []
+    if len(metadata) > MAX_KEYS:
+        errors.append(
+            f"The assistant needs {len(metadata)} metadata keys, but at most {MAX_KEYS} are "
+            "allowed. Use fewer functions or prompt variables."
+        )
+    for key, value in metadata.items():
+        if len(key) > MAX_KEY_LENGTH:
+            errors.append(f"Metadata key {key!r} is longer than {MAX_KEY_LENGTH} characters.")
+        if len(value) > MAX_VALUE_LENGTH:
+            errors.append(
+                f"Metadata {key!r} is {len(value)} characters long, but at most "
+                f"{MAX_VALUE_LENGTH} are allowed. Shorten the prompt variables."
+            )
+    return errors
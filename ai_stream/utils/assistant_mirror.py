@@ -0,0 +1,142 @@
+"""Local mirror of the configuration of assistants, to skip redundant API calls."""
+
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from typing import TYPE_CHECKING
+from typing import Any
+from openai.types.beta import Assistant
+from ai_stream.utils.response_cache import VERSION_KEY
+from ai_stream.utils.response_cache import config_version
+
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+
+CONFIGURATION_FIELDS = (
+    "name",
+    "instructions",
+    "model",
+    "temperature",
+    "top_p",
+    "tools",
+    "response_format",
+    "metadata",
+)
+"""Fields of an assistant set by its configuration page."""
+
+
+def assistant_configuration(assistant: Assistant) -> dict[str, Any]:
+    """Return the configuration of an assistant as sent to the API."""
+    return assistant.model_dump(include=set(CONFIGURATION_FIELDS), exclude_none=True)
+
+
+def versioned_configuration(configuration: dict[str, Any], **changes: Any) -> dict[str, Any]:
+    """Return a whole configuration of an assistant with changes, and its version.
+
+    The version is set in the metadata under `VERSION_KEY`, so cached
+    responses of other configurations are not used. It covers the whole
+    configuration, whether it is saved from the page of the assistant or
+    updated with a prompt or a function it uses.
+    """
+    updated = {**configuration, **changes}
+    updated["metadata"] = {**updated.get("metadata", {}), VERSION_KEY: config_version(updated)}
+    return updated
+
+
+def diff_configuration(old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
+    """Return the fields of a configuration that changed.
+
+    Fields are compared as a whole, since the API replaces lists and the
+    metadata instead of merging them.
+    """
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+
+@dataclass
+class AssistantMirror:
+    """Last known state of an assistant, from a retrieval or a save."""
+
+    assistant: Assistant
+    """Assistant returned by the API."""
+    configuration: dict[str, Any] = field(default_factory=dict)
+    """Configuration last sent to the API, or the one of the assistant."""
+    fingerprint: str = field(init=False)
+    """Version of the configuration, see `config_version`."""
+    updated: float = field(default_factory=time.monotonic)
+    """Monotonic time of the last retrieval or save."""
+
+    def __post_init__(self) -> None:
+        """Fingerprint the configuration."""
+        if not self.configuration:
+            self.configuration = assistant_configuration(self.assistant)
+        self.fingerprint = config_version(self.configuration)
+
+    def is_fresh(self, ttl: float) -> bool:
+        """Return whether the mirror was updated less than `ttl` seconds ago."""
+        return time.monotonic() - self.updated < ttl
+
+    def changes(self, configuration: dict[str, Any]) -> dict[str, Any]:
+        """Return the fields to send to update the assistant to a configuration."""
+        if config_version(configuration) == self.fingerprint:
+            return {}
+        return diff_configuration(self.configuration, configuration)
+
+
+def mirror_assistant(
+    mirrors: dict[str, AssistantMirror],
+    assistant: Assistant,
+    configuration: dict[str, Any] | None = None,
+) -> AssistantMirror:
+    """Record the state of an assistant returned by the API.
+
+    A listed or retrieved assistant unchanged since it was saved keeps the
+    configuration sent, which may differ from the one returned, e.g. by the
+    defaults of the tools, so it is not sent again on the next save.
+
+    Args:
+        mirrors: Mirrors by assistant ID, updated in place.
+        assistant: Assistant returned by the API.
+        configuration: Configuration sent to the API, if it was saved.
+    """
+    mirror = mirrors.get(assistant.id)
+    if configuration is None and mirror and mirror.assistant == assistant:
+        mirror.updated = time.monotonic()
+        return mirror
+    mirror = AssistantMirror(assistant, configuration or {})
+    mirrors[assistant.id] = mirror
+    return mirror
+
+
+def update_assistant(
+    client: "OpenAI",
+    mirrors: dict[str, AssistantMirror],
+    assistant_id: str,
+    changes: dict[str, Any],
+    ttl: float,
+) -> dict[str, Any]:
+    """Update some fields of an assistant, versioning and mirroring its whole configuration.
+
+    The changes are applied to the mirrored configuration, retrieved again if
+    it is older than `ttl` seconds, so saving the same configuration from the
+    page of the assistant afterwards finds no changes.
+
+    Args:
+        client: OpenAI client.
+        mirrors: Mirrors by assistant ID, updated in place.
+        assistant_id: ID of the assistant to update.
+        changes: Fields to update, e.g. the instructions.
+        ttl: Maximum age of the mirror in seconds.
+
+    Returns:
+        The configuration of the updated assistant.
+    """
+    mirror = mirrors.get(assistant_id)
+    if mirror is None or not mirror.is_fresh(ttl):
+        mirror = mirror_assistant(mirrors, client.beta.assistants.retrieve(assistant_id))
+    configuration = versioned_configuration(mirror.configuration, **changes)
+    sent = {**changes, "metadata": configuration["metadata"]}
+    assistant = client.beta.assistants.update(assistant_id, **sent)
+    mirror_assistant(mirrors, assistant, configuration)
+    return configuration
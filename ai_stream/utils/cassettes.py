@@ -0,0 +1,126 @@
+"""Recording and replaying of assistant run streams."""
+
+import json
+import time
+from collections.abc import Iterator
+from dataclasses import asdict
+from dataclasses import dataclass
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+from typing import cast
+from openai._models import construct_type
+from openai.types.beta import AssistantStreamEvent
+from ai_stream.config import get_logger
+
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class CassetteEvent:
+    """A stream event recorded in a cassette."""
+
+    offset: float
+    """Seconds since the start of the recording."""
+    segment: int
+    """0 for the run stream, then one per stream of submitted tool outputs."""
+    event: str
+    """Event name, e.g. `thread.message.delta`."""
+    data: dict[str, Any]
+    """Event data as returned by the API."""
+
+    def to_stream_event(self) -> AssistantStreamEvent:
+        """Return the event as the OpenAI client would have parsed it."""
+        value = {"event": self.event, "data": self.data}
+        return cast(AssistantStreamEvent, construct_type(type_=AssistantStreamEvent, value=value))
+
+
+class CassetteRecorder:
+    """Append the stream events of a run to a JSON lines cassette."""
+
+    def __init__(self, path: str | Path):
+        """Initialise."""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.segment = 0
+        self._file = self.path.open("w")
+        self._start = time.monotonic()
+
+    def record(self, event: AssistantStreamEvent) -> None:
+        """Write an event with its offset from the start of the recording."""
+        recorded = CassetteEvent(
+            offset=time.monotonic() - self._start,
+            segment=self.segment,
+            event=event.event,
+            data=event.data.to_dict(mode="json", exclude_unset=False),
+        )
+        self._file.write(json.dumps(asdict(recorded)) + "\n")
+
+    def next_segment(self) -> None:
+        """Start recording the stream of the next tool output submission."""
+        self.segment += 1
+
+    def close(self) -> None:
+        """Close the cassette file."""
+        if not self._file.closed:
+            self._file.close()
+            logger.info(f"Recorded cassette {self.path}.")
+
+    def __enter__(self) -> "CassetteRecorder":
+        """Return the recorder."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the cassette file."""
+        self.close()
+
+
+def load_cassette(path: str | Path) -> list[CassetteEvent]:
+    """Read the events of a cassette."""
+    with Path(path).open() as f:
+        return [CassetteEvent(**json.loads(line)) for line in f if line.strip()]
+
+
+class CassettePlayer:
+    """Play the stream segments of a cassette in order.
+
+    Events keep their recorded spacing divided by `speed`, while the time
+    between segments, i.e. spent on running tools, is not replayed. A speed of
+    0 plays the events without waiting.
+    """
+
+    def __init__(self, events: list[CassetteEvent], speed: float = 1.0):
+        """Initialise."""
+        self.events = events
+        self.speed = speed
+        self._next_segment = 0
+
+    @classmethod
+    def from_file(cls, path: str | Path, speed: float = 1.0) -> "CassettePlayer":
+        """Load a player from a cassette file."""
+        return cls(load_cassette(path), speed=speed)
+
+    def segment(self, index: int) -> Iterator[AssistantStreamEvent]:
+        """Yield the events of a segment at the speed of the player."""
+        events = [event for event in self.events if event.segment == index]
+        if not events:
+            logger.warning(f"Cassette has no segment {index}.")
+            return
+        start = time.monotonic()
+        for event in events:
+            if self.speed:
+                due = (event.offset - events[0].offset) / self.speed
+                time.sleep(max(due - (time.monotonic() - start), 0))
+            yield event.to_stream_event()
+
+    def next_segment(self) -> Iterator[AssistantStreamEvent]:
+        """Yield the events of the segment following the last played one."""
+        index = self._next_segment
+        self._next_segment += 1
+        return self.segment(index)
@@ -0,0 +1,203 @@
+"""Catalogs of the IDs and names of items, shared by all sessions."""
+
+import threading
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Mapping
+from itertools import islice
+from typing import Protocol
+from ai_stream.utils.search import SearchIndex
+
+
+Listener = Callable[[str, str | None, str], None]
+"""Called with the ID, name and text of a changed item. The name is `None` if it was removed."""
+
+
+class Catalog:
+    """IDs and names of the items of a table, loaded on first access.
+
+    A catalog is shared by all sessions, which only hold a `CatalogView` of it,
+    so the memory and startup time of a session don't depend on its size.
+    Listeners are notified of every change, e.g. to keep a search index up
+    to date.
+    """
+
+    def __init__(self, load: Callable[[], Iterable[tuple[str, str, str]]] | None = None):
+        """Initialise the catalog.
+
+        Args:
+            load: Return the ID, name and text of every item, e.g. from a paged
+                scan. Texts are only passed to the listeners.
+        """
+        self._load = load
+        self._loaded = load is None
+        self._names: dict[str, str] = {}
+        self._listeners: list[Listener] = []
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            assert self._load
+            for item_id, name, text in self._load():
+                self._set(item_id, name, text)
+            self._loaded = True
+
+    def subscribe(self, listener: Listener) -> None:
+        """Notify a listener of the changes of the catalog, including its loading."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def __len__(self) -> int:
+        """Return the number of items."""
+        self._ensure_loaded()
+        return len(self._names)
+
+    def __contains__(self, item_id: object) -> bool:
+        """Return whether an item is in the catalog."""
+        self._ensure_loaded()
+        return item_id in self._names
+
+    def __getitem__(self, item_id: str) -> str:
+        """Return the name of an item."""
+        self._ensure_loaded()
+        return self._names[item_id]
+
+    def ids(self) -> list[str]:
+        """Return the IDs of all items."""
+        self._ensure_loaded()
+        with self._lock:
+            return list(self._names)
+
+    def page(self, offset: int, limit: int) -> list[str]:
+        """Return the IDs of a page of items, in insertion order."""
+        self._ensure_loaded()
+        with self._lock:
+            return list(islice(self._names, offset, offset + limit))
+
+    def load(self) -> None:
+        """Load the catalog if it isn't, e.g. before reading indexes kept by listeners."""
+        self._ensure_loaded()
+
+    def set(self, item_id: str, name: str, text: str = "") -> None:
+        """Add or rename an item."""
+        self._ensure_loaded()
+        with self._lock:
+            self._set(item_id, name, text)
+
+    def _set(self, item_id: str, name: str, text: str) -> None:
+        self._names[item_id] = name
+        for listener in self._listeners:
+            listener(item_id, name, text)
+
+    def remove(self, item_id: str) -> None:
+        """Remove an item if it is in the catalog."""
+        self._ensure_loaded()
+        with self._lock:
+            if self._names.pop(item_id, None) is not None:
+                for listener in self._listeners:
+                    listener(item_id, None, "")
+
+    def reload(self) -> None:
+        """Load the catalog again, e.g. after items were written elsewhere."""
+        with self._lock:
+            for item_id in list(self._names):
+                self.remove(item_id)
+            self._loaded = self._load is None
+        self._ensure_loaded()
+
+
+class Index(Protocol):
+    """Index of the items of a catalog, e.g. a `SearchIndex`."""
+
+    def add(self, item_id: str, name: str, text: str = "") -> None:
+        """Add or update an item."""
+
+    def remove(self, item_id: str) -> None:
+        """Remove an item if it is indexed."""
+
+
+def index_listener(index: Index, with_text: bool = True) -> Listener:
+    """Return a listener keeping an index in sync with a catalog.
+
+    Args:
+        index: Index to update.
+        with_text: Pass the texts of the items to the index, not only their names.
+    """
+
+    def update(item_id: str, name: str | None, text: str) -> None:
+        if name is None:
+            index.remove(item_id)
+        else:
+            index.add(item_id, name, text if with_text else "")
+
+    return update
+
+
+class CatalogView(Mapping[str, str]):
+    """View of a session on a catalog, with the unsaved drafts of the session first."""
+
+    def __init__(self, catalog: Catalog, index: SearchIndex):
+        """Initialise the view.
+
+        Args:
+            catalog: Shared catalog.
+            index: Search index kept in sync with the catalog, see `index_listener`.
+        """
+        self.catalog = catalog
+        self.index = index
+        self.drafts: dict[str, str] = {}
+        """IDs and names of new items not saved yet, newest first."""
+
+    @classmethod
+    def standalone(cls) -> "CatalogView":
+        """Return a view of a new catalog owned by a single session."""
+        index = SearchIndex()
+        catalog = Catalog()
+        catalog.subscribe(index_listener(index))
+        return cls(catalog, index)
+
+    def __getitem__(self, item_id: str) -> str:
+        """Return the name of a draft or an item of the catalog."""
+        if item_id in self.drafts:
+            return self.drafts[item_id]
+        return self.catalog[item_id]
+
+    def __contains__(self, item_id: object) -> bool:
+        """Return whether the ID is a draft or an item of the catalog."""
+        return item_id in self.drafts or item_id in self.catalog
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the drafts, then the items of the catalog."""
+        yield from list(self.drafts)
+        yield from self.catalog.ids()
+
+    def __len__(self) -> int:
+        """Return the number of drafts and items."""
+        return len(self.drafts) + len(self.catalog)
+
+    def add_draft(self, item_id: str, name: str) -> None:
+        """Add a new item to the session only."""
+        self.drafts = {item_id: name, **self.drafts}
+
+    def publish(self, item_id: str, name: str, text: str = "") -> None:
+        """Add or update a saved item in the catalog, for all sessions."""
+        self.drafts.pop(item_id, None)
+        self.catalog.set(item_id, name, text)
+
+    def remove(self, item_id: str) -> None:
+        """Remove a draft or a deleted item."""
+        if self.drafts.pop(item_id, None) is None:
+            self.catalog.remove(item_id)
+
+    def search(self, query: str, limit: int) -> list[str]:
+        """Return the drafts and the IDs of the best matches of a query, or the first items."""
+        if query:
+            matches = [i for i in self.index.search(query, limit) if i in self.catalog]
+        else:
+            matches = self.catalog.page(0, limit)
+        return list(self.drafts) + matches
@@ -0,0 +1,94 @@
+"""Limiting the conversation context sent to assistants."""
+
+from typing import TYPE_CHECKING
+from typing import Any
+from ai_stream.config import get_logger
+from ai_stream.utils.assistant_metadata import get_settings
+from ai_stream.utils.tokens import estimate_messages_tokens
+
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+
+logger = get_logger(__name__)
+TRUNCATION_KEY = "truncation"
+LIMIT_KEY = "truncation_limit"
+SUMMARIZE_KEY = "summarize"
+TRUNCATION_TYPES = ["auto", "last_messages", "max_prompt_tokens"]
+SUMMARY_PROMPT = (
+    "Summarise the following conversation between a user and an assistant in a few "
+    "sentences. Keep facts, decisions and open questions. Reply with the summary only."
+)
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+
+
+def run_context_params(metadata: dict[str, str]) -> dict[str, Any]:
+    """Return the run arguments limiting the context, from the settings of an assistant.
+
+    `last_messages` truncates the thread to its last messages, while
+    `max_prompt_tokens` lets OpenAI truncate the thread to a token budget.
+    """
+    settings = get_settings(metadata)
+    truncation = settings.get(TRUNCATION_KEY, "auto")
+    limit = int(settings.get(LIMIT_KEY) or 0)
+    if truncation == "last_messages" and limit:
+        return {"truncation_strategy": {"type": "last_messages", "last_messages": limit}}
+    if truncation == "max_prompt_tokens" and limit:
+        return {"max_prompt_tokens": limit}
+    return {}
+
+
+def estimate_thread_tokens(summary: str, messages: list[dict[str, str]]) -> int:
+    """Estimate the number of tokens of a thread with the given summary and messages."""
+    contents = [summary] if summary else []
+    contents.extend(message["content"] for message in messages)
+    return estimate_messages_tokens(contents)
+
+
+def summarize(client: "OpenAI", summary: str, messages: list[dict[str, str]], model: str) -> str:
+    """Summarise messages, extending the summary of the messages before them."""
+    transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+    if summary:
+        transcript = f"{SUMMARY_PREFIX}{summary}\n{transcript}"
+    completion = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": transcript},
+        ],
+    )
+    return completion.choices[0].message.content or ""
+
+
+def compact_thread(
+    client: "OpenAI",
+    summary: str,
+    messages: list[dict[str, str]],
+    keep: int,
+    model: str,
+) -> tuple[str, str]:
+    """Start a new thread with a summary of older messages and the last messages.
+
+    Args:
+        client: OpenAI client.
+        summary: Summary of the messages before `messages`, if any.
+        messages: Messages of the current thread, with `role` and `content`.
+        keep: Number of last messages to keep as they are, at least 1.
+        model: Chat model writing the summary.
+
+    Returns:
+        The ID of the new thread and the new summary.
+
+    Raises:
+        ValueError: If `keep` is less than 1.
+    """
+    if keep < 1:
+        raise ValueError(f"At least 1 message must be kept, not {keep}.")
+    old, kept = messages[:-keep], messages[-keep:]
+    new_summary = summarize(client, summary, old, model)
+    thread = client.beta.threads.create(
+        messages=[{"role": "assistant", "content": SUMMARY_PREFIX + new_summary}, *kept]  # type: ignore[list-item]
+    )
+    logger.info(f"Compacted {len(old)} messages into thread {thread.id}.")
+    return thread.id, new_summary
@@ -0,0 +1,93 @@
+"""Downsampling of chart data to a bounded number of points."""
+
+import numpy as np
+import pandas as pd
+
+
+OTHER_LABEL = "Other"
+MIN_LTTB_POINTS = 3
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Select points of a series with Largest-Triangle-Three-Buckets.
+
+    Args:
+        x: Sorted x values of the series.
+        y: Y values of the series.
+        n_out: Number of points to keep, at least 3.
+
+    Returns:
+        Sorted indices of the kept points, always including the first and last.
+    """
+    n_in = len(y)
+    if n_out >= n_in or n_in <= MIN_LTTB_POINTS:
+        return np.arange(n_in)
+    n_out = max(n_out, MIN_LTTB_POINTS)
+
+    # First and last points are kept, the rest are split into n_out - 2 buckets
+    edges = np.linspace(1, n_in - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n_in - 1
+    selected = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket, or the last point for the last bucket
+        next_end = edges[i + 2] if i + 2 < len(edges) else n_in
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        # Keep the point forming the largest triangle with the previous and next points
+        areas = np.abs(
+            (x[selected] - next_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (next_y - y[selected])
+        )
+        selected = start + int(np.nanargmax(areas)) if not np.isnan(areas).all() else start
+        indices[i + 1] = selected
+    return indices
+
+
+def downsample_lines(frame: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """Downsample the rows of a line chart frame to at most about `max_points` rows.
+
+    LTTB is applied to every numeric column with an equal share of the budget,
+    and the union of the selected rows is kept so that the peaks and troughs of
+    each series survive.
+    """
+    if len(frame) <= max_points:
+        return frame
+    numeric = frame.select_dtypes("number")
+    if numeric.empty:
+        return frame.iloc[np.linspace(0, len(frame) - 1, max_points).astype(int)]
+
+    if pd.api.types.is_numeric_dtype(frame.index):
+        x = frame.index.to_numpy(dtype=float)
+    else:
+        x = np.arange(len(frame), dtype=float)
+    points_per_column = max(max_points // numeric.shape[1], MIN_LTTB_POINTS)
+    rows = np.unique(
+        np.concatenate(
+            [
+                lttb_indices(x, numeric[column].to_numpy(dtype=float), points_per_column)
+                for column in numeric.columns
+            ]
+        )
+    )
+    return frame.iloc[rows]
+
+
+def aggregate_bars(frame: pd.DataFrame, max_bars: int) -> pd.DataFrame:
+    """Keep the `max_bars - 1` largest bars and aggregate the rest into one bar.
+
+    Bars are ranked by the sum of the absolute values of their numeric columns
+    and keep their original order.
+    """
+    if len(frame) <= max_bars:
+        return frame
+    numeric = frame.select_dtypes("number")
+    magnitude = numeric.abs().sum(axis=1).to_numpy()
+    top = np.sort(np.argsort(-magnitude, kind="stable")[: max_bars - 1])
+    rest = np.setdiff1d(np.arange(len(frame)), top)
+
+    kept = numeric.iloc[top]
+    kept.index = kept.index.astype(str)
+    other = numeric.iloc[rest].sum().to_frame(OTHER_LABEL).T
+    return pd.concat([kept, other])
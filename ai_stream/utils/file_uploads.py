@@ -0,0 +1,111 @@
+"""Uploading of user files to OpenAI."""
+
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+from typing import BinaryIO
+from ai_stream.config import get_logger
+
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+
+logger = get_logger(__name__)
+CHUNK_SIZE = 1 << 20  # 1 MiB
+
+
+@dataclass
+class SpooledFile:
+    """An uploaded file copied to a temporary file on disk."""
+
+    name: str
+    path: str
+    content_hash: str
+    size: int
+
+
+def spool_file(file: BinaryIO, name: str) -> SpooledFile:
+    """Copy a file-like object to a temporary file in chunks, hashing it on the way."""
+    file.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(delete=False, prefix="ai_stream_") as tmp:
+        while chunk := file.read(CHUNK_SIZE):
+            digest.update(chunk)
+            tmp.write(chunk)
+            size += len(chunk)
+    return SpooledFile(name=name, path=tmp.name, content_hash=digest.hexdigest(), size=size)
+
+
+class FileIdCache:
+    """Map of (account, content hash) to OpenAI file IDs, shared by all sessions.
+
+    Accounts are identified by `account_key`, so files uploaded with one API
+    key are never reused for another one, even in a project of the same name.
+    """
+
+    def __init__(self) -> None:
+        """Initialise."""
+        self._file_ids: dict[tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, account: str, content_hash: str) -> str | None:
+        """Return the file ID of already uploaded content, if any."""
+        with self._lock:
+            return self._file_ids.get((account, content_hash))
+
+    def set(self, account: str, content_hash: str, file_id: str) -> None:
+        """Store the file ID of uploaded content."""
+        with self._lock:
+            self._file_ids[(account, content_hash)] = file_id
+
+
+def account_key(client: "OpenAI") -> str:
+    """Return a hash identifying the API key, organization and project of a client."""
+    identity = "\0".join([client.api_key, client.organization or "", client.project or ""])
+    return hashlib.sha256(identity.encode()).hexdigest()
+
+
+def _upload(client: "OpenAI", spooled: SpooledFile) -> str:
+    with open(spooled.path, "rb") as f:
+        # The file is streamed from disk by the HTTP client
+        uploaded = client.files.create(file=(spooled.name, f), purpose="assistants")
+    logger.info(f"Uploaded {spooled.name} ({spooled.size} bytes) as {uploaded.id}.")
+    return uploaded.id
+
+
+def upload_files(
+    client: "OpenAI", files: list[BinaryIO], cache: FileIdCache, max_workers: int = 4
+) -> list[str]:
+    """Upload files to OpenAI concurrently, skipping content uploaded before.
+
+    Args:
+        client: OpenAI client, whose account scopes the deduplication.
+        files: File-like objects, e.g. from a Streamlit file uploader.
+        cache: Map of already uploaded content to file IDs.
+        max_workers: Maximum number of concurrent uploads.
+
+    Returns:
+        The file IDs, in the order of the given files.
+    """
+    account = account_key(client)
+    spooled = [spool_file(f, getattr(f, "name", "upload")) for f in files]
+    try:
+        to_upload: dict[str, SpooledFile] = {}
+        for item in spooled:
+            if not cache.get(account, item.content_hash):
+                to_upload.setdefault(item.content_hash, item)  # Once per identical content
+        if to_upload:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                file_ids = pool.map(lambda item: _upload(client, item), to_upload.values())
+                for content_hash, file_id in zip(to_upload, file_ids, strict=True):
+                    cache.set(account, content_hash, file_id)
+        return [cache.get(account, item.content_hash) or "" for item in spooled]
+    finally:
+        for item in spooled:
+            os.unlink(item.path)
@@ -1,35 +1,328 @@
 """Utils for function tools."""
 
+import copy
+import hashlib
 import json
 from dataclasses import dataclass
 from dataclasses import field
-from langchain_core.utils.function_calling import convert_to_openai_function
+from dataclasses import replace
+from functools import lru_cache
+from typing import Any
 from pydantic import BaseModel
 from ai_stream.utils import create_id
+from ai_stream.utils import stable_id
 
 
 NEW_SCHEMA_NAME = "New"
-PARAM_TYPES = ["string", "number", "integer", "boolean", "array", "object"]
+ANY_OF = "anyOf"
+PARAM_TYPES = ["string", "number", "integer", "boolean", "array", "object", ANY_OF, "null"]
+ENUM_TYPES = ["string", "number", "integer"]
+
+# Shared across sessions, keyed by (qualified class name, definition hash)
+_openai_function_cache: dict[tuple[str, str], dict] = {}
+_function_template_cache: dict[tuple[str, str], "Function2Display"] = {}
+
+
+def _model_cache_key(schema: type[BaseModel]) -> tuple[str, str]:
+    """Return the cache key of a Pydantic model.
+
+    The definition hash covers the docstring and fields, so a redefined model
+    (e.g. after Streamlit reloads a module) does not hit a stale entry.
+    """
+    fields = [(name, repr(info)) for name, info in schema.model_fields.items()]
+    definition = json.dumps([schema.__doc__, fields], default=str)
+    digest = hashlib.sha256(definition.encode()).hexdigest()
+    return f"{schema.__module__}.{schema.__qualname__}", digest
+
+
+def get_openai_function(schema: type[BaseModel]) -> dict:
+    """Return the OpenAI function schema of a Pydantic model, generated once per definition."""
+    key = _model_cache_key(schema)
+    if key not in _openai_function_cache:
+        from langchain_core.utils.function_calling import convert_to_openai_function
+
+        _openai_function_cache[key] = convert_to_openai_function(schema)
+    # Callers are free to modify the returned schema
+    return copy.deepcopy(_openai_function_cache[key])
 
 
 @dataclass
 class FunctionParameter:
-    """Data class for a function parameter."""
+    """Data class for a function parameter.
+
+    Objects, arrays of objects, `anyOf` and arrays of `anyOf` can be nested: the
+    properties or variants belong to the parameter or, for arrays, its items.
+    """
 
     name: str = ""
     description: str = ""
-    type: str = "string"  # TODO: Support multi-type annotation (anyOf)
+    type: str = "string"
     required: bool = True
     enum: list[str] = field(default_factory=list)
     items_type: str = "string"
     type_index: int = 0
     items_type_index: int = 0
+    properties: dict[str, "FunctionParameter"] = field(default_factory=dict)
+    """Properties of an object by ID."""
+    any_of: dict[str, "FunctionParameter"] = field(default_factory=dict)
+    """Variants of an `anyOf` by ID, without names."""
 
     def __post_init__(self) -> None:
         """Initialise indexes of parameter type and item_type."""
         self.type_index = PARAM_TYPES.index(self.type)
         self.items_type_index = PARAM_TYPES.index(self.items_type)
 
+    @property
+    def nested_type(self) -> str:
+        """Type of the parameter, or of its items for arrays."""
+        return self.items_type if self.type == "array" else self.type
+
+
+def _resolve_ref(
+    schema: dict[str, Any], defs: dict[str, Any], seen: frozenset[str]
+) -> tuple[dict[str, Any], frozenset[str]]:
+    """Inline a `$ref` to `$defs`, returning the schema and the references followed."""
+    ref = schema.get("$ref")
+    if not ref:
+        return schema, seen
+    if ref in seen:
+        raise ValueError(f"Recursive reference {ref} is not supported.")
+    resolved = {**defs[ref.rsplit("/", 1)[-1]], **{k: v for k, v in schema.items() if k != "$ref"}}
+    return _resolve_ref(resolved, defs, seen | {ref})
+
+
+def _parse_properties(
+    parent_id: str, schema: dict[str, Any], defs: dict[str, Any], seen: frozenset[str]
+) -> dict[str, FunctionParameter]:
+    """Parse the properties of an object schema, with IDs derived from the parent ID."""
+    required = schema.get("required", [])
+    parameters = {}
+    for position, (name, prop) in enumerate(schema.get("properties", {}).items()):
+        # Deterministic, so that reloading the same schema keeps the widget keys
+        param_id = stable_id(parent_id, position, name)
+        parameters[param_id] = _parse_parameter(param_id, name, prop, defs, seen)
+        parameters[param_id].required = name in required
+    return parameters
+
+
+def _parse_type(
+    param_id: str, schema: dict[str, Any], defs: dict[str, Any], seen: frozenset[str]
+) -> tuple[str, dict[str, FunctionParameter], dict[str, FunctionParameter]]:
+    """Return the type of a schema with its properties and variants."""
+    variants = schema.get("anyOf") or schema.get("oneOf")
+    schema_type = schema.get("type", "string")
+    if isinstance(schema_type, list):  # E.g. ["string", "null"]
+        rest = {k: v for k, v in schema.items() if k not in ["type", "description"]}
+        variants = [{**rest, "type": variant} for variant in schema_type]
+    if variants:
+        any_of = {}
+        for position, variant in enumerate(variants):
+            variant_id = stable_id(param_id, position, "")
+            any_of[variant_id] = _parse_parameter(variant_id, "", variant, defs, seen)
+        return ANY_OF, {}, any_of
+    if schema_type == "object":
+        return schema_type, _parse_properties(param_id, schema, defs, seen), {}
+    return schema_type, {}, {}
+
+
+def _parse_parameter(
+    param_id: str,
+    name: str,
+    schema: dict[str, Any],
+    defs: dict[str, Any],
+    seen: frozenset[str],
+) -> FunctionParameter:
+    """Parse the JSON Schema of a parameter."""
+    schema, seen = _resolve_ref(schema, defs, seen)
+    param_type, properties, any_of = _parse_type(param_id, schema, defs, seen)
+    items_type = "string"
+    if param_type == "array":
+        items, items_seen = _resolve_ref(schema.get("items", {}), defs, seen)
+        items_type, properties, any_of = _parse_type(param_id, items, defs, items_seen)
+    return FunctionParameter(
+        name=name,
+        description=schema.get("description", ""),
+        type=param_type,
+        enum=schema.get("enum", []),
+        items_type=items_type,
+        properties=properties,
+        any_of=any_of,
+    )
+
+
+def _with_ids(
+    parameters: dict[str, FunctionParameter], parent_id: str
+) -> dict[str, FunctionParameter]:
+    """Return copies of parameters with IDs derived from the parent ID."""
+    copies = {}
+    for position, param in enumerate(parameters.values()):
+        param_id = stable_id(parent_id, position, param.name)
+        copies[param_id] = replace(
+            param,
+            enum=list(param.enum),
+            properties=_with_ids(param.properties, param_id),
+            any_of=_with_ids(param.any_of, param_id),
+        )
+    return copies
+
+
+def _properties_fingerprint(parameters: dict[str, FunctionParameter]) -> tuple:
+    """Return the structure of the named parameters of an object, for hashing."""
+    return tuple(
+        (param.name, param.required, parameter_fingerprint(param))
+        for param in parameters.values()
+        if param.name  # Skip parameters without a name
+    )
+
+
+def parameter_fingerprint(param: FunctionParameter, variant: bool = False) -> tuple:
+    """Return everything the JSON Schema of a parameter depends on, as a hashable tree.
+
+    Structurally equal parameters have equal fingerprints, whichever objects
+    and IDs they have.
+    """
+    description = param.description if param.description or not variant else None
+    return (
+        param.type,
+        description,
+        tuple(param.enum) if param.type in ENUM_TYPES else (),
+        param.items_type if param.type == "array" else None,
+        _properties_fingerprint(param.properties) if param.nested_type == "object" else (),
+        tuple(parameter_fingerprint(v, variant=True) for v in param.any_of.values())
+        if param.nested_type == ANY_OF
+        else (),
+    )
+
+
+def _type_schema(param_type: str, properties: tuple, any_of: tuple) -> dict[str, Any]:
+    if param_type == ANY_OF:
+        return {"anyOf": [compile_parameter(variant) for variant in any_of]}
+    if param_type == "object":
+        return compile_object(properties)
+    return {"type": param_type}
+
+
+@lru_cache(maxsize=4096)
+def compile_object(properties: tuple) -> dict[str, Any]:
+    """Return the JSON Schema of an object from the fingerprint of its properties.
+
+    Memoized, so unchanged subtrees are not rebuilt. The returned schemas are
+    shared and must not be modified.
+    """
+    schema: dict[str, Any] = {
+        "type": "object",
+        "properties": {name: compile_parameter(fp) for name, _, fp in properties},
+    }
+    required = [name for name, is_required, _ in properties if is_required]
+    if required:
+        schema["required"] = required
+    return schema
+
+
+@lru_cache(maxsize=4096)
+def compile_parameter(fingerprint: tuple) -> dict[str, Any]:
+    """Return the JSON Schema of a parameter from its fingerprint, see `compile_object`."""
+    param_type, description, enum, items_type, properties, any_of = fingerprint
+    schema: dict[str, Any] = (
+        _type_schema(param_type, properties, any_of).copy()
+        if param_type == ANY_OF
+        else {"type": param_type}
+    )
+    if description is not None:
+        schema["description"] = description
+    if enum:
+        schema["enum"] = list(enum)
+    if param_type == "array":
+        schema["items"] = _type_schema(items_type, properties, any_of)
+    elif param_type == "object":
+        schema.update({k: v for k, v in compile_object(properties).items() if k != "type"})
+    return schema
+
+
+@lru_cache(maxsize=256)
+def _compile_function(fingerprint: tuple) -> tuple[dict, str]:
+    function_name, function_description, properties = fingerprint
+    schema = {
+        "name": function_name,
+        "description": function_description,
+        "parameters": compile_object(properties),
+    }
+    return schema, json.dumps(schema, indent=2)
+
+
+def build_json_schema(
+    function_name: str, function_description: str, parameters: dict[str, FunctionParameter]
+) -> tuple[dict, str]:
+    """Build json schema given the function parameters.
+
+    The schema and its serialisation are memoized on the structure of the
+    parameters, so they are only rebuilt for changed subtrees. The returned
+    schema is shared and must not be modified.
+    """
+    fingerprint = (function_name, function_description, _properties_fingerprint(parameters))
+    return _compile_function(fingerprint)
+
+
+@dataclass
+class ParametersDiff:
+    """Changes between the parameters of two versions of a function, by parameter ID."""
+
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        """Whether there are any changes."""
+        return bool(self.added or self.removed or self.changed)
+
+
+def diff_parameters(
+    old: dict[str, FunctionParameter], new: dict[str, FunctionParameter]
+) -> tuple[dict[str, FunctionParameter], ParametersDiff]:
+    """Match the parameters of a new version of a function to the old ones.
+
+    A new parameter takes the ID of the old parameter with the same name or,
+    failing that, at the same position, e.g. when it was renamed. Unchanged
+    parameters keep their old objects, so their widgets are not rebuilt.
+
+    Args:
+        old: Parameters of the old version by ID.
+        new: Parameters of the new version by ID.
+
+    Returns:
+        The new parameters by matched IDs, and the changes.
+    """
+    new_items = list(new.items())
+    old_ids = list(old)
+    old_id_by_name = {param.name: param_id for param_id, param in old.items()}
+    unmatched = set(old)
+    matched: dict[int, str] = {}
+    for position, (_, param) in enumerate(new_items):
+        param_id = old_id_by_name.get(param.name)
+        if param_id in unmatched:
+            matched[position] = param_id
+            unmatched.remove(param_id)
+    for position in range(min(len(new_items), len(old_ids))):
+        if position not in matched and old_ids[position] in unmatched:
+            matched[position] = old_ids[position]
+            unmatched.remove(old_ids[position])
+
+    parameters: dict[str, FunctionParameter] = {}
+    diff = ParametersDiff(removed=[param_id for param_id in old if param_id in unmatched])
+    for position, (new_id, param) in enumerate(new_items):
+        param_id = matched.get(position)
+        if param_id is None:
+            parameters[new_id] = param
+            diff.added.append(new_id)
+        elif old[param_id] == param:
+            parameters[param_id] = old[param_id]
+            diff.unchanged.append(param_id)
+        else:
+            parameters[param_id] = param
+            diff.changed.append(param_id)
+    return parameters, diff
+
 
 @dataclass
 class Function2Display:
@@ -55,20 +348,10 @@ class Function2Display:
         # Extract the necessary fields
         function_name = schema_dict.get("name")
         function_description = schema_dict.get("description")
-        parameters = schema_dict.get("parameters")
-        required = parameters.get("required", [])
-        converted_params: dict[str, FunctionParameter] = {}
-        for param_name, param in parameters["properties"].items():
-            param_id = create_id()
-            fields = {
-                "name": param_name,
-                "description": param["description"],
-                "type": param["type"],
-                "required": param_name in required,
-                "enum": param.get("enum", []),  # For enum values
-                "items_type": param.get("items", {}).get("type", "string"),
-            }
-            converted_params[param_id] = FunctionParameter(**fields)
+        parameters = schema_dict.get("parameters") or {}
+        # References are inlined
+        defs = parameters.get("$defs") or parameters.get("definitions") or {}
+        converted_params = _parse_properties(schema_id, parameters, defs, frozenset())
 
         return cls(
             schema_id=schema_id,
@@ -84,11 +367,18 @@ class Function2Display:
         cls, schema_id: str, schema_name: str, schema: type[BaseModel], is_new: bool = True
     ) -> "Function2Display":
         """Load data from a Pydantic Model."""
-        schema_dict = convert_to_openai_function(schema)
-        return cls.from_openai_function(
+        key = _model_cache_key(schema)
+        if key not in _function_template_cache:
+            _function_template_cache[key] = cls.from_openai_function(
+                schema_id="", schema_name="", schema=get_openai_function(schema)
+            )
+        template = _function_template_cache[key]
+        return replace(
+            template,
             schema_id=schema_id,
             schema_name=schema_name,
-            schema=schema_dict,
+            parameters=_with_ids(template.parameters, schema_id),
+            used_by=[],
             is_new=is_new,
         )
 
@@ -0,0 +1,208 @@
+"""Local cache of images displayed in the chat."""
+
+import hashlib
+import io
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPMessage
+from pathlib import Path
+from typing import IO
+from urllib.parse import urlparse
+from ai_stream.config import get_logger
+
+
+logger = get_logger(__name__)
+FETCH_TIMEOUT = 10
+FETCH_WORKERS = 4
+ALLOWED_SCHEMES = ("http", "https")
+"""Schemes of the URLs of cached images, so assistants can't read local files."""
+
+
+class ImageUnavailableError(OSError):
+    """The image failed to download recently, so it is not tried again yet."""
+
+
+class ImageTooLargeError(OSError):
+    """The image is larger than the cache accepts."""
+
+
+class _WebRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Follow redirects to web URLs only."""
+
+    def redirect_request(  # noqa: PLR0913
+        self,
+        req: urllib.request.Request,
+        fp: IO[bytes],
+        code: int,
+        msg: str,
+        headers: HTTPMessage,
+        newurl: str,
+    ) -> urllib.request.Request | None:
+        if urlparse(newurl).scheme not in ALLOWED_SCHEMES:
+            raise urllib.error.HTTPError(newurl, code, "Redirect to a non-web URL", headers, fp)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+_opener = urllib.request.build_opener(_WebRedirectHandler)
+
+
+class ImageCache:
+    """Content-addressed image cache on the local disk.
+
+    Images are fetched once and stored under the SHA-256 hash of their content,
+    together with display-sized thumbnails. When the cache grows over its size
+    limit, the least recently used files are removed. URLs that failed to
+    download are not tried again for `failure_ttl` seconds. Only http(s) URLs
+    are fetched, and images over `max_image_bytes` are rejected.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        max_bytes: int,
+        thumbnail_width: int,
+        failure_ttl: float = 300,
+        max_image_bytes: int = 20 * 1024 * 1024,
+    ):
+        """Initialise."""
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.thumbnail_width = thumbnail_width
+        self.failure_ttl = failure_ttl
+        self.max_image_bytes = max_image_bytes
+        self._url_to_hash: dict[str, str] = {}
+        self._failures: dict[str, float] = {}
+        """URLs and the monotonic time they can be tried again."""
+        self._pending: set[str] = set()
+        self._pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="images")
+        self._lock = threading.Lock()
+
+    def _path(self, content_hash: str, width: int | None = None) -> Path:
+        name = content_hash if width is None else f"{content_hash}_w{width}"
+        return self.directory / name
+
+    def cached(self, url: str) -> str | None:
+        """Return the content hash of the image at the URL if it is cached."""
+        with self._lock:
+            content_hash = self._url_to_hash.get(url)
+        if content_hash and self._path(content_hash).exists():
+            return content_hash
+        return None
+
+    def fetch(self, url: str) -> str:
+        """Make sure the image at the URL is cached and return its content hash.
+
+        Raises:
+            ValueError: The URL is not an http(s) URL.
+            ImageUnavailableError: The download failed less than `failure_ttl`
+                seconds ago.
+            ImageTooLargeError: The image is larger than `max_image_bytes`.
+        """
+        if content_hash := self.cached(url):
+            return content_hash
+        if urlparse(url).scheme not in ALLOWED_SCHEMES:
+            raise ValueError(f"Only {' and '.join(ALLOWED_SCHEMES)} images are cached: {url}")
+        with self._lock:
+            if self._failures.get(url, 0) > time.monotonic():
+                raise ImageUnavailableError(f"Image {url} failed to download recently.")
+
+        try:
+            with _opener.open(url, timeout=FETCH_TIMEOUT) as response:
+                content = response.read(self.max_image_bytes + 1)  # Never more than the cap
+            if len(content) > self.max_image_bytes:
+                raise ImageTooLargeError(
+                    f"Image {url} is larger than {self.max_image_bytes} bytes."
+                )
+        except Exception:
+            with self._lock:
+                self._failures[url] = time.monotonic() + self.failure_ttl
+            raise
+        content_hash = hashlib.sha256(content).hexdigest()
+        path = self._path(content_hash)
+        if not path.exists():  # Identical images from different URLs are stored once
+            path.write_bytes(content)
+            logger.info(f"Cached image {url} as {content_hash}.")
+        with self._lock:
+            self._url_to_hash[url] = content_hash
+            self._failures.pop(url, None)
+        self.evict()
+        return content_hash
+
+    def fetch_in_background(self, url: str) -> Future | None:
+        """Fetch the image at the URL in a thread, unless it is being fetched or failed recently.
+
+        Returns:
+            The future of the fetch, if one was started.
+        """
+        with self._lock:
+            if url in self._pending or self._failures.get(url, 0) > time.monotonic():
+                return None
+            self._pending.add(url)
+        return self._pool.submit(self._fetch_pending, url)
+
+    def _fetch_pending(self, url: str) -> None:
+        try:
+            self.fetch(url)
+        except Exception as e:
+            logger.warning(f"Failed to cache image {url}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(url)
+
+    def cached_thumbnail(self, url: str, width: int | None = None) -> bytes | None:
+        """Return the thumbnail of the image at the URL if it is cached.
+
+        Otherwise, the image is fetched in the background and `None` is returned,
+        so reruns don't wait for downloads.
+        """
+        if self.cached(url) is None:
+            self.fetch_in_background(url)
+            return None
+        return self.thumbnail(url, width)
+
+    def get(self, url: str) -> bytes:
+        """Return the original bytes of the image at the URL."""
+        path = self._path(self.fetch(url))
+        os.utime(path)  # Mark as recently used
+        return path.read_bytes()
+
+    def thumbnail(self, url: str, width: int | None = None) -> bytes:
+        """Return the image at the URL resized to at most the given width."""
+        width = width or self.thumbnail_width
+        content_hash = self.fetch(url)
+        path = self._path(content_hash, width)
+        if not path.exists():
+            from PIL import Image
+
+            with Image.open(self._path(content_hash)) as image:
+                if image.width <= width:
+                    return self.get(url)
+                image_format = image.format or "PNG"
+                image.thumbnail((width, image.height))
+                buffer = io.BytesIO()
+                image.save(buffer, format=image_format)
+            path.write_bytes(buffer.getvalue())
+            self.evict()
+        os.utime(path)
+        return path.read_bytes()
+
+    def size(self) -> int:
+        """Return the total size of the cached files in bytes."""
+        return sum(path.stat().st_size for path in self.directory.iterdir())
+
+    def evict(self) -> None:
+        """Remove the least recently used files until the cache fits its size limit."""
+        with self._lock:
+            files = sorted(self.directory.iterdir(), key=lambda path: path.stat().st_mtime)
+            total = sum(path.stat().st_size for path in files)
+            for path in files:
+                if total <= self.max_bytes:
+                    break
+                total -= path.stat().st_size
+                path.unlink(missing_ok=True)
@@ -0,0 +1,114 @@
+"""Import-time profiling of the app.
+
+Run `python -m ai_stream.utils.import_profile` to print the time spent importing
+each package when the app starts. Pass `--budget-ms` to fail when the total
+import time exceeds a budget, e.g. in CI to catch cold start regressions.
+
+The target is either a module to import or a Streamlit script, which is run
+through `AppTest` since pages can only be created within a script run.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+
+
+DEFAULT_TARGET = "ai_stream/app.py"
+IMPORTTIME_PREFIX = "import time:"
+
+
+@dataclass
+class ImportTiming:
+    """Timing of a single imported module as reported by `-X importtime`."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+    @property
+    def package(self) -> str:
+        """Top-level package of the module."""
+        return self.module.split(".")[0]
+
+
+def parse_importtime(output: str) -> list[ImportTiming]:
+    """Parse the stderr output of `python -X importtime`."""
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith(IMPORTTIME_PREFIX):
+            continue
+        self_us, cumulative_us, name = line[len(IMPORTTIME_PREFIX) :].split("|")
+        if not self_us.strip().isdigit():  # Header line
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        timings.append(
+            ImportTiming(
+                module=name.strip(),
+                self_us=int(self_us),
+                cumulative_us=int(cumulative_us),
+                depth=depth,
+            )
+        )
+    return timings
+
+
+def profile_imports(target: str = DEFAULT_TARGET) -> list[ImportTiming]:
+    """Import the given module or script in a fresh interpreter and return its timings."""
+    if target.endswith(".py"):
+        code = f"from streamlit.testing.v1 import AppTest; AppTest.from_file({target!r}).run()"
+    else:
+        code = f"import {target}"
+    env = {**os.environ, "TESTING": "true"}  # Import pages without running them
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def time_by_package(timings: list[ImportTiming]) -> dict[str, int]:
+    """Sum the self time of all modules per top-level package, slowest first."""
+    totals: dict[str, int] = defaultdict(int)
+    for timing in timings:
+        totals[timing.package] += timing.self_us
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def format_report(timings: list[ImportTiming], top: int = 20) -> str:
+    """Format a per-package import time report."""
+    totals = time_by_package(timings)
+    total_ms = sum(totals.values()) / 1000
+    lines = [f"{'package':<40}{'self [ms]':>12}{'share':>8}"]
+    for package, self_us in list(totals.items())[:top]:
+        share = self_us / 1000 / total_ms if total_ms else 0
+        lines.append(f"{package:<40}{self_us / 1000:>12.1f}{share:>8.1%}")
+    lines.append(f"{'total':<40}{total_ms:>12.1f}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Print the import time report and check it against the budget."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("target", nargs="?", default=DEFAULT_TARGET)
+    parser.add_argument("--top", type=int, default=20, help="Number of packages to show.")
+    parser.add_argument("--budget-ms", type=float, help="Fail if total import time exceeds it.")
+    args = parser.parse_args(argv)
+
+    timings = profile_imports(args.target)
+    print(format_report(timings, top=args.top))
+    total_ms = sum(timing.self_us for timing in timings) / 1000
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"Import time {total_ms:.1f} ms exceeds budget of {args.budget_ms:.1f} ms.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Parsing of incomplete JSON, e.g. streamed function arguments."""
+
+import json
+from typing import Any
+
+
+CLOSING = {"{": "}", "[": "]"}
+SKIPPED = " \t\n\r:"
+
+
+class PartialJsonParser:
+    """Parser of a JSON document that arrives in pieces.
+
+    The scan position, the open brackets and the string state are kept between
+    pieces, so every character is scanned once. Only the prefixes ending after
+    the last valid one are parsed again, closed by the brackets open at their end.
+    """
+
+    def __init__(self) -> None:
+        """Initialise."""
+        self.text = ""
+        """The document received so far."""
+        self.stack: list[str] = []
+        """Closing brackets of the open arrays and objects, innermost last."""
+        self.in_string = False
+        self.escaped = False
+        self.cuts: list[tuple[int, str]] = []
+        """Ends of the prefixes not tried yet, with their closing brackets."""
+        self.parsed: Any = None
+        """Value of the longest valid prefix found so far."""
+
+    def feed(self, piece: str) -> None:
+        """Scan the next piece of the document."""
+        start = len(self.text)
+        self.text += piece
+        for i in range(start, len(self.text)):
+            self._scan(i, self.text[i])
+
+    def _scan(self, i: int, char: str) -> None:
+        if self.in_string:
+            if char == '"' and not self.escaped:
+                self.in_string = False
+                self.cuts.append((i + 1, "".join(reversed(self.stack))))
+            self.escaped = char == "\\" and not self.escaped
+            return
+        if char == '"':
+            self.in_string = True
+            return
+        if char in CLOSING:
+            self.stack.append(CLOSING[char])
+        elif char in "}]" and self.stack:
+            self.stack.pop()
+        elif char in SKIPPED:
+            return
+        # After brackets, numbers and literals, or before a comma
+        end = i if char == "," else i + 1
+        self.cuts.append((end, "".join(reversed(self.stack))))
+
+    def value(self) -> Any:
+        """Return the value of the longest prefix that is valid once closed.
+
+        Returns:
+            The parsed value, or `None` if not even a partial value can be parsed.
+        """
+        # A prefix that is invalid stays invalid, so each one is tried at most once
+        for end, closing in reversed(self.cuts):
+            try:
+                self.parsed = json.loads(self.text[:end] + closing)
+                break
+            except json.JSONDecodeError:
+                continue
+        self.cuts.clear()
+        if self.in_string:  # Keep the cut-off string as far as it has been streamed
+            head = self.text[:-1] if self.escaped else self.text
+            try:
+                return json.loads(head + '"' + "".join(reversed(self.stack)))
+            except json.JSONDecodeError:
+                pass
+        return self.parsed
+
+
+def parse_partial_json(text: str) -> Any:
+    """Parse the longest valid prefix of a JSON document that may be cut off.
+
+    Open strings, arrays and objects are closed, and incomplete trailing tokens,
+    e.g. a key without a value, are dropped.
+
+    Args:
+        text: The beginning of a JSON document.
+
+    Returns:
+        The parsed value, or `None` if not even a partial value can be parsed.
+    """
+    parser = PartialJsonParser()
+    parser.feed(text)
+    return parser.value()
@@ -0,0 +1,126 @@
+"""Background prefetch of the items the next rerun is likely to read."""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from collections.abc import Hashable
+from collections.abc import Iterable
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+
+class Prefetcher:
+    """Results of lookups run in a thread pool, shared by all sessions.
+
+    A page prefetches the items it is about to read, e.g. when one is selected,
+    and reads them with `get`, which waits for a lookup in flight instead of
+    starting another one. Results expire after `ttl` seconds, the least
+    recently used ones are evicted over `max_entries`, and failed lookups are
+    not kept.
+    """
+
+    def __init__(self, max_workers: int, ttl: float, max_entries: int):
+        """Initialise the prefetcher."""
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._entries: OrderedDict[Hashable, tuple[Future, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: object) -> bool:
+        """Return whether a key is loaded or in flight."""
+        with self._lock:
+            return self._entry(key) is not None  # type: ignore[arg-type]
+
+    def _entry(self, key: Hashable) -> Future | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        future, created = entry
+        if time.monotonic() - created >= self.ttl or (future.done() and future.exception()):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return future
+
+    def _store(self, key: Hashable, future: Future) -> None:
+        self._entries[key] = (future, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def prefetch(self, key: Hashable, load: Callable[[], Any]) -> None:
+        """Load the result of a key in the background, unless it is loaded or in flight."""
+        with self._lock:
+            if self._entry(key) is None:
+                self._store(key, self._pool.submit(load))
+
+    def prefetch_many(
+        self, keys: Iterable[Hashable], load: Callable[[list], dict[Hashable, Any]]
+    ) -> None:
+        """Load the missing results of keys in the background with a single lookup.
+
+        Args:
+            keys: Keys to load.
+            load: Return the results by key of a list of keys, e.g. with a batch
+                get. Keys without a result are not kept.
+        """
+        with self._lock:
+            futures: dict[Hashable, Future] = {
+                key: Future() for key in dict.fromkeys(keys) if self._entry(key) is None
+            }
+            for key, future in futures.items():
+                self._store(key, future)
+        if futures:
+            self._pool.submit(_resolve, futures, load)
+
+    def get(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """Return the result of a key, waiting for its prefetch or loading it now.
+
+        Lookups that failed in the background are run again, so their
+        exceptions are raised to the caller.
+        """
+        with self._lock:
+            future = self._entry(key)
+        if future is not None:
+            try:
+                return future.result()
+            except Exception:
+                self.invalidate(key)
+        result = load()
+        done: Future = Future()
+        done.set_result(result)
+        with self._lock:
+            self._store(key, done)
+        return result
+
+    def take(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """Return the result of a key like `get`, without keeping it.
+
+        For results moved to another cache, where they are kept up to date.
+        """
+        try:
+            return self.get(key, load)
+        finally:
+            self.invalidate(key)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Forget the result of a key, e.g. after the item was written."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+def _resolve(futures: dict[Hashable, Future], load: Callable[[list], dict[Hashable, Any]]) -> None:
+    try:
+        results = load(list(futures))
+    except Exception as e:
+        for future in futures.values():
+            future.set_exception(e)
+        return
+    for key, future in futures.items():
+        if key in results:
+            future.set_result(results[key])
+        else:
+            future.set_exception(KeyError(key))
@@ -0,0 +1,105 @@
+"""Cache of assistant responses to repeated conversations."""
+
+import hashlib
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any
+from ai_stream.config import get_logger
+from ai_stream.utils.cassettes import load_cassette
+
+
+logger = get_logger(__name__)
+VERSION_KEY = "config_version"
+ENABLED_KEY = "response_cache"
+COMPLETED_EVENT = "thread.run.completed"
+
+
+def config_version(configuration: dict[str, Any]) -> str:
+    """Return a short hash of an assistant configuration, ignoring its version."""
+    metadata = {k: v for k, v in configuration.get("metadata", {}).items() if k != VERSION_KEY}
+    content = json.dumps({**configuration, "metadata": metadata}, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+
+def normalize_message(message: str) -> str:
+    """Normalise case and whitespace of a user message."""
+    return " ".join(message.casefold().split())
+
+
+def cache_key(assistant_id: str, version: str, user_messages: list[str]) -> str:
+    """Return the key of a response to the conversation so far.
+
+    Args:
+        assistant_id: ID of the responding assistant.
+        version: Version of the assistant configuration, see `config_version`.
+        user_messages: All user messages of the conversation, the last one included.
+
+    Returns:
+        A hex digest.
+    """
+    content = json.dumps([assistant_id, version, [normalize_message(m) for m in user_messages]])
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Recorded runs stored on the local disk by cache key.
+
+    Entries expire `ttl` seconds after being stored, and the oldest entries are
+    removed when the cache grows over its size limit.
+    """
+
+    def __init__(self, directory: str | Path, ttl: float, max_bytes: int):
+        """Initialise."""
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.jsonl"
+
+    def get(self, key: str) -> Path | None:
+        """Return the cassette of a cached response, if any and not expired."""
+        path = self._path(key)
+        try:
+            stored_at = path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        if time.time() - stored_at > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        return path
+
+    def put(self, key: str, cassette: str | Path) -> bool:
+        """Store a copy of the cassette of a run if the run completed.
+
+        Returns:
+            Whether the response was cached.
+        """
+        events = load_cassette(cassette)
+        if not events or events[-1].event != COMPLETED_EVENT:
+            logger.info(f"Not caching incomplete run {cassette}.")
+            return False
+        shutil.copyfile(cassette, self._path(key))
+        self.evict()
+        return True
+
+    def size(self) -> int:
+        """Return the total size of the cached responses in bytes."""
+        return sum(path.stat().st_size for path in self.directory.glob("*.jsonl"))
+
+    def evict(self) -> None:
+        """Remove expired entries, then the oldest ones until the size limit is met."""
+        with self._lock:
+            files = sorted(self.directory.glob("*.jsonl"), key=lambda path: path.stat().st_mtime)
+            total = sum(path.stat().st_size for path in files)
+            now = time.time()
+            for path in files:
+                if total <= self.max_bytes and now - path.stat().st_mtime <= self.ttl:
+                    continue
+                total -= path.stat().st_size
+                path.unlink(missing_ok=True)
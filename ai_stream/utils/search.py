@@ -0,0 +1,115 @@
+"""In-memory search of items by name and text, for selectors of large catalogs."""
+
+import re
+import threading
+from collections import defaultdict
+from collections.abc import Iterable
+
+
+TEXT_WEIGHT = 0.5
+"""Weight of the trigrams matching the text of an item, relative to its name."""
+PREFIX_BONUS = 1.0
+"""Score added to items whose name starts with the query."""
+WORD_PREFIX_BONUS = 0.5
+"""Score added to items with a word of the name starting with the query."""
+MIN_SCORE = 0.3
+"""Minimum score of a match, i.e. share of the trigrams of the query for names."""
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Normalise case and whitespace of a text."""
+    return " ".join(text.casefold().split())
+
+
+def trigrams(text: str) -> set[str]:
+    """Return the trigrams of the words of a text, padded to match word prefixes."""
+    return {
+        padded[i : i + 3]
+        for word in WORD_PATTERN.findall(text.casefold())
+        for padded in [f"  {word} "]
+        for i in range(len(padded) - 2)
+    }
+
+
+class SearchIndex:
+    """Trigram index of items by name and optional text, e.g. prompt bodies.
+
+    Items are ranked by the share of the trigrams of the query they contain,
+    with bonuses for names starting with the query. The index is thread-safe,
+    so it can be shared by sessions and updated when items are written.
+    """
+
+    def __init__(self, items: Iterable[tuple[str, str, str]] = ()):
+        """Index items given as ID, name and text."""
+        self._names: dict[str, str] = {}
+        self._trigrams: dict[str, tuple[set[str], set[str]]] = {}
+        self._name_index: defaultdict[str, set[str]] = defaultdict(set)
+        self._text_index: defaultdict[str, set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+        for item_id, name, text in items:
+            self.add(item_id, name, text)
+
+    def __len__(self) -> int:
+        """Return the number of items."""
+        return len(self._names)
+
+    def __contains__(self, item_id: object) -> bool:
+        """Return whether an item is indexed."""
+        return item_id in self._names
+
+    def name(self, item_id: str) -> str:
+        """Return the name of an item."""
+        return self._names[item_id]
+
+    def add(self, item_id: str, name: str, text: str = "") -> None:
+        """Add or update an item."""
+        name_trigrams = trigrams(name)
+        text_trigrams = trigrams(text) - name_trigrams
+        with self._lock:
+            self._remove(item_id)
+            self._names[item_id] = name
+            self._trigrams[item_id] = (name_trigrams, text_trigrams)
+            for trigram in name_trigrams:
+                self._name_index[trigram].add(item_id)
+            for trigram in text_trigrams:
+                self._text_index[trigram].add(item_id)
+
+    def remove(self, item_id: str) -> None:
+        """Remove an item if it is indexed."""
+        with self._lock:
+            self._remove(item_id)
+
+    def _remove(self, item_id: str) -> None:
+        if item_id not in self._names:
+            return
+        del self._names[item_id]
+        name_trigrams, text_trigrams = self._trigrams.pop(item_id)
+        for trigram in name_trigrams:
+            self._name_index[trigram].discard(item_id)
+        for trigram in text_trigrams:
+            self._text_index[trigram].discard(item_id)
+
+    def search(self, query: str, limit: int) -> list[str]:
+        """Return the IDs of the best matches of a query, or the first items without one."""
+        query = normalize(query)
+        with self._lock:
+            if not query:
+                return list(self._names)[:limit]
+            query_trigrams = trigrams(query)
+            scores: defaultdict[str, float] = defaultdict(float)
+            for trigram in query_trigrams:
+                for item_id in self._name_index.get(trigram, ()):
+                    scores[item_id] += 1
+                for item_id in self._text_index.get(trigram, ()):
+                    scores[item_id] += TEXT_WEIGHT
+            for item_id in scores:
+                scores[item_id] /= len(query_trigrams)
+                name = normalize(self._names[item_id])
+                if name.startswith(query):
+                    scores[item_id] += PREFIX_BONUS
+                elif any(word.startswith(query) for word in name.split()):
+                    scores[item_id] += WORD_PREFIX_BONUS
+            matches = [item_id for item_id, score in scores.items() if score >= MIN_SCORE]
+            matches.sort(key=lambda item_id: (-scores[item_id], self._names[item_id]))
+            return matches[:limit]
@@ -0,0 +1,250 @@
+"""Prompt templates with variables, includes of other prompts and conditional blocks.
+
+* `{{ name }}` inserts the value of a variable.
+* `{% include "Prompt Name" %}` inserts another prompt, rendered with the same variables.
+* `{% if name %}...{% else %}...{% endif %}` keeps the first block if the variable is
+  set and not empty, the optional `else` block otherwise.
+
+Templates are parsed once per text, and renders are cached by the versions of
+the template and of its includes, and the variables. Prompts without tags
+render as they are.
+"""
+
+import re
+import threading
+from collections import deque
+from collections.abc import Callable
+from collections.abc import Mapping
+from dataclasses import dataclass
+from dataclasses import field
+from functools import lru_cache
+from ai_stream.utils.assistant_metadata import get_settings
+from ai_stream.utils.versioning import content_hash
+
+
+TAG_PATTERN = re.compile(r"{{\s*(?P<variable>\w+)\s*}}|{%\s*(?P<tag>.*?)\s*%}", re.DOTALL)
+INCLUDE_PATTERN = re.compile(r"""include\s+(["'])(?P<name>.+?)\1""")
+IF_PATTERN = re.compile(r"if\s+(?P<name>\w+)")
+VARIABLES_KEY = "variables"
+"""Setting of the variables of the prompt of an assistant, see `get_settings`."""
+INSTRUCTIONS_KEY = "instructions_version"
+"""Setting of the hash of the rendered instructions of an assistant."""
+
+
+class TemplateError(ValueError):
+    """Invalid template, or variable or include missing when rendering."""
+
+
+@dataclass(frozen=True)
+class Variable:
+    """Value of a variable."""
+
+    name: str
+
+
+@dataclass(frozen=True)
+class Include:
+    """Another prompt, by name."""
+
+    name: str
+
+
+@dataclass(frozen=True)
+class Conditional:
+    """Blocks kept depending on a variable."""
+
+    name: str
+    body: tuple
+    orelse: tuple = ()
+
+
+@dataclass(frozen=True)
+class Template:
+    """Compiled template, compared and hashed by the version of its text."""
+
+    version: str
+    nodes: tuple = field(compare=False)
+    """Texts, `Variable`, `Include` and `Conditional` nodes."""
+    variables: frozenset[str] = field(compare=False)
+    """Names of all variables, including those of conditions."""
+    includes: frozenset[str] = field(compare=False)
+    """Names of the included prompts."""
+
+
+@dataclass
+class _Block:
+    name: str
+    body: list = field(default_factory=list)
+    orelse: list | None = None
+
+    @property
+    def current(self) -> list:
+        return self.body if self.orelse is None else self.orelse
+
+
+def _parse_tag(tag: str, root: list, blocks: list[_Block]) -> list:
+    """Add the node of a tag and return the list the next nodes go to."""
+    nodes = blocks[-1].current if blocks else root
+    if match := INCLUDE_PATTERN.fullmatch(tag):
+        nodes.append(Include(match["name"]))
+    elif match := IF_PATTERN.fullmatch(tag):
+        blocks.append(_Block(match["name"]))
+    elif tag == "else" and blocks and blocks[-1].orelse is None:
+        blocks[-1].orelse = []
+    elif tag == "endif" and blocks:
+        block = blocks.pop()
+        parent = blocks[-1].current if blocks else root
+        parent.append(Conditional(block.name, tuple(block.body), tuple(block.orelse or ())))
+    else:
+        raise TemplateError(f"Invalid tag {{% {tag} %}}.")
+    return blocks[-1].current if blocks else root
+
+
+@lru_cache(maxsize=1024)
+def compile_template(text: str) -> Template:
+    """Parse a template into nodes, raising a `TemplateError` if it is invalid."""
+    root: list = []
+    blocks: list[_Block] = []
+    nodes = root
+    position = 0
+    for match in TAG_PATTERN.finditer(text):
+        if match.start() > position:
+            nodes.append(text[position : match.start()])
+        position = match.end()
+        if match["variable"]:
+            nodes.append(Variable(match["variable"]))
+        else:
+            nodes = _parse_tag(match["tag"], root, blocks)
+    if blocks:
+        raise TemplateError(f"Missing {{% endif %}} of {{% if {blocks[-1].name} %}}.")
+    if position < len(text):
+        nodes.append(text[position:])
+    variables: set[str] = set()
+    includes: set[str] = set()
+    _collect_names(root, variables, includes)
+    return Template(content_hash(text), tuple(root), frozenset(variables), frozenset(includes))
+
+
+def _collect_names(nodes: tuple | list, variables: set[str], includes: set[str]) -> None:
+    for node in nodes:
+        if isinstance(node, Variable):
+            variables.add(node.name)
+        elif isinstance(node, Include):
+            includes.add(node.name)
+        elif isinstance(node, Conditional):
+            variables.add(node.name)
+            _collect_names(node.body + node.orelse, variables, includes)
+
+
+def resolve_includes(template: Template, load: Callable[[str], str]) -> dict[str, Template]:
+    """Return the compiled prompts included by a template, directly or not.
+
+    Args:
+        template: Template including the prompts.
+        load: Return the text of a prompt by name, raising a `TemplateError`
+            if there is none.
+    """
+    includes: dict[str, Template] = {}
+
+    def resolve(current: Template, path: tuple[str, ...]) -> None:
+        for name in sorted(current.includes):
+            if name in path:
+                raise TemplateError(f"Recursive include of {name!r}.")
+            if name not in includes:
+                includes[name] = compile_template(load(name))
+            resolve(includes[name], (*path, name))
+
+    resolve(template, ())
+    return includes
+
+
+def _render_nodes(
+    nodes: tuple, variables: Mapping[str, str], includes: Mapping[str, Template]
+) -> str:
+    parts = []
+    for node in nodes:
+        if isinstance(node, str):
+            parts.append(node)
+        elif isinstance(node, Variable):
+            if node.name not in variables:
+                raise TemplateError(f"Missing variable {node.name!r}.")
+            parts.append(variables[node.name])
+        elif isinstance(node, Include):
+            parts.append(_render_nodes(includes[node.name].nodes, variables, includes))
+        else:
+            block = node.body if variables.get(node.name) else node.orelse
+            parts.append(_render_nodes(block, variables, includes))
+    return "".join(parts)
+
+
+@lru_cache(maxsize=4096)
+def _render(
+    template: Template,
+    variables: frozenset[tuple[str, str]],
+    includes: frozenset[tuple[str, Template]],
+) -> str:
+    return _render_nodes(template.nodes, dict(variables), dict(includes))
+
+
+def render(
+    template: Template, variables: Mapping[str, str], includes: Mapping[str, Template]
+) -> str:
+    """Render a template, raising a `TemplateError` if a variable is missing.
+
+    Args:
+        template: Compiled template.
+        variables: Values of the variables.
+        includes: Compiled prompts included by the template, see `resolve_includes`.
+    """
+    return _render(template, frozenset(variables.items()), frozenset(includes.items()))
+
+
+class IncludeIndex:
+    """Names of the prompts included by every prompt, to find the prompts depending on one.
+
+    The index is thread-safe and follows the changes of the prompts, see
+    `ai_stream.utils.catalog.index_listener`, so saving a prompt doesn't
+    compile every other one.
+    """
+
+    def __init__(self) -> None:
+        """Initialise an empty index."""
+        self._prompts: dict[str, tuple[str, frozenset[str]]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, prompt_id: str, name: str, text: str = "") -> None:
+        """Add or update a prompt. Invalid templates include nothing."""
+        try:
+            includes = compile_template(text).includes
+        except TemplateError:
+            includes = frozenset()
+        with self._lock:
+            self._prompts[prompt_id] = (name, includes)
+
+    def remove(self, prompt_id: str) -> None:
+        """Remove a prompt if it is indexed."""
+        with self._lock:
+            self._prompts.pop(prompt_id, None)
+
+    def dependents(self, name: str) -> list[str]:
+        """Return the IDs of the prompts including a prompt, directly or not."""
+        with self._lock:
+            prompts = dict(self._prompts)
+        included_by: dict[str, list[tuple[str, str]]] = {}
+        for prompt_id, (prompt_name, includes) in prompts.items():
+            for include in includes:
+                included_by.setdefault(include, []).append((prompt_id, prompt_name))
+        dependents: dict[str, None] = {}
+        queue = deque([name])
+        while queue:
+            for prompt_id, prompt_name in included_by.get(queue.popleft(), []):
+                if prompt_id not in dependents and prompt_name != name:
+                    dependents[prompt_id] = None
+                    queue.append(prompt_name)
+        return list(dependents)
+
+
+def template_variables(metadata: Mapping[str, str]) -> dict[str, str]:
+    """Return the template variables in the metadata of an assistant."""
+    variables = get_settings(metadata).get(VARIABLES_KEY, {})
+    return {str(name): str(value) for name, value in variables.items()}
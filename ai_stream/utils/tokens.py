@@ -0,0 +1,28 @@
+"""Local estimation of token counts."""
+
+import math
+import re
+from functools import lru_cache
+
+
+CHARS_PER_TOKEN = 4
+"""Average characters per token of English text with OpenAI tokenizers."""
+MESSAGE_OVERHEAD = 4
+"""Tokens used by the formatting of a message, e.g. its role."""
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=4096)
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens of a text without a tokenizer.
+
+    Every word and punctuation mark is at least one token, and long words are
+    split into tokens of about `CHARS_PER_TOKEN` characters.
+    """
+    words = WORD_PATTERN.findall(text)
+    return max(len(words), math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def estimate_messages_tokens(messages: list[str]) -> int:
+    """Estimate the number of tokens of a conversation."""
+    return sum(estimate_tokens(message) + MESSAGE_OVERHEAD for message in messages)
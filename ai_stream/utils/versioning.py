@@ -0,0 +1,120 @@
+"""Content-addressed versions of texts, stored as deltas between versions.
+
+A history maps the hash of every version of a text to its parent version and
+the line delta from the parent. Every `SNAPSHOT_INTERVAL` versions, the full
+text is stored instead, to bound the deltas applied to rebuild a version.
+Histories only contain strings, so they can be stored in a DynamoDB map, and
+are pruned to bound the size of the item, see `prune_history`.
+"""
+
+import difflib
+import hashlib
+import json
+from datetime import UTC
+from datetime import datetime
+
+
+SNAPSHOT_INTERVAL = 10
+"""Maximum number of deltas between a version and the last full text."""
+
+
+def content_hash(text: str) -> str:
+    """Return a short hash of a text, identifying its version."""
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def make_delta(parent: str, text: str) -> list:
+    """Return the line operations turning the parent text into the text.
+
+    Unchanged lines are referenced by their range in the parent, and other
+    lines are stored as they are.
+    """
+    old_lines = parent.splitlines(keepends=True)
+    new_lines = text.splitlines(keepends=True)
+    delta: list = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            delta.append([i1, i2])
+        elif j2 > j1:  # Replaced or inserted lines
+            delta.append("".join(new_lines[j1:j2]))
+    return delta
+
+
+def apply_delta(parent: str, delta: list) -> str:
+    """Return the text from its parent and the delta, see `make_delta`."""
+    old_lines = parent.splitlines(keepends=True)
+    return "".join(
+        op if isinstance(op, str) else "".join(old_lines[op[0] : op[1]]) for op in delta
+    )
+
+
+def _chain(history: dict[str, dict[str, str]], version: str) -> list[dict[str, str]]:
+    """Return the entries from the version back to its last full text."""
+    chain = [history[version]]
+    while chain[-1]["parent"]:
+        chain.append(history[chain[-1]["parent"]])
+    return chain
+
+
+def add_version(history: dict[str, dict[str, str]], text: str, parent: str | None) -> str:
+    """Add a version of a text to a history if it is new, and return its hash.
+
+    Args:
+        history: Versions by hash, updated in place.
+        text: Text of the version.
+        parent: Hash of the version the text was edited from, if any.
+    """
+    version = content_hash(text)
+    if version in history:
+        return version
+    if parent and len(_chain(history, parent)) < SNAPSHOT_INTERVAL:
+        delta = make_delta(get_text(history, parent), text)
+    else:
+        parent, delta = None, [text]
+    history[version] = {
+        "parent": parent or "",
+        "delta": json.dumps(delta),
+        "created": datetime.now(UTC).isoformat(),
+    }
+    return version
+
+
+def get_text(history: dict[str, dict[str, str]], version: str) -> str:
+    """Return the text of a version of a history."""
+    text = ""
+    for entry in reversed(_chain(history, version)):
+        text = apply_delta(text, json.loads(entry["delta"]))
+    return text
+
+
+def list_versions(history: dict[str, dict[str, str]]) -> list[str]:
+    """Return the hashes of the versions of a history, newest first."""
+    return sorted(history, key=lambda version: history[version]["created"], reverse=True)
+
+
+def _remove_version(history: dict[str, dict[str, str]], version: str) -> None:
+    """Remove a version, storing the full text of the versions edited from it."""
+    for child, entry in history.items():
+        if entry["parent"] == version:
+            text = get_text(history, child)
+            history[child] = {**entry, "parent": "", "delta": json.dumps([text])}
+    del history[version]
+
+
+def prune_history(
+    history: dict[str, dict[str, str]], current: str, max_versions: int, max_bytes: int
+) -> None:
+    """Remove the oldest versions of a history until it is small enough.
+
+    Args:
+        history: Versions by hash, updated in place.
+        current: Hash of the current version, which is always kept.
+        max_versions: Maximum number of versions kept.
+        max_bytes: Maximum size of the history as JSON, e.g. to fit in a DynamoDB item.
+    """
+    while len(history) > 1 and (
+        len(history) > max_versions or len(json.dumps(history)) > max_bytes
+    ):
+        oldest = next(v for v in reversed(list_versions(history)) if v != current)
+        _remove_version(history, oldest)
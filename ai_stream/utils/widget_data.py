@@ -0,0 +1,71 @@
+"""Utils for data displayed by output widgets."""
+
+from collections.abc import Mapping
+from typing import Any
+import numpy as np
+import pandas as pd
+
+
+def to_frame(data: Any) -> pd.DataFrame:
+    """Convert widget data into a columnar DataFrame.
+
+    NumPy arrays and DataFrames are used without copying. Row-wise data, e.g. a
+    list of lists, is stacked into a single NumPy array when homogeneous, so all
+    columns share one contiguous block instead of one Python object per cell.
+
+    Args:
+        data: A DataFrame, a NumPy array, a mapping of column names to values or
+            a collection of rows.
+
+    Returns:
+        The data as a DataFrame.
+    """
+    if isinstance(data, pd.DataFrame):
+        return data
+    if isinstance(data, np.ndarray):
+        return pd.DataFrame(data, copy=False)
+    if isinstance(data, Mapping):
+        return pd.DataFrame(dict(data), copy=False)
+    try:
+        array = np.asarray(data)
+    except ValueError:  # Ragged rows
+        return pd.DataFrame(data)
+    if array.dtype.kind not in "biufc":  # Not only numbers, let pandas infer per column
+        return pd.DataFrame(data)
+    return pd.DataFrame(array, copy=False)
+
+
+def query_frame(
+    frame: pd.DataFrame, search: str = "", sort_by: str | None = None, ascending: bool = True
+) -> pd.DataFrame:
+    """Filter the rows of a frame by a search text and sort them by a column.
+
+    Args:
+        frame: The data to query.
+        search: Keep only rows where any cell contains this text, ignoring case.
+        sort_by: Name of the column to sort by, no sorting if `None`.
+        ascending: Sort order.
+
+    Returns:
+        The matching rows, or the given frame itself if nothing was queried.
+    """
+    if search:
+        mask = np.zeros(len(frame), dtype=bool)
+        for column in frame.columns:
+            cells = frame[column].astype("string")
+            mask |= cells.str.contains(search, case=False, regex=False, na=False).to_numpy()
+        frame = frame[mask]
+    if sort_by is not None:
+        frame = frame.sort_values(sort_by, ascending=ascending, kind="stable")
+    return frame
+
+
+def page_frame(frame: pd.DataFrame, page: int, page_size: int) -> pd.DataFrame:
+    """Return the rows of the given 1-based page."""
+    start = (page - 1) * page_size
+    return frame.iloc[start : start + page_size]
+
+
+def count_pages(n_rows: int, page_size: int) -> int:
+    """Return the number of pages needed for the given number of rows, at least 1."""
+    return max(1, -(-n_rows // page_size))
@@ -0,0 +1,115 @@
+import threading
+from contextlib import contextmanager
+import pytest
+from openai import AssistantEventHandler
+from openai import InternalServerError
+from openai import OpenAI
+from ai_stream.benchmarks.fake_assistants_api import FakeBehaviour
+from ai_stream.benchmarks.fake_assistants_api import create_server
+
+
+REPLY_TOKENS = 12
+
+
+@contextmanager
+def serve(behaviour):
+    server = create_server(behaviour, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    try:
+        yield OpenAI(api_key="fake", base_url=f"http://{host}:{port}/v1", max_retries=0)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def client():
+    with serve(FakeBehaviour(token_rate=0, latency=0, reply_tokens=REPLY_TOKENS)) as client:
+        yield client
+
+
+class RecordingHandler(AssistantEventHandler):
+    def __init__(self):
+        super().__init__()
+        self.deltas = []
+        self.texts = []
+        self.events = []
+
+    def on_event(self, event):
+        self.events.append(event.event)
+
+    def on_text_delta(self, delta, snapshot):
+        self.deltas.append(delta.value)
+
+    def on_text_done(self, text):
+        self.texts.append(text.value)
+
+
+def test_assistants_crud(client):
+    asst = client.beta.assistants.create(model="gpt-4o-mini", name="Test", metadata={"a": "1"})
+    client.beta.assistants.update(asst.id, name="Renamed")
+
+    assert client.beta.assistants.retrieve(asst.id).name == "Renamed"
+    assert [a.id for a in client.beta.assistants.list()] == [asst.id]
+    client.beta.assistants.delete(asst.id)
+    assert list(client.beta.assistants.list()) == []
+
+
+def test_streamed_text_run(client):
+    asst = client.beta.assistants.create(model="gpt-4o-mini")
+    thread = client.beta.threads.create()
+    client.beta.threads.messages.create(thread.id, role="user", content="Hello there")
+
+    handler = RecordingHandler()
+    with client.beta.threads.runs.stream(
+        thread_id=thread.id, assistant_id=asst.id, event_handler=handler
+    ) as stream:
+        stream.until_done()
+
+    assert len(handler.deltas) == REPLY_TOKENS
+    assert handler.texts[0].startswith("You said: Hello there")
+    assert handler.events[-1] == "thread.run.completed"
+    messages = client.beta.threads.messages.list(thread.id, order="asc")
+    assert [m.role for m in messages] == ["user", "assistant"]
+
+
+def test_tool_call_run(client):
+    function = {
+        "name": "TextInput",
+        "description": "Text input.",
+        "parameters": {
+            "type": "object",
+            "properties": {"label": {"type": "string", "description": "Label."}},
+            "required": ["label"],
+        },
+    }
+    asst = client.beta.assistants.create(
+        model="gpt-4o-mini", tools=[{"type": "function", "function": function}]
+    )
+    thread = client.beta.threads.create()
+    client.beta.threads.messages.create(thread.id, role="user", content="Show a textinput")
+
+    with client.beta.threads.runs.stream(thread_id=thread.id, assistant_id=asst.id) as stream:
+        stream.until_done()
+        run = stream.current_run
+
+    assert run.status == "requires_action"
+    call = run.required_action.submit_tool_outputs.tool_calls[0]
+    assert call.function.name == "TextInput"
+    assert call.function.arguments == '{"label": "Example label"}'
+
+    tool_outputs = [{"tool_call_id": call.id, "output": "ok"}]
+    with client.beta.threads.runs.submit_tool_outputs_stream(
+        thread_id=thread.id, run_id=run.id, tool_outputs=tool_outputs
+    ) as stream:
+        text = "".join(stream.text_deltas)
+
+    assert text.startswith("You said: Show a textinput")
+    assert client.beta.threads.runs.retrieve(run.id, thread_id=thread.id).status == "completed"
+
+
+def test_error_injection():
+    with serve(FakeBehaviour(latency=0, error_rate=1.0)) as client:
+        with pytest.raises(InternalServerError, match="Injected error"):
+            client.beta.threads.create()
@@ -0,0 +1,34 @@
+from ai_stream.benchmarks.workload import WorkloadConfig
+from ai_stream.benchmarks.workload import generate_history
+from ai_stream.components.messages import LineChart
+from ai_stream.components.messages import UserMessage
+
+
+def _summary(history):
+    return [(type(entry).__name__, entry.content) for entry in history]
+
+
+def test_generate_history_is_deterministic():
+    config = WorkloadConfig(seed=42, history_length=51)
+
+    first = generate_history(config)
+    second = generate_history(config)
+
+    assert len(first) == config.history_length
+    assert _summary(first) == _summary(second)
+    assert isinstance(first[0], UserMessage)
+    assert isinstance(first[-1], UserMessage)
+
+
+def test_generate_history_mix():
+    config = WorkloadConfig(
+        history_length=20,
+        response_mix={"output_widget": 1.0},
+        output_widget_ratios={"LineChart": 1.0},
+        chart_points=7,
+    )
+
+    responses = generate_history(config)[1::2]
+
+    assert all(isinstance(entry, LineChart) for entry in responses)
+    assert all(entry.frame.shape == (config.chart_points, 3) for entry in responses)
@@ -0,0 +1,194 @@
+import itertools
+import json
+from types import SimpleNamespace
+import streamlit as st
+from openai.types.beta import Assistant
+from openai.types.beta.threads.runs import CodeInterpreterToolCall
+from ai_stream.components.catalog import catalog_view
+from ai_stream.components.catalog import config
+from ai_stream.components.catalog import get_item
+from ai_stream.components.catalog import get_items
+from ai_stream.components.catalog import load_assistants
+from ai_stream.components.catalog import search_multiselect
+from ai_stream.components.helpers import StreamAssistantEventHandler
+from ai_stream.components.messages import CodeInterpreterMessage
+from ai_stream.components.messages import TextInput
+from ai_stream.db.aws import PromptsTable
+from ai_stream.utils.app_state import AppState
+from ai_stream.utils.catalog import Catalog
+from ai_stream.utils.catalog import CatalogView
+from ai_stream.utils.catalog import index_listener
+from ai_stream.utils.search import SearchIndex
+
+
+def test_preview_tool_call(monkeypatch):
+    rendered = []
+
+    def render(self):
+        rendered.append((dict(self.widget_config), self.disabled))
+
+    monkeypatch.setattr(TextInput, "render", render)
+    clock = itertools.count(step=1.0)
+    monkeypatch.setattr("ai_stream.components.helpers.time.monotonic", lambda: next(clock))
+    handler = StreamAssistantEventHandler(app_state=AppState(), st_placeholder=st.empty())
+    arguments = json.dumps({"label": "Your name", "placeholder": "Jo"})
+    for i in range(1, len(arguments) + 1):
+        handler.preview_tool_call("call_1", "TextInput", arguments[:i])
+
+    configs = [config for config, _ in rendered]
+    # Rendered once per change of the parsed arguments, the label first
+    assert all(a != b for a, b in zip(configs, configs[1:], strict=False))
+    assert all("Your name".startswith(config["label"]) for config in configs)
+    assert "placeholder" not in configs[len("Your name")]
+    assert rendered[-1] == ({"label": "Your name", "placeholder": "Jo"}, True)
+    assert list(handler.previews) == ["call_1"]
+
+    handler.clear_previews()
+    assert handler.previews == {}
+    assert handler.parsers == {}
+
+
+def test_preview_tool_call_rate_limited(monkeypatch):
+    rendered = []
+    monkeypatch.setattr(TextInput, "render", lambda self: rendered.append(self.widget_config))
+    clock = iter([0.0, 0.05, 0.5, 0.55])
+    monkeypatch.setattr("ai_stream.components.helpers.time.monotonic", lambda: next(clock))
+    handler = StreamAssistantEventHandler(app_state=AppState(), st_placeholder=st.empty())
+    for arguments in ['{"label": "A', '{"label": "AB', '{"label": "ABC', '{"label": "ABCD"}']:
+        handler.preview_tool_call("call_1", "TextInput", arguments)
+
+    assert [config["label"] for config in rendered] == ["A", "ABC"]
+
+
+def code_interpreter_call(code, logs=None):
+    outputs = [{"type": "logs", "logs": logs}] if logs else []
+    return CodeInterpreterToolCall.model_validate(
+        {
+            "id": "call_1",
+            "type": "code_interpreter",
+            "code_interpreter": {"input": code, "outputs": outputs},
+        }
+    )
+
+
+def test_code_interpreter_output(monkeypatch):
+    rendered = []
+    monkeypatch.setattr(
+        CodeInterpreterMessage, "render", lambda self: rendered.append((self.content, self.logs))
+    )
+    clock = iter([0.0, 0.05, 0.5])
+    monkeypatch.setattr("ai_stream.components.helpers.time.monotonic", lambda: next(clock))
+    app_state = AppState()
+    handler = StreamAssistantEventHandler(app_state=app_state, st_placeholder=st.empty())
+    code = "print(1 + 1)"
+    for i in range(1, len(code) + 1, 4):
+        handler.on_tool_call_delta(None, code_interpreter_call(code[:i]))
+
+    # Updates are rate limited
+    assert rendered == [("p", ""), (code[:9], "")]
+
+    handler.on_tool_call_done(code_interpreter_call(code, logs="2"))
+    assert rendered[-1] == (code, "2")
+    assert [(m.content, m.logs) for m in app_state.history] == [(code, "2")]
+
+
+def test_get_items_prefetched():
+    history = {"v": {"parent": "", "delta": '["Old."]', "created": ""}}
+    PromptsTable(id="prefetch_a", name="A", used_by=[], value="Old.", history=history).save()
+    PromptsTable(id="prefetch_b", name="B", used_by=[], value="B.").save()
+
+    items = get_items(PromptsTable, ["prefetch_a", "prefetch_missing", "prefetch_b"])
+    assert [item.id for item in items] == ["prefetch_a", "prefetch_b"]
+    # The version history is left out
+    assert items[0].value == "Old."
+    assert items[0].history is None
+
+    # Prefetched items are kept until they are written through the catalog
+    PromptsTable(id="prefetch_a", name="A", used_by=[], value="New.").save()
+    assert get_item(PromptsTable, "prefetch_a").value == "Old."
+    catalog_view(PromptsTable.__name__).publish("prefetch_a", "A", "New.")
+    assert get_item(PromptsTable, "prefetch_a").value == "New."
+
+
+def test_search_multiselect(monkeypatch):
+    catalog = Catalog(lambda: iter([(f"f{i}", f"Function {i}", "") for i in range(30)]))
+    index = SearchIndex()
+    catalog.subscribe(index_listener(index))
+    items = CatalogView(catalog, index)
+    widgets = {"query": "", "picked": None}
+    shown = []
+
+    def multiselect(label, options, default, format_func):
+        shown.append(options)
+        return default if widgets["picked"] is None else widgets["picked"]
+
+    monkeypatch.setattr(st.sidebar, "text_input", lambda *args, **kwargs: widgets["query"])
+    monkeypatch.setattr(st.sidebar, "multiselect", multiselect)
+    monkeypatch.setattr(st, "session_state", {})
+
+    # Selected IDs missing from the catalog are dropped
+    assert search_multiselect("Select Function", items, "fn", ["f25", "gone"]) == ["f25"]
+    assert shown[-1][0] == "f25"
+    assert len(shown[-1]) <= config.search.max_results + 1
+
+    # The selection is kept in the options while searching
+    widgets["picked"] = ["f25", "f3"]
+    search_multiselect("Select Function", items, "fn", [])
+    widgets["query"], widgets["picked"] = "Function 1", None
+    assert search_multiselect("Select Function", items, "fn", []) == ["f25", "f3"]
+    assert shown[-1][:2] == ["f25", "f3"]
+    assert "f10" in shown[-1]
+
+
+class FakeAssistants:
+    def __init__(self, *names):
+        self.assistants = [self.make(name) for name in names]
+        self.lists = 0
+
+    @staticmethod
+    def make(name):
+        return Assistant(
+            id=f"asst_{name}",
+            name=name,
+            created_at=0,
+            model="gpt-4o",
+            object="assistant",
+            tools=[],
+        )
+
+    def list(self, limit):
+        self.lists += 1
+        return list(self.assistants)
+
+
+def fake_client(assistants, api_key="sk-a"):
+    beta = SimpleNamespace(assistants=assistants)
+    return SimpleNamespace(api_key=api_key, organization=None, project=None, beta=beta)
+
+
+def test_load_assistants(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("ai_stream.components.catalog.time.monotonic", lambda: clock[0])
+    ttl = config.assistants.list_ttl_seconds
+    app_state = AppState()
+    app_state.assistants.add_draft("tmp_1", "Draft")
+    assistants = FakeAssistants("a", "b")
+    client = fake_client(assistants)
+
+    load_assistants(app_state, client)
+    assert list(app_state.assistants) == ["tmp_1", "asst_a", "asst_b"]
+    assert set(app_state.assistant_mirrors) == {"asst_a", "asst_b"}
+
+    # Reruns of the session don't list them again until the TTL is over
+    assistants.assistants = [FakeAssistants.make("c")]
+    load_assistants(app_state, client)
+    assert assistants.lists == 1
+    clock[0] = ttl + 1.0
+    load_assistants(app_state, client)
+    assert assistants.lists == len(["first", "expired"])
+    assert list(app_state.assistants) == ["tmp_1", "asst_c"]
+
+    # Another account lists its own assistants right away
+    load_assistants(app_state, fake_client(FakeAssistants("d"), api_key="sk-b"))
+    assert list(app_state.assistants) == ["asst_d"]
+    assert set(app_state.assistant_metadata) == {"asst_d"}
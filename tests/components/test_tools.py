@@ -0,0 +1,52 @@
+import json
+import pytest
+from ai_stream.components.messages import TextInput
+from ai_stream.components.tools import ToolArgumentsError
+from ai_stream.components.tools import get_args_schema
+from ai_stream.components.tools import preview_tool_arguments
+from ai_stream.components.tools import validate_tool_arguments
+
+
+def test_get_args_schema():
+    assert get_args_schema(TextInput) is TextInput.TextInputSchema
+
+
+def test_validate_tool_arguments_keeps_only_set_arguments():
+    kwargs = validate_tool_arguments("TextInput", '{"label": "Name", "max_chars": 10}')
+
+    assert kwargs == {"label": "Name", "max_chars": 10}
+
+
+def test_validate_tool_arguments_invalid():
+    with pytest.raises(ToolArgumentsError) as exc_info:
+        validate_tool_arguments("TextInput", '{"max_chars": "many"}')
+
+    output = json.loads(exc_info.value.to_output())
+    assert output["error"] == "invalid_arguments"
+    assert output["tool"] == "TextInput"
+    assert {tuple(error["loc"]) for error in output["details"]} == {("label",), ("max_chars",)}
+
+
+def test_validate_tool_arguments_malformed_json():
+    with pytest.raises(ToolArgumentsError) as exc_info:
+        validate_tool_arguments("TextInput", '{"label": "Na')
+
+    assert exc_info.value.errors[0]["type"] == "json_invalid"
+
+
+def test_validate_tool_arguments_unknown_tool():
+    with pytest.raises(ToolArgumentsError) as exc_info:
+        validate_tool_arguments("Unknown", "{}")
+
+    assert exc_info.value.errors[0]["type"] == "unknown_tool"
+
+
+def test_preview_tool_arguments():
+    arguments = '{"label": "Your name", "unknown": 1, "placeholder": "Jo'
+
+    assert preview_tool_arguments("TextInput", arguments) == {
+        "label": "Your name",
+        "placeholder": "Jo",
+    }
+    assert preview_tool_arguments("TextInput", '{"lab') == {}
+    assert preview_tool_arguments("Missing", arguments) == {}
@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+from openai.types.beta import Assistant
+from ai_stream.configurations.assistants import config
+from ai_stream.configurations.assistants import retrieve_assistant
+from ai_stream.configurations.assistants import save_assistant
+from ai_stream.db.aws import PromptsTable
+from ai_stream.utils.app_state import AppState
+from ai_stream.utils.assistant_metadata import MAX_VALUE_LENGTH
+from ai_stream.utils.assistant_metadata import set_settings
+from ai_stream.utils.assistant_mirror import update_assistant
+from ai_stream.utils.assistant_mirror import versioned_configuration
+from ai_stream.utils.response_cache import VERSION_KEY
+
+
+class FakeAssistants:
+    def __init__(self):
+        self.calls = []
+
+    def _assistant(self, assistant_id, **fields):
+        fields = {"model": "gpt-4o-mini", "tools": [], "metadata": {}, **fields}
+        return Assistant(id=assistant_id, created_at=0, object="assistant", **fields)
+
+    def create(self, **configuration):
+        self.calls.append(("create", set(configuration)))
+        return self._assistant("asst_new", **configuration)
+
+    def update(self, assistant_id, **changes):
+        self.calls.append(("update", set(changes)))
+        return self._assistant(assistant_id, **changes)
+
+    def retrieve(self, assistant_id):
+        self.calls.append(("retrieve", set()))
+        return self._assistant(assistant_id, name="Remote")
+
+
+def configuration(**fields):
+    return {
+        "name": "Helper",
+        "instructions": "Be helpful.",
+        "model": "gpt-4o-mini",
+        "temperature": 0.7,
+        "top_p": 1.0,
+        "tools": [{"type": "file_search"}],
+        "response_format": {"type": "text"},
+        "metadata": {"prompt_id": "mirror_prompt"},
+        **fields,
+    }
+
+
+def fake_app_state():
+    app_state = AppState()
+    assistants = FakeAssistants()
+    app_state.openai_client = SimpleNamespace(beta=SimpleNamespace(assistants=assistants))
+    return app_state, assistants.calls
+
+
+def test_save_assistant_sends_changes():
+    PromptsTable(id="mirror_prompt", name="Mirror", used_by=[], value="Be helpful.").save()
+    app_state, calls = fake_app_state()
+
+    assistant_id = save_assistant(app_state, "tmp_1", configuration())
+    assert assistant_id == "asst_new"
+    assert PromptsTable.get("mirror_prompt").used_by == ["asst_new"]
+
+    # Unchanged configurations are not sent
+    assert save_assistant(app_state, assistant_id, configuration()) is None
+
+    # Only the changed fields and the metadata with the new version are
+    save_assistant(app_state, assistant_id, configuration(temperature=0.2))
+    assert calls == [
+        ("create", set(configuration())),
+        ("update", {"temperature", "metadata"}),
+    ]
+
+
+def test_save_after_update():
+    PromptsTable(id="mirror_prompt", name="Mirror", used_by=[], value="Be helpful.").save()
+    app_state, calls = fake_app_state()
+    assistant_id = save_assistant(app_state, "tmp_1", configuration())
+
+    # E.g. saving its prompt updates the instructions of the assistant
+    changes = {"instructions": "Be brief."}
+    client, mirrors = app_state.openai_client, app_state.assistant_mirrors
+    updated = update_assistant(client, mirrors, assistant_id, changes, ttl=60)
+    expected = versioned_configuration(configuration(**changes))
+    assert updated["metadata"][VERSION_KEY] == expected["metadata"][VERSION_KEY]
+
+    # The page of the assistant then has nothing to save
+    assert save_assistant(app_state, assistant_id, configuration(**changes)) is None
+    assert [call for call, _ in calls] == ["create", "update"]
+
+
+def test_save_assistant_checks_metadata(monkeypatch):
+    app_state, calls = fake_app_state()
+    errors = []
+    monkeypatch.setattr("streamlit.error", errors.append)
+    variables = {"text": "x" * MAX_VALUE_LENGTH}
+
+    # Metadata the API would reject is not sent
+    metadata = set_settings({"prompt_id": "mirror_prompt"}, {"variables": variables})
+    assert save_assistant(app_state, "tmp_1", configuration(metadata=metadata)) is None
+    assert calls == []
+    assert errors
+
+
+def test_retrieve_assistant_uses_fresh_mirror():
+    app_state, calls = fake_app_state()
+    assert retrieve_assistant(app_state, "asst_1")["name"] == "Remote"
+    assert retrieve_assistant(app_state, "asst_1")["name"] == "Remote"
+    assert len(calls) == 1
+
+    app_state.assistant_mirrors["asst_1"].updated -= config.assistants.mirror_ttl_seconds
+    retrieve_assistant(app_state, "asst_1")
+    assert len(calls) == len(["first", "expired"])
@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+import pytest
+from openai.types.beta import Assistant
+from ai_stream.components.catalog import catalog_view
+from ai_stream.configurations.prompts import save_prompt
+from ai_stream.db.aws import PromptsTable
+from ai_stream.db.aws import prompt_history
+from ai_stream.utils.app_state import AppState
+from ai_stream.utils.assistant_metadata import get_settings
+from ai_stream.utils.assistant_metadata import set_settings
+from ai_stream.utils.templates import INSTRUCTIONS_KEY
+from ai_stream.utils.templates import VARIABLES_KEY
+from ai_stream.utils.versioning import get_text
+
+
+def fake_app_state(**assistant_metadata):
+    app_state = AppState()
+    # Shared like in the app, so saved prompts aren't read from the prefetcher
+    app_state.prompts = catalog_view(PromptsTable.__name__)
+    app_state.assistant_metadata = assistant_metadata
+    updates = []
+
+    def retrieve(assistant_id):
+        metadata = assistant_metadata[assistant_id]
+        return Assistant(
+            id=assistant_id,
+            created_at=0,
+            model="gpt-4o",
+            object="assistant",
+            tools=[],
+            metadata=metadata,
+        )
+
+    def update(assistant_id, instructions, metadata):
+        updates.append((assistant_id, instructions))
+        return retrieve(assistant_id).model_copy(
+            update={"instructions": instructions, "metadata": metadata}
+        )
+
+    assistants = SimpleNamespace(retrieve=retrieve, update=update)
+    app_state.openai_client = SimpleNamespace(beta=SimpleNamespace(assistants=assistants))
+    return app_state, updates
+
+
+def create_prompt(app_state, prompt_id, name, value, used_by=()):
+    save_prompt(app_state, prompt_id, name, value)
+    PromptsTable.get(prompt_id).update(actions=[PromptsTable.used_by.set(list(used_by))])
+
+
+def test_save_prompt_versions():
+    app_state, updates = fake_app_state(asst_1={})
+    create_prompt(app_state, "versioned", "Versioned", "Be helpful.", used_by=["asst_1"])
+
+    save_prompt(app_state, "versioned", "Versioned", "Be brief.")
+    assert updates == [("asst_1", "Be brief.")]
+
+    # Unchanged prompts don't touch the DB or the assistants
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(PromptsTable, "update", None)  # Any update would fail
+        save_prompt(app_state, "versioned", "Versioned", "Be brief.")
+    assert updates == [("asst_1", "Be brief.")]
+
+    # Restoring the first version moves the pointer without a new version
+    history, version = prompt_history(PromptsTable.get("versioned"))
+    first = next(v for v in history if v != version)
+    save_prompt(app_state, "versioned", "Versioned", get_text(history, first))
+    prompt = PromptsTable.get("versioned")
+    assert (prompt.value, prompt.version) == ("Be helpful.", first)
+    assert prompt.history.as_dict() == history
+    assert updates[-1] == ("asst_1", "Be helpful.")
+
+
+def test_prompt_history_of_unversioned_prompt():
+    prompt = PromptsTable(id="legacy", name="Legacy", used_by=[], value="Old prompt.")
+    history, version = prompt_history(prompt)
+    assert get_text(history, version) == "Old prompt."
+
+
+def test_save_included_prompt():
+    app_state, updates = fake_app_state(
+        asst_formal=set_settings({}, {VARIABLES_KEY: {"name": "Ada", "formal": "yes"}}),
+        asst_casual=set_settings({}, {VARIABLES_KEY: {"name": "Bob"}}),
+    )
+    create_prompt(app_state, "tone", "Tone", "{% if formal %}Be formal.{% endif %}")
+    create_prompt(app_state, "greeting", "Greeting", "Hi {{ name }}. {% include 'Tone' %}")
+    create_prompt(
+        app_state, "welcome", "Welcome", "{% include 'Greeting' %}", ["asst_formal", "asst_casual"]
+    )
+
+    # Assistants using the prompt through includes are updated
+    save_prompt(app_state, "tone", "Tone", "{% if formal %}Be very formal.{% endif %}")
+    assert updates == [("asst_formal", "Hi Ada. Be very formal."), ("asst_casual", "Hi Bob. ")]
+    assert INSTRUCTIONS_KEY in get_settings(app_state.assistant_metadata["asst_casual"])
+
+    # Only assistants whose instructions changed are updated
+    save_prompt(app_state, "tone", "Tone", "{% if formal %}Be formal.{% endif %}")
+    assert updates[2:] == [("asst_formal", "Hi Ada. Be formal.")]
+
+    # Invalid templates aren't saved
+    save_prompt(app_state, "tone", "Tone", "{% if formal %}")
+    assert PromptsTable.get("tone").value == "{% if formal %}Be formal.{% endif %}"
@@ -0,0 +1,31 @@
+"""Shared test setup.
+
+Tools register their schemas in DynamoDB when imported, so a moto server is
+started before any test module is collected, as the app does on startup.
+"""
+
+import logging
+import os
+import pytest
+
+
+os.environ["TESTING"] = "true"
+os.environ["LOCAL_AWS"] = "true"
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    from ai_stream.db.aws import create_tables
+    from ai_stream.db.aws import start_moto_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    config.stash[moto_server_key] = start_moto_server(verbose=False)
+    create_tables()
+
+
+def pytest_unconfigure(config: pytest.Config) -> None:
+    server = config.stash.get(moto_server_key, None)
+    if server:
+        server.stop()
+
+
+moto_server_key = pytest.StashKey()
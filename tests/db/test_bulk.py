@@ -0,0 +1,125 @@
+import io
+import json
+import math
+from ai_stream.db.aws import FunctionsTable
+from ai_stream.db.aws import PromptsTable
+from ai_stream.db.aws import prompt_history
+from ai_stream.db.bulk import export_items
+from ai_stream.db.bulk import import_items
+from ai_stream.db.bulk import main
+from ai_stream.utils.versioning import add_version
+from ai_stream.utils.versioning import get_text
+
+
+SCHEMA = {"name": "get_weather", "parameters": {"type": "object", "properties": {}}}
+
+
+def prompt_line(prompt_id, value="Be helpful.", **fields):
+    return json.dumps({"id": prompt_id, "name": prompt_id.title(), "value": value, **fields})
+
+
+def function_line(function_id, schema):
+    return json.dumps({"table": "FunctionsTable", "id": function_id, "name": "F", "value": schema})
+
+
+def test_import_items():
+    PromptsTable(id="bulk_a", name="A", used_by=["asst_1"], value="Old.").save()
+    lines = [
+        prompt_line("bulk_a", "New.", used_by=["asst_2"]),
+        "",
+        prompt_line("bulk_b"),
+        "not json",
+        json.dumps({"id": "bulk_c", "name": "C"}),
+        prompt_line("bulk_d", value=["wrong"]),
+        json.dumps({"table": "Unknown", "id": "bulk_e"}),
+        function_line("bulk_f", SCHEMA),
+        prompt_line("bulk_g", extra=1),
+        function_line("bulk_h", {"name": "get weather"}),
+        function_line("bulk_i", {**SCHEMA, "parameters": {"type": "string"}}),
+        prompt_line("bulk_j", "{% if formal %}Be formal."),
+    ]
+    reports = []
+
+    chunk_size = 3
+    report = import_items(lines, "PromptsTable", chunk_size=chunk_size, progress=reports.append)
+
+    assert (report.created, report.updated, report.unchanged) == (2, 1, 0)
+    assert [number for number, _ in report.errors] == [4, 5, 6, 7, 9, 10, 11, 12]
+    assert "'value'" in report.errors[1][1]
+    assert "function name" in report.errors[5][1]
+    assert "parameters" in report.errors[6][1]
+    assert report.errors[7][1].startswith("Invalid template")
+    assert len(reports) == math.ceil(len([line for line in lines if line]) / chunk_size)
+    updated = PromptsTable.get("bulk_a")
+    assert updated.value == "New."
+    assert updated.used_by == ["asst_1", "asst_2"]
+    assert PromptsTable.get("bulk_b").used_by == []
+    function = FunctionsTable.get("bulk_f")
+    assert function.value.as_dict() == SCHEMA
+    function.delete()
+
+    # Importing again changes nothing
+    report = import_items(lines[:3], "PromptsTable")
+    assert (report.created, report.updated, report.unchanged) == (0, 0, 2)
+
+
+def test_export_import_round_trip(tmp_path):
+    for i in range(5):
+        PromptsTable(id=f"round_{i}", name=f"R{i}", used_by=[], value=f"Prompt {i}.").save()
+    file = io.StringIO()
+    counts = []
+
+    count = export_items([PromptsTable], file, page_size=2, progress=counts.append)
+
+    records = [json.loads(line) for line in file.getvalue().splitlines()]
+    assert count == len(records) == PromptsTable.count()
+    assert counts[-1] == count
+    record = {"id": "round_3", "name": "R3", "used_by": [], "value": "Prompt 3."}
+    assert {"table": "PromptsTable", **record} in records
+
+    for i in range(5):
+        PromptsTable.get(f"round_{i}").delete()
+    path = tmp_path / "prompts.jsonl"
+    path.write_text(file.getvalue())
+    assert main(["import", str(path)]) == 0
+    assert PromptsTable.get("round_3").value == "Prompt 3."
+
+
+def test_import_keeps_prompt_versions():
+    history = {}
+    first = add_version(history, "Old.", parent=None)
+    PromptsTable(
+        id="bulk_v", name="V", used_by=[], value="Old.", version=first, history=history
+    ).save()
+
+    # Unchanged values keep the versions
+    report = import_items([prompt_line("bulk_v", "Old.", name="V")], "PromptsTable")
+    assert report.unchanged == 1
+
+    # Changed values are added as a new version
+    import_items([prompt_line("bulk_v", "New.")], "PromptsTable")
+    history, version = prompt_history(PromptsTable.get("bulk_v"))
+    assert set(history) == {version, first}
+    assert get_text(history, version) == "New."
+    assert history[version]["parent"] == first
+
+
+def test_export_history():
+    history = {}
+    first = add_version(history, "Old.", parent=None)
+    version = add_version(history, "New.", parent=first)
+    PromptsTable(
+        id="bulk_h", name="H", used_by=[], value="New.", version=version, history=history
+    ).save()
+
+    def exported(**kwargs):
+        file = io.StringIO()
+        export_items([PromptsTable], file, **kwargs)
+        records = [json.loads(line) for line in file.getvalue().splitlines()]
+        return next(record for record in records if record["id"] == "bulk_h")
+
+    record = {"id": "bulk_h", "name": "H", "used_by": [], "value": "New."}
+    assert exported() == {"table": "PromptsTable", **record}
+    record = exported(with_history=True)
+    assert record["version"] == version
+    assert set(record["history"]) == {first, version}
@@ -0,0 +1,116 @@
+import httpx
+from openai import NotFoundError
+from openai.types.beta import Assistant
+from ai_stream.db.aws import FunctionsTable
+from ai_stream.db.aws import PromptsTable
+from ai_stream.db.reconcile import apply
+from ai_stream.db.reconcile import load_snapshot
+from ai_stream.db.reconcile import plan
+from ai_stream.db.reconcile import reconcile
+from ai_stream.utils.assistant_metadata import set_function_ids
+from ai_stream.utils.assistant_metadata import set_settings
+from ai_stream.utils.templates import INSTRUCTIONS_KEY
+from ai_stream.utils.templates import VARIABLES_KEY
+from ai_stream.utils.versioning import content_hash
+
+
+SCHEMA = {"name": "get_weather", "description": "Weather of a city.", "parameters": {}}
+
+
+class FakeAssistants:
+    def __init__(self, *assistants):
+        self.assistants = {assistant.id: assistant for assistant in assistants}
+        self.updates = []
+
+    def list(self, limit):
+        return list(self.assistants.values())
+
+    def retrieve(self, assistant_id):
+        if assistant_id not in self.assistants:  # Deleted, or of another project
+            request = httpx.Request("GET", "https://api.openai.com")
+            response = httpx.Response(404, request=request)
+            raise NotFoundError("Not found", response=response, body=None)
+        return self.assistants[assistant_id]
+
+    def update(self, assistant_id, **changes):
+        self.updates.append((assistant_id, set(changes)))
+        assistant = self.assistants[assistant_id]
+        self.assistants[assistant_id] = Assistant.model_validate(
+            {**assistant.model_dump(), **changes}
+        )
+
+
+class FakeClient:
+    def __init__(self, *assistants):
+        self.beta = type("Beta", (), {"assistants": FakeAssistants(*assistants)})()
+
+
+def make_assistant(assistant_id, metadata, instructions="", tools=()):
+    return Assistant(
+        id=assistant_id,
+        created_at=0,
+        model="gpt-4o-mini",
+        object="assistant",
+        instructions=instructions,
+        metadata=metadata,
+        tools=list(tools),
+    )
+
+
+def test_reconcile():
+    PromptsTable(
+        id="rec_prompt", name="Rec", used_by=["asst_gone", "asst_other"], value="Hi {{ name }}."
+    ).save()
+    FunctionsTable(id="rec_function", name="Weather", used_by=[], value=SCHEMA).save()
+    outdated = {**SCHEMA, "description": "Old."}
+    settings = {VARIABLES_KEY: {"name": "Ada"}, INSTRUCTIONS_KEY: content_hash("Hi Ada.")}
+    metadata = set_function_ids({"prompt_id": "rec_prompt"}, ["rec_function"])
+    metadata = set_settings(metadata, settings)
+    tools = [{"type": "file_search"}, {"type": "function", "function": outdated}]
+    client = FakeClient(
+        make_assistant("asst_a", metadata, "Hi Ada.", tools),
+        make_assistant("asst_b", {"prompt_id": "rec_missing"}),
+    )
+
+    report = reconcile(client)
+
+    used_by = {fix.id: fix.used_by for fix in report.item_fixes}
+    assert used_by["rec_prompt"] == ["asst_gone", "asst_other", "asst_a"]
+    assert used_by["rec_function"] == ["asst_a"]
+    (fix,) = report.assistant_fixes
+    assert fix.assistant_id == "asst_a"
+    assert set(fix.changes) == {"tools", "metadata"}
+    assert fix.changes["tools"][1]["function"] == SCHEMA
+    assert report.problems == ["Assistant asst_b uses missing prompt rec_missing."]
+    assert {"asst_gone", "asst_other"} <= set(report.unknown)
+    assert not client.beta.assistants.updates
+    assert PromptsTable.get("rec_prompt").used_by == ["asst_gone", "asst_other"]
+
+    updated = []
+    report = reconcile(client, fix=True, on_update=lambda t, i: updated.append((t, i)))
+
+    assert report.applied
+    assert (PromptsTable, "rec_prompt") in updated
+    assert client.beta.assistants.updates == [("asst_a", {"tools", "metadata"})]
+    assert PromptsTable.get("rec_prompt").used_by == ["asst_gone", "asst_other", "asst_a"]
+    assert FunctionsTable.get("rec_function").used_by == ["asst_a"]
+
+    # Nothing is left to fix
+    report = reconcile(client)
+    assert not [fix for fix in report.item_fixes if fix.id.startswith("rec_")]
+    assert not report.assistant_fixes
+
+
+def test_apply_keeps_concurrent_edits():
+    PromptsTable(id="edit_prompt", name="Edit", used_by=[], value="Hi.").save()
+    client = FakeClient(make_assistant("asst_edit", {"prompt_id": "edit_prompt"}, "Hi."))
+    snapshot = load_snapshot(client)
+    report = plan(snapshot)
+
+    # The prompt is edited after it was read
+    prompt = PromptsTable.get("edit_prompt")
+    prompt.update(actions=[PromptsTable.used_by.set(["asst_new"])])
+    apply(client, snapshot, report)
+
+    assert PromptsTable.get("edit_prompt").used_by == ["asst_new"]
+    assert "PromptsTable edit_prompt changed since it was read, not updated." in report.problems
@@ -0,0 +1,49 @@
+from ai_stream.utils.assistant_metadata import MAX_KEYS
+from ai_stream.utils.assistant_metadata import MAX_VALUE_LENGTH
+from ai_stream.utils.assistant_metadata import SETTINGS_KEY
+from ai_stream.utils.assistant_metadata import function_ids
+from ai_stream.utils.assistant_metadata import get_settings
+from ai_stream.utils.assistant_metadata import metadata_errors
+from ai_stream.utils.assistant_metadata import set_function_ids
+from ai_stream.utils.assistant_metadata import set_settings
+from ai_stream.utils.assistant_metadata import update_settings
+
+
+def test_settings():
+    settings = {"truncation": "last_messages", "truncation_limit": 10, "variables": {"a": "b"}}
+    metadata = set_settings({"prompt_id": "p"}, {**settings, "summarize": False})
+
+    # Settings are packed into a single key, without empty ones
+    assert set(metadata) == {"prompt_id", SETTINGS_KEY}
+    assert get_settings(metadata) == settings
+    updated = update_settings(metadata, summarize=True)
+    assert get_settings(updated) == {**settings, "summarize": True}
+    assert set_settings(metadata, {}) == {"prompt_id": "p"}
+    assert get_settings({SETTINGS_KEY: "not json"}) == {}
+
+
+def test_metadata_errors():
+    assert metadata_errors({"prompt_id": "p", "settings": "{}"}) == []
+
+    keys = {f"key_{i}": "value" for i in range(MAX_KEYS)}
+    assert len(metadata_errors({"prompt_id": "p", **keys})) == 1
+    long_value = set_settings({}, {"variables": {"text": "x" * MAX_VALUE_LENGTH}})
+    assert len(metadata_errors(long_value)) == 1
+
+
+def test_function_ids():
+    ids = [f"function_id_{i:010}" for i in range(100)]
+    metadata = set_function_ids({"prompt_id": "p"}, ids)
+
+    # IDs continue under numbered keys when they don't fit in a value
+    assert function_ids(metadata) == ids
+    assert set(metadata) == {
+        "prompt_id",
+        "functions",
+        "functions_1",
+        "functions_2",
+        "functions_3",
+        "functions_4",
+    }
+    assert metadata_errors(metadata) == []
+    assert set_function_ids(metadata, []) == {"prompt_id": "p"}
@@ -0,0 +1,44 @@
+from openai.types.beta import Assistant
+from ai_stream.utils.assistant_mirror import AssistantMirror
+from ai_stream.utils.assistant_mirror import diff_configuration
+from ai_stream.utils.assistant_mirror import mirror_assistant
+
+
+def make_assistant(**fields):
+    fields = {"name": "Helper", "instructions": "Be helpful.", "temperature": 0.7, **fields}
+    return Assistant(
+        id="asst_1", created_at=0, model="gpt-4o-mini", object="assistant", tools=[], **fields
+    )
+
+
+def test_diff_configuration():
+    old = {"name": "A", "temperature": 0.7, "tools": [{"type": "file_search"}]}
+    new = {"name": "A", "temperature": 0.2, "tools": [{"type": "file_search"}], "top_p": 1.0}
+    assert diff_configuration(old, new) == {"temperature": 0.2, "top_p": 1.0}
+
+
+def test_mirror_changes():
+    mirror = AssistantMirror(make_assistant())
+    assert mirror.configuration["instructions"] == "Be helpful."
+    assert "response_format" not in mirror.configuration
+
+    assert mirror.changes(dict(mirror.configuration)) == {}
+    assert mirror.changes({**mirror.configuration, "name": "Tutor"}) == {"name": "Tutor"}
+    assert mirror.is_fresh(ttl=60)
+    assert not mirror.is_fresh(ttl=0)
+
+
+def test_mirror_assistant_keeps_sent_configuration():
+    mirrors = {}
+    assistant = make_assistant()
+    sent = {"name": "Helper", "tools": [{"type": "file_search"}]}
+    mirror = mirror_assistant(mirrors, assistant, sent)
+
+    # Listing the same assistant again keeps what was sent
+    assert mirror_assistant(mirrors, assistant.model_copy()) is mirror
+    assert mirrors["asst_1"].configuration == sent
+
+    # Changes made elsewhere replace it
+    renamed = mirror_assistant(mirrors, make_assistant(name="Tutor"))
+    assert renamed.configuration["name"] == "Tutor"
+    assert mirrors["asst_1"] is renamed
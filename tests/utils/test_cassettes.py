@@ -0,0 +1,93 @@
+import threading
+import streamlit as st
+from openai import OpenAI
+from ai_stream.benchmarks.fake_assistants_api import FakeBehaviour
+from ai_stream.benchmarks.fake_assistants_api import create_server
+from ai_stream.components.helpers import StreamAssistantEventHandler
+from ai_stream.components.messages import AssistantMessage
+from ai_stream.components.messages import TextInput
+from ai_stream.utils.app_state import AppState
+from ai_stream.utils.cassettes import CassettePlayer
+from ai_stream.utils.cassettes import CassetteRecorder
+from ai_stream.utils.cassettes import load_cassette
+
+
+FUNCTION = {
+    "name": "TextInput",
+    "description": "Text input.",
+    "parameters": {
+        "type": "object",
+        "properties": {"label": {"type": "string", "description": "Label."}},
+        "required": ["label"],
+    },
+}
+
+
+def record_tool_call_run(path):
+    server = create_server(FakeBehaviour(token_rate=1000, latency=0, reply_tokens=5), port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    try:
+        client = OpenAI(api_key="fake", base_url=f"http://{host}:{port}/v1", max_retries=0)
+        asst = client.beta.assistants.create(
+            model="gpt-4o-mini", tools=[{"type": "function", "function": FUNCTION}]
+        )
+        thread = client.beta.threads.create()
+        client.beta.threads.messages.create(thread.id, role="user", content="Show a TextInput")
+
+        app_state = AppState()
+        app_state.openai_client = client
+        with (
+            CassetteRecorder(path) as recorder,
+            client.beta.threads.runs.stream(
+                thread_id=thread.id,
+                assistant_id=asst.id,
+                event_handler=StreamAssistantEventHandler(
+                    app_state=app_state, st_placeholder=st.empty(), recorder=recorder
+                ),
+            ) as stream,
+        ):
+            stream.until_done()
+        return app_state.history
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_record_and_replay(tmp_path):
+    path = tmp_path / "run.jsonl"
+    recorded_history = record_tool_call_run(path)
+
+    events = load_cassette(path)
+    assert [e.event for e in events if e.segment == 0][-1] == "thread.run.requires_action"
+    assert [e.event for e in events if e.segment == 1][-1] == "thread.run.completed"
+    assert all(a.offset <= b.offset for a, b in zip(events, events[1:], strict=False))
+
+    app_state = AppState()  # No OpenAI client, so any API call would fail
+    handler = StreamAssistantEventHandler(
+        app_state=app_state,
+        st_placeholder=st.empty(),
+        player=CassettePlayer.from_file(path, speed=0),
+    )
+    handler.replay()
+
+    assert [type(m) for m in app_state.history] == [TextInput, AssistantMessage]
+    assert app_state.history[0].widget_config == recorded_history[0].widget_config
+    assert app_state.history[1].content == recorded_history[1].content
+    assert app_state.history[1].content.startswith("You said: Show a TextInput")
+
+
+def test_replay_speed(tmp_path, monkeypatch):
+    path = tmp_path / "run.jsonl"
+    record_tool_call_run(path)
+    sleeps = []
+    monkeypatch.setattr("ai_stream.utils.cassettes.time.sleep", sleeps.append)
+
+    list(CassettePlayer.from_file(path, speed=0).segment(0))
+    assert sleeps == []
+
+    events = [e for e in load_cassette(path) if e.segment == 0]
+    list(CassettePlayer.from_file(path, speed=2.0).segment(0))
+    # Sleeping is mocked, so each sleep lasts until the event is due
+    assert len(sleeps) == len(events)
+    assert max(sleeps) <= (events[-1].offset - events[0].offset) / 2
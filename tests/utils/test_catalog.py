@@ -0,0 +1,102 @@
+from ai_stream.utils.catalog import Catalog
+from ai_stream.utils.catalog import CatalogView
+from ai_stream.utils.catalog import index_listener
+from ai_stream.utils.search import SearchIndex
+
+
+ITEMS = [("p1", "Support Agent", "Answer tickets."), ("p2", "Translator", "Translate text.")]
+
+
+def shared_catalog(items=ITEMS):
+    loads = []
+
+    def load():
+        loads.append(1)
+        yield from items
+
+    catalog = Catalog(load)
+    index = SearchIndex()
+    catalog.subscribe(index_listener(index))
+    return catalog, index, loads
+
+
+def test_catalog_loads_lazily():
+    catalog, index, loads = shared_catalog()
+    assert not loads
+    assert len(catalog) == len(ITEMS)
+    assert catalog["p2"] == "Translator"
+    assert catalog.ids() == ["p1", "p2"]
+    assert loads == [1]
+    # The index is filled while loading
+    assert index.search("tickets", 5) == ["p1"]
+
+
+def test_catalog_page():
+    items = [(f"p{i}", f"Prompt {i}", "") for i in range(10)]
+    catalog, _, _ = shared_catalog(items)
+    assert catalog.page(0, 3) == ["p0", "p1", "p2"]
+    assert catalog.page(8, 3) == ["p8", "p9"]
+
+
+def test_catalog_notifies_listeners():
+    catalog, index, _ = shared_catalog()
+    changes = []
+    catalog.subscribe(lambda *change: changes.append(change))
+    # Loading notifies the listeners too
+    assert len(catalog) == len(changes)
+    changes.clear()
+
+    catalog.set("p3", "Reviewer", "Review code.")
+    catalog.remove("p1")
+    catalog.remove("unknown")
+
+    assert changes == [("p3", "Reviewer", "Review code."), ("p1", None, "")]
+    assert "p1" not in index
+    assert index.search("review", 5) == ["p3"]
+
+
+def test_catalog_reload():
+    items = list(ITEMS)
+    catalog, index, loads = shared_catalog(items)
+    catalog.set("p3", "Reviewer")
+    items.pop(0)
+
+    catalog.reload()
+
+    assert catalog.ids() == ["p2"]
+    assert len(index) == 1
+    assert len(loads) == len(["first", "reload"])
+
+
+def test_view_drafts():
+    catalog, index, _ = shared_catalog()
+    view = CatalogView(catalog, index)
+    other = CatalogView(catalog, index)
+
+    view.add_draft("tmp1", "Tmp")
+    view.add_draft("tmp2", "Tmp")
+    assert list(view) == ["tmp2", "tmp1", "p1", "p2"]
+    assert "tmp1" not in other
+
+    view.publish("tmp1", "Reviewer", "Review code.")
+    assert list(view) == ["tmp2", "p1", "p2", "tmp1"]
+    assert other["tmp1"] == "Reviewer"
+
+    view.remove("tmp2")
+    view.remove("p1")
+    assert list(other) == ["p2", "tmp1"]
+
+
+def test_view_search():
+    catalog, index, _ = shared_catalog()
+    view = CatalogView(catalog, index)
+    view.add_draft("tmp", "Tmp")
+
+    assert view.search("", 1) == ["tmp", "p1"]
+    assert view.search("translate", 5) == ["tmp", "p2"]
+
+
+def test_standalone_view():
+    view = CatalogView.standalone()
+    view.publish("asst_1", "Helper", "Help users.")
+    assert view.search("help", 5) == ["asst_1"]
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+import pytest
+from ai_stream.utils.assistant_metadata import set_settings
+from ai_stream.utils.context_window import LIMIT_KEY
+from ai_stream.utils.context_window import SUMMARY_PREFIX
+from ai_stream.utils.context_window import TRUNCATION_KEY
+from ai_stream.utils.context_window import compact_thread
+from ai_stream.utils.context_window import run_context_params
+
+
+class FakeClient:
+    def __init__(self):
+        self.prompts = []
+        self.threads = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.complete))
+        self.beta = SimpleNamespace(threads=SimpleNamespace(create=self.create_thread))
+
+    def complete(self, model, messages):
+        self.prompts.append(messages[-1]["content"])
+        message = SimpleNamespace(content=f"summary {len(self.prompts)}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def create_thread(self, messages):
+        self.threads.append(messages)
+        return SimpleNamespace(id=f"thread_{len(self.threads)}")
+
+
+def test_run_context_params():
+    assert run_context_params({}) == {}
+    last_messages = set_settings({}, {TRUNCATION_KEY: "last_messages", LIMIT_KEY: 10})
+    assert run_context_params(last_messages) == {
+        "truncation_strategy": {"type": "last_messages", "last_messages": 10}
+    }
+    max_prompt_tokens = set_settings({}, {TRUNCATION_KEY: "max_prompt_tokens", LIMIT_KEY: 4000})
+    assert run_context_params(max_prompt_tokens) == {"max_prompt_tokens": 4000}
+
+
+def test_compact_thread():
+    client = FakeClient()
+    messages = [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}"}
+        for i in range(6)
+    ]
+
+    thread_id, summary = compact_thread(client, "", messages, keep=2, model="gpt-4o-mini")
+    assert (thread_id, summary) == ("thread_1", "summary 1")
+    assert client.prompts[0].splitlines() == [f"{m['role']}: {m['content']}" for m in messages[:4]]
+    assert client.threads[0] == [
+        {"role": "assistant", "content": SUMMARY_PREFIX + "summary 1"},
+        *messages[4:],
+    ]
+
+    # Later summaries extend the previous one
+    compact_thread(client, summary, messages[4:] * 2, keep=2, model="gpt-4o-mini")
+    assert client.prompts[1].startswith(SUMMARY_PREFIX + "summary 1\n")
+
+    # Keeping no messages would keep the whole thread
+    with pytest.raises(ValueError, match="At least 1"):
+        compact_thread(client, summary, messages, keep=0, model="gpt-4o-mini")
+    assert len(client.threads) == len(["first", "later"])
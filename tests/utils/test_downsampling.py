@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from ai_stream.utils.downsampling import OTHER_LABEL
+from ai_stream.utils.downsampling import aggregate_bars
+from ai_stream.utils.downsampling import downsample_lines
+from ai_stream.utils.downsampling import lttb_indices
+
+
+N_POINTS = 1000
+N_OUT = 50
+PEAK = 500
+
+
+def test_lttb_keeps_ends_and_peaks():
+    x = np.arange(N_POINTS, dtype=float)
+    y = np.zeros(N_POINTS)
+    y[PEAK] = 10.0
+    indices = lttb_indices(x, y, N_OUT)
+
+    assert len(indices) == N_OUT
+    assert indices[0] == 0
+    assert indices[-1] == N_POINTS - 1
+    assert PEAK in indices
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_short_series_is_unchanged():
+    assert lttb_indices(np.arange(5.0), np.arange(5.0), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_downsample_lines_bounds_rows():
+    x = np.linspace(0, 10, 10 * N_POINTS)
+    spike = np.zeros_like(x)
+    spike[PEAK] = 10.0
+    frame = pd.DataFrame({"a": np.sin(x), "b": spike})
+    result = downsample_lines(frame, N_OUT)
+
+    assert len(result) <= N_OUT
+    assert result.index.is_monotonic_increasing
+    assert PEAK in result.index
+
+
+def test_aggregate_bars():
+    frame = pd.DataFrame({"value": [1.0, 50.0, 2.0, 40.0, 3.0]}, index=list("abcde"))
+    result = aggregate_bars(frame, 3)
+
+    assert result.index.tolist() == ["b", "d", OTHER_LABEL]
+    assert result.loc[OTHER_LABEL].tolist() == [1.0 + 2.0 + 3.0]
@@ -0,0 +1,54 @@
+import io
+import os
+import threading
+from types import SimpleNamespace
+from ai_stream.utils.file_uploads import FileIdCache
+from ai_stream.utils.file_uploads import spool_file
+from ai_stream.utils.file_uploads import upload_files
+
+
+class FakeFiles:
+    def __init__(self):
+        self.uploaded = []
+        self._lock = threading.Lock()
+
+    def create(self, file, purpose):
+        name, f = file
+        with self._lock:
+            self.uploaded.append((name, f.read()))
+            return SimpleNamespace(id=f"file-{len(self.uploaded)}")
+
+
+def _named_file(name, content):
+    f = io.BytesIO(content)
+    f.name = name
+    return f
+
+
+def test_spool_file():
+    spooled = spool_file(io.BytesIO(b"a,b\n1,2\n"), "data.csv")
+    try:
+        with open(spooled.path, "rb") as f:
+            assert f.read() == b"a,b\n1,2\n"
+        assert spooled.size == len(b"a,b\n1,2\n")
+    finally:
+        os.unlink(spooled.path)
+
+
+def test_upload_files_deduplicates():
+    client = SimpleNamespace(api_key="sk-a", organization=None, project="proj", files=FakeFiles())
+    cache = FileIdCache()
+    files = [_named_file("a.csv", b"same"), _named_file("b.csv", b"same")]
+
+    first = upload_files(client, files, cache)
+    second = upload_files(client, [_named_file("c.csv", b"same")], cache)
+
+    assert first == ["file-1", "file-1"]
+    assert second == ["file-1"]
+    assert client.files.uploaded == [("a.csv", b"same")]
+
+    other_project = SimpleNamespace(**{**vars(client), "project": "other"})
+    assert upload_files(other_project, [_named_file("a.csv", b"same")], cache) == ["file-2"]
+    # Another account is never given the files of the first one, even in a same named project
+    other_account = SimpleNamespace(**{**vars(client), "api_key": "sk-b"})
+    assert upload_files(other_account, [_named_file("a.csv", b"same")], cache) == ["file-3"]
@@ -0,0 +1,203 @@
+import pytest
+from pydantic import BaseModel
+from pydantic import Field
+from ai_stream.utils.function_tools import ANY_OF
+from ai_stream.utils.function_tools import Function2Display
+from ai_stream.utils.function_tools import build_json_schema
+from ai_stream.utils.function_tools import compile_parameter
+from ai_stream.utils.function_tools import diff_parameters
+from ai_stream.utils.function_tools import get_openai_function
+
+
+class DemoSchema(BaseModel):
+    """Demo tool."""
+
+    label: str = Field(..., description="A label.")
+    options: list[str] = Field(None, description="Options.")
+
+
+def test_get_openai_function_returns_independent_copies():
+    first = get_openai_function(DemoSchema)
+    first["name"] = "Changed"
+    second = get_openai_function(DemoSchema)
+
+    assert second["name"] == "DemoSchema"
+    assert second["parameters"]["required"] == ["label"]
+
+
+def test_from_pydantic_model_uses_template():
+    func_a = Function2Display.from_pydantic_model("id_a", "A", DemoSchema)
+    func_b = Function2Display.from_pydantic_model("id_b", "B", DemoSchema)
+    assert func_a.schema_id == "id_a"
+    assert func_b.schema_name == "B"
+    assert func_a.description == "Demo tool."
+    assert [p.name for p in func_a.parameters.values()] == ["label", "options"]
+
+    # Parameters must not be shared between functions
+    next(iter(func_a.parameters.values())).name = "renamed"
+    assert next(iter(func_b.parameters.values())).name == "label"
+
+
+def schema_with(*names):
+    properties = {name: {"type": "string", "description": name.title()} for name in names}
+    return {"name": "Demo", "description": "Demo.", "parameters": {"properties": properties}}
+
+
+def test_from_openai_function_ids_are_stable():
+    func_a = Function2Display.from_openai_function("id", "A", schema_with("label", "help"))
+    func_b = Function2Display.from_openai_function("id", "A", schema_with("label", "help"))
+    other = Function2Display.from_openai_function("other", "A", schema_with("label", "help"))
+
+    assert list(func_a.parameters) == list(func_b.parameters)
+    assert not set(func_a.parameters) & set(other.parameters)
+
+
+def test_diff_parameters():
+    old = Function2Display.from_openai_function("id", "A", schema_with("label", "help", "value"))
+    schema = schema_with("label", "tooltip", "value", "placeholder")
+    schema["parameters"]["properties"]["value"]["type"] = "number"
+    new = Function2Display.from_openai_function("id", "A", schema)
+    old_ids = list(old.parameters)
+
+    parameters, diff = diff_parameters(old.parameters, new.parameters)
+
+    # Matched by name, or by position for the renamed parameter
+    assert [p.name for p in parameters.values()] == ["label", "tooltip", "value", "placeholder"]
+    assert list(parameters)[:3] == old_ids
+    assert parameters[old_ids[0]] is old.parameters[old_ids[0]]
+    assert diff.unchanged == [old_ids[0]]
+    assert diff.changed == [old_ids[1], old_ids[2]]
+    assert diff.added == [list(parameters)[3]]
+    assert diff.removed == []
+
+    # Moved parameters keep their IDs
+    reordered = Function2Display.from_openai_function("id", "A", schema_with("value", "label"))
+    parameters, diff = diff_parameters(old.parameters, reordered.parameters)
+    assert list(parameters) == [old_ids[2], old_ids[0]]
+    assert diff.removed == [old_ids[1]]
+
+
+def test_diff_parameters_unchanged():
+    old = Function2Display.from_openai_function("id", "A", schema_with("label", "help"))
+    new = Function2Display.from_openai_function("id", "A", schema_with("label", "help"))
+
+    parameters, diff = diff_parameters(old.parameters, new.parameters)
+    assert not diff
+    assert all(parameters[i] is old.parameters[i] for i in old.parameters)
+
+    _, diff = diff_parameters(old.parameters, {})
+    assert diff.removed == list(old.parameters)
+
+
+NESTED_SCHEMA = {
+    "name": "Form",
+    "description": "A form.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string", "description": "Title."},
+            "fields": {
+                "type": "array",
+                "description": "Fields.",
+                "items": {"$ref": "#/$defs/Field"},
+            },
+            "width": {"anyOf": [{"type": "integer"}, {"type": "string"}], "description": "W."},
+        },
+        "required": ["title"],
+        "$defs": {
+            "Field": {
+                "type": "object",
+                "properties": {
+                    "label": {"type": "string", "description": "Label."},
+                    "kind": {"type": "string", "description": "Kind.", "enum": ["text", "int"]},
+                },
+                "required": ["label"],
+            }
+        },
+    },
+}
+
+
+def test_from_openai_function_nested():
+    func = Function2Display.from_openai_function("id", "Form", NESTED_SCHEMA)
+    title, fields, width = func.parameters.values()
+
+    assert title.required
+    assert (fields.type, fields.items_type, fields.nested_type) == ("array", "object", "object")
+    assert [p.name for p in fields.properties.values()] == ["label", "kind"]
+    assert next(iter(fields.properties.values())).required
+    assert width.type == ANY_OF
+    assert [p.type for p in width.any_of.values()] == ["integer", "string"]
+    # Nested IDs are unique and stable
+    again = Function2Display.from_openai_function("id", "Form", NESTED_SCHEMA)
+    assert list(fields.properties) == list(list(again.parameters.values())[1].properties)
+    assert not set(fields.properties) & set(func.parameters)
+
+
+def test_build_json_schema_nested_round_trip():
+    func = Function2Display.from_openai_function("id", "Form", NESTED_SCHEMA)
+    schema, _ = build_json_schema(func.schema_name, func.description, func.parameters)
+
+    expected = {k: v for k, v in NESTED_SCHEMA["parameters"].items() if k != "$defs"}
+    expected["properties"]["fields"]["items"] = NESTED_SCHEMA["parameters"]["$defs"]["Field"]
+    assert schema["parameters"] == expected
+
+
+def test_nullable_type_list():
+    schema = schema_with("label")
+    schema["parameters"]["properties"]["label"]["type"] = ["string", "null"]
+    func = Function2Display.from_openai_function("id", "A", schema)
+
+    compiled, _ = build_json_schema("A", "A.", func.parameters)
+    assert compiled["parameters"]["properties"]["label"] == {
+        "anyOf": [{"type": "string"}, {"type": "null"}],
+        "description": "Label",
+    }
+
+
+def test_recursive_ref():
+    schema = {
+        "name": "Tree",
+        "description": "Tree.",
+        "parameters": {
+            "properties": {"root": {"$ref": "#/$defs/Node"}},
+            "$defs": {
+                "Node": {"type": "object", "properties": {"child": {"$ref": "#/$defs/Node"}}}
+            },
+        },
+    }
+    with pytest.raises(ValueError, match="Node"):
+        Function2Display.from_openai_function("id", "Tree", schema)
+
+
+def test_build_json_schema_memoized():
+    func = Function2Display.from_openai_function("id", "Form", NESTED_SCHEMA)
+    first = build_json_schema("Form", "A form.", func.parameters)
+    # Structurally equal parameters with other IDs share the compiled schema
+    other = Function2Display.from_openai_function("other", "Form", NESTED_SCHEMA)
+    assert build_json_schema("Form", "A form.", other.parameters) is first
+
+    # Editing a top-level parameter reuses the unchanged nested object
+    fields = first[0]["parameters"]["properties"]["fields"]["items"]
+    next(iter(func.parameters.values())).description = "Changed."
+    hits = compile_parameter.cache_info().hits
+    second, _ = build_json_schema("Form", "A form.", func.parameters)
+    assert second["parameters"]["properties"]["title"]["description"] == "Changed."
+    assert second["parameters"]["properties"]["fields"]["items"] is fields
+    assert compile_parameter.cache_info().hits > hits
+
+
+def test_build_json_schema_flat():
+    func = Function2Display.from_openai_function("id", "A", schema_with("label", "options"))
+    param = list(func.parameters.values())[1]
+    param.type, param.items_type = "array", "string"
+
+    schema, text = build_json_schema("A", "A.", func.parameters)
+    assert schema["parameters"] == {
+        "type": "object",
+        "properties": {
+            "label": {"type": "string", "description": "Label"},
+            "options": {"type": "array", "description": "Options", "items": {"type": "string"}},
+        },
+    }
+    assert text.startswith('{\n  "name": "A"')
@@ -0,0 +1,128 @@
+import functools
+import http.server
+import io
+import threading
+import pytest
+from PIL import Image
+from ai_stream.utils.image_cache import ImageCache
+from ai_stream.utils.image_cache import ImageTooLargeError
+from ai_stream.utils.image_cache import ImageUnavailableError
+
+
+WIDTH = 40
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Serve the files of the test directory over HTTP, recording the requested paths."""
+    requests = []
+
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802
+            requests.append(self.path)
+            if self.path == "/redirect":
+                self.send_response(302)
+                self.send_header("Location", (tmp_path / "a.png").as_uri())
+                self.end_headers()
+                return
+            super().do_GET()
+
+        def log_message(self, *args):
+            pass
+
+    handler = functools.partial(Handler, directory=str(tmp_path))
+    with http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler) as httpd:
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        httpd.base_url = f"http://127.0.0.1:{httpd.server_address[1]}"
+        httpd.requests = requests
+        yield httpd
+        httpd.shutdown()
+
+
+def _image_url(server, path, width):
+    image = Image.new("RGB", (width, width), color="red")
+    image.save(path, format="PNG")
+    return f"{server.base_url}/{path.name}"
+
+
+def test_fetch_is_content_addressed(tmp_path, server):
+    cache = ImageCache(tmp_path / "cache", max_bytes=10**6, thumbnail_width=WIDTH)
+    url_a = _image_url(server, tmp_path / "a.png", 10)
+    tmp_path.joinpath("b.png").write_bytes((tmp_path / "a.png").read_bytes())
+
+    assert cache.fetch(url_a) == cache.fetch(f"{server.base_url}/b.png")
+    assert len(list(cache.directory.iterdir())) == 1
+    assert cache.get(url_a) == (tmp_path / "a.png").read_bytes()
+
+
+def test_thumbnail(tmp_path, server):
+    cache = ImageCache(tmp_path / "cache", max_bytes=10**6, thumbnail_width=WIDTH)
+    url = _image_url(server, tmp_path / "big.png", 4 * WIDTH)
+
+    thumbnail = Image.open(io.BytesIO(cache.thumbnail(url)))
+
+    assert thumbnail.size == (WIDTH, WIDTH)
+    assert thumbnail.format == "PNG"
+
+
+def test_evict_least_recently_used(tmp_path, server):
+    url_a = _image_url(server, tmp_path / "a.png", 10)
+    url_b = _image_url(server, tmp_path / "b.png", 20)
+    size_b = (tmp_path / "b.png").stat().st_size
+    cache = ImageCache(tmp_path / "cache", max_bytes=size_b, thumbnail_width=WIDTH)
+
+    hash_a = cache.fetch(url_a)
+    hash_b = cache.fetch(url_b)
+
+    assert not (cache.directory / hash_a).exists()
+    assert (cache.directory / hash_b).exists()
+    assert cache.size() <= size_b
+
+
+def test_failed_downloads_are_not_retried(tmp_path, server):
+    cache = ImageCache(tmp_path / "cache", max_bytes=10**6, thumbnail_width=WIDTH)
+    url = f"{server.base_url}/late.png"
+
+    with pytest.raises(OSError):
+        cache.fetch(url)
+    _image_url(server, tmp_path / "late.png", 10)
+    with pytest.raises(ImageUnavailableError):
+        cache.fetch(url)
+    assert cache.fetch_in_background(url) is None
+    assert server.requests == ["/late.png"]
+
+    # Tried again once the failure expired
+    cache = ImageCache(tmp_path / "cache", max_bytes=10**6, thumbnail_width=WIDTH, failure_ttl=0)
+    url = f"{server.base_url}/later.png"
+    with pytest.raises(OSError):
+        cache.fetch(url)
+    _image_url(server, tmp_path / "later.png", 10)
+    assert cache.fetch(url)
+
+
+def test_only_web_images_are_fetched(tmp_path, server):
+    url = _image_url(server, tmp_path / "a.png", 10)
+    size = (tmp_path / "a.png").stat().st_size
+    cache = ImageCache(tmp_path / "cache", max_bytes=10**6, thumbnail_width=WIDTH)
+
+    with pytest.raises(ValueError, match="http"):
+        cache.fetch((tmp_path / "a.png").as_uri())
+    with pytest.raises(OSError, match="not allowed"):
+        cache.fetch(f"{server.base_url}/redirect")
+
+    # Larger images are rejected, without reading them whole
+    small = ImageCache(tmp_path / "small", 10**6, WIDTH, max_image_bytes=size - 1)
+    with pytest.raises(ImageTooLargeError):
+        small.fetch(url)
+    assert not list(small.directory.iterdir())
+
+
+def test_cached_thumbnail_fetches_in_background(tmp_path, server):
+    cache = ImageCache(tmp_path / "cache", max_bytes=10**6, thumbnail_width=WIDTH)
+    url = _image_url(server, tmp_path / "a.png", 10)
+
+    assert cache.cached_thumbnail(url) is None
+    cache._pool.shutdown(wait=True)
+
+    assert cache.cached_thumbnail(url) == (tmp_path / "a.png").read_bytes()
@@ -0,0 +1,27 @@
+from ai_stream.utils.import_profile import parse_importtime
+from ai_stream.utils.import_profile import time_by_package
+
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   pandas._config
+import time:       300 |        420 | pandas
+import time:        50 |         50 |     yaml.error
+import time:        80 |        130 |   yaml
+some other stderr line
+"""
+
+
+def test_parse_importtime():
+    timings = parse_importtime(IMPORTTIME_OUTPUT)
+
+    assert [t.module for t in timings] == ["pandas._config", "pandas", "yaml.error", "yaml"]
+    assert [t.depth for t in timings] == [1, 0, 2, 1]
+    assert [t.cumulative_us for t in timings] == [120, 420, 50, 130]
+
+
+def test_time_by_package():
+    totals = time_by_package(parse_importtime(IMPORTTIME_OUTPUT))
+
+    assert totals == {"pandas": 420, "yaml": 130}
+    assert list(totals) == ["pandas", "yaml"]
@@ -0,0 +1,50 @@
+import json
+import pytest
+from ai_stream.utils.partial_json import PartialJsonParser
+from ai_stream.utils.partial_json import parse_partial_json
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("", None),
+        ("{", {}),
+        ('{"lab', {}),
+        ('{"label": ', {}),
+        ('{"label": "Ent', {"label": "Ent"}),
+        ('{"label": "Say \\"hi', {"label": 'Say "hi'}),
+        ('{"label": "Path C:\\', {"label": "Path C:"}),
+        ('{"label": "Enter", "opt', {"label": "Enter"}),
+        ('{"label": "Enter", "options": ["a", "b', {"label": "Enter", "options": ["a", "b"]}),
+        ('{"value": 12', {"value": 12}),
+        ('{"value": 1, "flag": tr', {"value": 1}),
+        ('{"a": {"b": [1, {"c": "d', {"a": {"b": [1, {"c": "d"}]}}),
+        ("[1, 2", [1, 2]),
+        ('{"label": "Enter"}', {"label": "Enter"}),
+    ],
+)
+def test_parse_partial_json(text, expected):
+    assert parse_partial_json(text) == expected
+
+
+def test_prefixes_of_document():
+    document = '{"label": "Pick one", "options": ["Red", "Green"], "index": 1}'
+    parsed = [parse_partial_json(document[:i]) for i in range(1, len(document) + 1)]
+
+    assert all(isinstance(value, dict) for value in parsed)
+    assert parsed[-1] == {"label": "Pick one", "options": ["Red", "Green"], "index": 1}
+    # Fields arrive in order and never disappear
+    assert [list(value) for value in parsed if value] == sorted(
+        [list(value) for value in parsed if value], key=len
+    )
+
+
+def test_parser_fed_in_pieces():
+    document = '{"label": "Say \\"hi\\"", "options": [1, {"a": null}], "flag": true}'
+    parser = PartialJsonParser()
+    for i in range(len(document)):
+        parser.feed(document[i])
+        assert parser.value() == parse_partial_json(document[: i + 1])
+    assert parser.value() == json.loads(document)
+    # Prefixes are only parsed once
+    assert parser.cuts == []
@@ -0,0 +1,83 @@
+import threading
+import pytest
+from ai_stream.utils.prefetch import Prefetcher
+
+
+def make_prefetcher(ttl=60, max_entries=100):
+    return Prefetcher(max_workers=4, ttl=ttl, max_entries=max_entries)
+
+
+def test_get_waits_for_prefetch():
+    prefetcher = make_prefetcher()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    prefetcher.prefetch("key", load)
+    started.wait(5)
+    prefetcher.prefetch("key", load)  # In flight
+    assert "key" in prefetcher
+    release.set()
+
+    assert prefetcher.get("key", load) == "value"
+    assert prefetcher.get("key", load) == "value"
+    assert len(calls) == 1
+
+
+def test_get_loads_missing_and_failed():
+    prefetcher = make_prefetcher()
+
+    def fail():
+        raise LookupError("missing")
+
+    prefetcher.prefetch("key", fail)
+    with pytest.raises(LookupError):
+        prefetcher.get("key", fail)
+    assert "key" not in prefetcher
+    assert prefetcher.get("key", lambda: "value") == "value"
+    assert "key" in prefetcher
+
+
+def test_prefetch_many():
+    prefetcher = make_prefetcher()
+    batches = []
+
+    def load(keys):
+        batches.append(keys)
+        return {key: key.upper() for key in keys if key != "missing"}
+
+    prefetcher.prefetch_many(["a", "b", "missing", "a"], load)
+    prefetcher.prefetch_many(["b", "c"], load)
+
+    assert [prefetcher.get(key, str) for key in "abc"] == ["A", "B", "C"]
+    assert prefetcher.get("missing", lambda: None) is None
+    assert batches == [["a", "b", "missing"], ["c"]]
+
+
+def test_expiry_and_eviction():
+    prefetcher = make_prefetcher(ttl=0)
+    prefetcher.get("key", lambda: "value")
+    assert "key" not in prefetcher
+
+    prefetcher = make_prefetcher(max_entries=2)
+    for key in "abc":
+        prefetcher.get(key, lambda: "value")
+    assert "a" not in prefetcher
+    assert "c" in prefetcher
+
+
+def test_take_and_invalidate():
+    prefetcher = make_prefetcher()
+    prefetcher.get("key", lambda: "old")
+    assert prefetcher.take("key", lambda: "new") == "old"
+    assert "key" not in prefetcher
+
+    prefetcher.get("key", lambda: "old")
+    prefetcher.invalidate("key")
+    assert prefetcher.get("key", lambda: "new") == "new"
@@ -0,0 +1,69 @@
+import json
+import os
+import time
+from ai_stream.utils.response_cache import VERSION_KEY
+from ai_stream.utils.response_cache import ResponseCache
+from ai_stream.utils.response_cache import cache_key
+from ai_stream.utils.response_cache import config_version
+
+
+def write_cassette(path, last_event="thread.run.completed", padding=0):
+    data = {"pad": "x" * padding}
+    events = [
+        {"offset": 0.0, "segment": 0, "event": "thread.run.created", "data": data},
+        {"offset": 0.1, "segment": 0, "event": last_event, "data": {}},
+    ]
+    path.write_text("".join(json.dumps(e) + "\n" for e in events))
+    return path
+
+
+def test_cache_key():
+    key = cache_key("asst_1", "v1", ["Hello  there", "How are you?"])
+
+    assert key == cache_key("asst_1", "v1", ["hello there", " How are you? "])
+    assert key != cache_key("asst_1", "v2", ["Hello there", "How are you?"])
+    assert key != cache_key("asst_2", "v1", ["Hello there", "How are you?"])
+    assert key != cache_key("asst_1", "v1", ["Hello there"])
+
+
+def test_config_version():
+    configuration = {"name": "A", "temperature": 0.7, "metadata": {"prompt_id": "p"}}
+    version = config_version(configuration)
+
+    configuration["metadata"][VERSION_KEY] = version
+    assert config_version(configuration) == version
+    configuration["temperature"] = 0.5
+    assert config_version(configuration) != version
+
+
+def test_put_and_get(tmp_path):
+    cache = ResponseCache(tmp_path / "cache", ttl=60, max_bytes=1 << 20)
+
+    assert cache.get("key") is None
+    assert not cache.put("key", write_cassette(tmp_path / "failed.jsonl", "thread.run.failed"))
+    assert cache.get("key") is None
+    assert cache.put("key", write_cassette(tmp_path / "run.jsonl"))
+    assert cache.get("key").read_text() == (tmp_path / "run.jsonl").read_text()
+
+
+def test_ttl(tmp_path):
+    cache = ResponseCache(tmp_path / "cache", ttl=60, max_bytes=1 << 20)
+    cache.put("key", write_cassette(tmp_path / "run.jsonl"))
+    stored_at = time.time() - 120
+    os.utime(cache.get("key"), (stored_at, stored_at))
+
+    assert cache.get("key") is None
+
+
+def test_evict_oldest(tmp_path):
+    padding = 1000
+    cache = ResponseCache(tmp_path / "cache", ttl=60, max_bytes=int(2.5 * padding))
+    cassette = write_cassette(tmp_path / "run.jsonl", padding=padding)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, cassette)
+        stored_at = time.time() - 10 + i
+        os.utime(cache.get(key), (stored_at, stored_at))
+    cache.evict()
+
+    assert [cache.get(key) is not None for key in ["a", "b", "c"]] == [False, True, True]
+    assert cache.size() <= cache.max_bytes
@@ -0,0 +1,44 @@
+from ai_stream.utils.search import SearchIndex
+from ai_stream.utils.search import trigrams
+
+
+ITEMS = [
+    ("p1", "Customer Support", "You answer questions about billing."),
+    ("p2", "Code Reviewer", "You review Python code."),
+    ("p3", "Support Escalation", "Escalate angry customers."),
+    ("p4", "Billing FAQ", ""),
+]
+
+
+def test_trigrams():
+    assert trigrams("Ab") == {"  a", " ab", "ab "}
+    assert trigrams("AB ab") == trigrams("ab")
+
+
+def test_search():
+    index = SearchIndex(ITEMS)
+
+    assert index.search("", limit=2) == ["p1", "p2"]
+    # Names starting with the query first, then names with a word starting with it
+    assert index.search("sup", limit=10) == ["p3", "p1"]
+    assert index.search("support", limit=10) == ["p3", "p1"]
+    assert set(index.search("suport", limit=10)) == {"p1", "p3"}  # Typos still match
+    assert index.search("esc", limit=10) == ["p3"]
+    # Matching names rank above matching texts
+    assert index.search("billing", limit=10) == ["p4", "p1"]
+    assert index.search("xyz", limit=10) == []
+    assert index.search("s", limit=1) == ["p3"]
+
+
+def test_updates():
+    index = SearchIndex(ITEMS)
+    index.add("p2", "Python Reviewer", "You review code.")
+    index.add("p5", "Code Generator")
+    index.remove("p1")
+    index.remove("missing")
+
+    assert len(index) == len(ITEMS)
+    assert "p1" not in index
+    assert index.name("p2") == "Python Reviewer"
+    assert index.search("code", limit=10) == ["p5", "p2"]
+    assert index.search("customer", limit=10) == ["p3"]
@@ -0,0 +1,115 @@
+import pytest
+from ai_stream.utils.assistant_metadata import set_settings
+from ai_stream.utils.templates import VARIABLES_KEY
+from ai_stream.utils.templates import Include
+from ai_stream.utils.templates import IncludeIndex
+from ai_stream.utils.templates import TemplateError
+from ai_stream.utils.templates import compile_template
+from ai_stream.utils.templates import render
+from ai_stream.utils.templates import resolve_includes
+from ai_stream.utils.templates import template_variables
+
+
+PROMPTS = {
+    "Tone": "Be {% if formal %}formal{% else %}friendly{% endif %}.",
+    "Support": 'You help {{ customer }} with {{product}}. {% include "Tone" %}',
+    "Loop": '{% include "Loop" %}',
+}
+
+
+@pytest.mark.parametrize(
+    ("variables", "expected"),
+    [
+        ({"customer": "Ada", "product": "AI Stream"}, "You help Ada with AI Stream. Be friendly."),
+        ({"customer": "Ada", "product": "X", "formal": "yes"}, "You help Ada with X. Be formal."),
+    ],
+)
+def test_render(variables, expected):
+    template = compile_template(PROMPTS["Support"])
+    includes = resolve_includes(template, PROMPTS.__getitem__)
+
+    assert template.variables == {"customer", "product"}
+    assert includes["Tone"].variables == {"formal"}
+    assert render(template, variables, includes) == expected
+
+
+def test_nested_blocks():
+    template = compile_template(
+        "{% if a %}A{% if b %}B{% include 'Tone' %}{% endif %}{% else %}None{% endif %}."
+    )
+    includes = resolve_includes(template, PROMPTS.__getitem__)
+    assert template.nodes[0].body[1].body[1] == Include("Tone")
+    assert render(template, {"a": "1", "b": "1"}, includes) == "ABBe friendly.."
+    assert render(template, {"a": "1"}, includes) == "A."
+    assert render(template, {}, includes) == "None."
+
+
+def test_plain_prompt():
+    text = "You are a helpful assistant. Use {curly} braces as they are."
+    template = compile_template(text)
+    assert render(template, {}, {}) == text
+    assert not template.variables
+
+
+@pytest.mark.parametrize(
+    ("text", "message"),
+    [
+        ("{% if a %}Unclosed", "Missing {% endif %}"),
+        ("{% endif %}", "Invalid tag"),
+        ("{% if a %}{% else %}{% else %}{% endif %}", "Invalid tag"),
+        ("{% for x in y %}", "Invalid tag"),
+    ],
+)
+def test_invalid_template(text, message):
+    with pytest.raises(TemplateError, match=message):
+        compile_template(text)
+
+
+def test_render_errors():
+    template = compile_template(PROMPTS["Support"])
+    with pytest.raises(TemplateError, match="customer"):
+        render(template, {"product": "X"}, resolve_includes(template, PROMPTS.__getitem__))
+    with pytest.raises(TemplateError, match="Recursive"):
+        resolve_includes(compile_template(PROMPTS["Loop"]), PROMPTS.__getitem__)
+
+
+def test_compiled_and_rendered_once():
+    text = "Hello {{ name }}!"
+    template = compile_template(text)
+    assert compile_template(text) is template
+
+    first = render(template, {"name": "Ada"}, {})
+    assert render(compile_template(text), {"name": "Ada"}, {}) is first
+    # Renders depend on the versions of the includes
+    tone = compile_template(PROMPTS["Tone"])
+    other = compile_template("Be brief.")
+    support = compile_template(PROMPTS["Support"])
+    variables = {"customer": "Ada", "product": "X"}
+    assert render(support, variables, {"Tone": tone}) != render(
+        support, variables, {"Tone": other}
+    )
+
+
+def test_template_variables():
+    metadata = set_settings(
+        {"prompt_id": "abc"}, {VARIABLES_KEY: {"customer": "Ada", "formal": ""}}
+    )
+    assert template_variables(metadata) == {"customer": "Ada", "formal": ""}
+    assert template_variables({"prompt_id": "abc"}) == {}
+
+
+def test_include_index():
+    index = IncludeIndex()
+    index.add("tone", "Tone", "Be formal.")
+    index.add("greeting", "Greeting", "Hi. {% include 'Tone' %}")
+    index.add("welcome", "Welcome", "{% include 'Greeting' %}")
+    index.add("broken", "Broken", "{% if %}{% include 'Tone' %}")
+    index.add("loop", "Loop", "{% include 'Loop' %}")
+
+    assert index.dependents("Tone") == ["greeting", "welcome"]
+    assert index.dependents("Loop") == []
+
+    index.add("greeting", "Greeting", "Hi.")
+    assert index.dependents("Tone") == []
+    index.remove("welcome")
+    assert index.dependents("Greeting") == []
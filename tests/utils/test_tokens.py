@@ -0,0 +1,18 @@
+from ai_stream.utils.tokens import MESSAGE_OVERHEAD
+from ai_stream.utils.tokens import estimate_messages_tokens
+from ai_stream.utils.tokens import estimate_tokens
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Hello, world!") == len(["Hello", ",", "world", "!"])
+    # Long words are split into several tokens
+    assert estimate_tokens("a" * 40) == len("a" * 40) // 4
+
+
+def test_estimate_messages_tokens():
+    messages = ["Hello, world!", "Hi"]
+
+    assert estimate_messages_tokens(messages) == sum(
+        estimate_tokens(m) + MESSAGE_OVERHEAD for m in messages
+    )
@@ -1,4 +1,5 @@
 from ai_stream.utils import create_id
+from ai_stream.utils import stable_id
 
 
 def test_create_id():
@@ -7,3 +8,11 @@ def test_create_id():
     # Check if the length of the result is correct
     expected_length = 22  # 22 is the length of base64 encoded UUID without padding
     assert len(result) == expected_length, f"Result length is incorrect: {len(result)}"
+
+
+def test_stable_id():
+    result = stable_id("schema", 0, "label")
+
+    assert result == stable_id("schema", 0, "label")
+    assert result != stable_id("schema", 1, "label")
+    assert len(result) == len(create_id())
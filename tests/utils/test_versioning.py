@@ -0,0 +1,80 @@
+import pytest
+from ai_stream.utils.versioning import SNAPSHOT_INTERVAL
+from ai_stream.utils.versioning import add_version
+from ai_stream.utils.versioning import apply_delta
+from ai_stream.utils.versioning import content_hash
+from ai_stream.utils.versioning import get_text
+from ai_stream.utils.versioning import list_versions
+from ai_stream.utils.versioning import make_delta
+from ai_stream.utils.versioning import prune_history
+
+
+@pytest.mark.parametrize(
+    ("parent", "text"),
+    [
+        ("", "New prompt."),
+        ("Line 1\nLine 2\n", "Line 1\nLine 2\n"),
+        ("Line 1\nLine 2\nLine 3", "Line 1\nChanged\nLine 3\nLine 4"),
+        ("Line 1\nLine 2\n", ""),
+        ("No newline", "No newline\n"),
+    ],
+)
+def test_delta_round_trip(parent, text):
+    assert apply_delta(parent, make_delta(parent, text)) == text
+
+
+def test_delta_references_unchanged_lines():
+    parent = "".join(f"Rule {i}.\n" for i in range(100))
+    delta = make_delta(parent, parent.replace("Rule 50.", "Rule fifty."))
+    assert delta == [[0, 50], "Rule fifty.\n", [51, 100]]
+
+
+def test_add_version():
+    history = {}
+    first = add_version(history, "Be helpful.\n", parent=None)
+    second = add_version(history, "Be helpful.\nBe brief.\n", parent=first)
+
+    assert first == content_hash("Be helpful.\n")
+    assert history[second]["parent"] == first
+    assert get_text(history, first) == "Be helpful.\n"
+    assert get_text(history, second) == "Be helpful.\nBe brief.\n"
+    assert list_versions(history) == [second, first]
+    # Versions are content-addressed, so restoring one doesn't add it again
+    assert add_version(history, "Be helpful.\n", parent=second) == first
+    assert len(history) == len([first, second])
+
+
+def test_snapshots():
+    history = {}
+    version = None
+    texts = [f"Version {i}.\nShared line.\n" for i in range(SNAPSHOT_INTERVAL * 2 + 1)]
+    for text in texts:
+        version = add_version(history, text, parent=version)
+
+    assert [get_text(history, content_hash(text)) for text in texts] == texts
+    full_texts = [v for v, entry in history.items() if not entry["parent"]]
+    assert len(full_texts) == len(texts) // SNAPSHOT_INTERVAL + 1
+
+
+def test_prune_history():
+    history = {}
+    version = None
+    texts = [f"Version {i}.\nShared line.\n" for i in range(SNAPSHOT_INTERVAL + 5)]
+    for text in texts:
+        version = add_version(history, text, parent=version)
+    max_versions = 4
+    kept = texts[-max_versions:]
+
+    prune_history(history, version, max_versions, max_bytes=10**6)
+
+    assert set(history) == {content_hash(text) for text in kept}
+    # Versions edited from removed ones store their full text
+    assert [get_text(history, content_hash(text)) for text in kept] == kept
+    assert not history[content_hash(kept[0])]["parent"]
+
+    # The current version is kept even if it is the oldest one
+    oldest = content_hash(kept[0])
+    prune_history(history, oldest, max_versions=1, max_bytes=10**6)
+    assert list(history) == [oldest]
+    prune_history(history, oldest, max_versions, max_bytes=0)
+    assert list(history) == [oldest]
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from ai_stream.utils.widget_data import count_pages
+from ai_stream.utils.widget_data import page_frame
+from ai_stream.utils.widget_data import query_frame
+from ai_stream.utils.widget_data import to_frame
+
+
+def test_to_frame_from_array_does_not_copy():
+    array = np.random.randn(5, 3)
+    frame = to_frame(array)
+
+    assert frame.shape == (5, 3)
+    assert np.shares_memory(frame.to_numpy(), array)
+
+
+def test_to_frame_from_rows():
+    frame = to_frame([[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]])
+
+    assert frame.shape == (3, 2)
+    assert frame.dtypes.tolist() == [np.float64, np.float64]
+
+
+def test_to_frame_from_mixed_rows():
+    frame = to_frame([["a", 1], ["b", 2]])
+
+    assert frame[0].tolist() == ["a", "b"]
+    assert frame[1].tolist() == [1, 2]
+
+
+def test_to_frame_from_columns():
+    frame = to_frame({"Column 1": ["A", "B"], "Column 2": [1, 2]})
+
+    assert frame.columns.tolist() == ["Column 1", "Column 2"]
+    assert frame["Column 2"].tolist() == [1, 2]
+
+
+def test_to_frame_keeps_dataframes():
+    frame = pd.DataFrame({"a": [1]})
+
+    assert to_frame(frame) is frame
+
+
+def test_query_frame():
+    frame = pd.DataFrame({"name": ["Bob", "alice", "Albert"], "age": [30, 25, 40]})
+
+    result = query_frame(frame, search="AL", sort_by="age", ascending=False)
+
+    assert result["name"].tolist() == ["Albert", "alice"]
+    assert query_frame(frame) is frame
+
+
+def test_page_frame():
+    frame = pd.DataFrame({"a": range(25)})
+
+    assert page_frame(frame, 3, 10)["a"].tolist() == list(range(20, 25))
+    assert [count_pages(n, 10) for n in [0, 10, 11, 25]] == [1, 1, 2, 3]